@@ -3,7 +3,6 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User, Group
 from django.contrib import messages
 from django.utils.crypto import get_random_string
-from django.core.mail import send_mail
 from django.conf import settings
 from django.db import IntegrityError, transaction
 from import_export import resources, fields
@@ -14,10 +13,11 @@ from import_export.results import RowResult
 from .models import (
     Department, Unit, Zone, State, LGA, Bank, PFA, 
     Designation, EmployeeProfile, EmployeeDetail,
-    EducationalQualification, Newsletter
+    EducationalQualification, Newsletter, OutboundEmail, BackgroundJob
 )
 from .verification_model import EmployeeVerification, AutomatedCheck, VerificationLog
 from .permissions import Role, UserRole, AttributeBasedPermission
+from .outbox import queue_email
 
 import logging
 
@@ -38,9 +38,9 @@ def send_password_email(user, password):
     Please login and complete your profile.
     """
     try:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+        queue_email(subject, message, [user.email], settings.DEFAULT_FROM_EMAIL)
     except Exception as e:
-        logger.error(f"Failed to send email to {user.email}: {e}")
+        logger.error(f"Failed to queue email to {user.email}: {e}")
 
 # --- Resource Definitions for django-import-export ---
 class UserResource(resources.ModelResource):
@@ -440,6 +440,26 @@ class NewsletterAdmin(admin.ModelAdmin):
     date_hierarchy = 'publish_date'
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    # The body may hold credentials until it is sent
+    exclude = ('body',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('title', 'name', 'status', 'attempts', 'progress_done', 'progress_total', 'created_by', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('title', 'name', 'idempotency_key')
+    # Payloads can hold whole uploaded files
+    exclude = ('payload',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'error', 'result')
+
+
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
     list_display = ('name', 'role_type', 'hierarchy_level')
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connect the reference data cache invalidation signals
+        from . import reference_data  # noqa: F401
+        # Keep the staff search index in step with profile changes
+        from . import search  # noqa: F401
+        # Register the background tasks with the job runner
+        from . import tasks  # noqa: F401
+        # Warn when caches that must be shared are per-process
+        from . import checks  # noqa: F401
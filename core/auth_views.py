@@ -6,8 +6,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from .forms import PasswordResetRequestForm, SetPasswordForm
 from .models import EmployeeProfile
+from .outbox import queue_email
 import uuid
-from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
 
@@ -86,17 +86,16 @@ def password_reset_request(request):
                 request.session['reset_token'] = token
                 request.session['reset_email'] = email
                 
-                # Send email
+                # Queue the email for the outbox worker
                 reset_url = request.build_absolute_uri(
                     reverse('password_reset_confirm') + f'?token={token}&email={email}'
                 )
                 
-                send_mail(
+                queue_email(
                     'Password Reset Request',
                     f'Please click the following link to reset your password: {reset_url}',
-                    settings.DEFAULT_FROM_EMAIL,
                     [email],
-                    fail_silently=False,
+                    settings.DEFAULT_FROM_EMAIL,
                 )
                 
                 messages.success(request, "Password reset instructions have been sent to your email.")
@@ -0,0 +1,44 @@
+"""
+Bulk row updates
+
+bulk_update() builds a CASE expression per field with a branch per row, which
+is slow to compile in Python and to evaluate in SQLite once batches reach the
+thousands. update_rows() sends each batch as one
+UPDATE ... FROM (VALUES ...) statement instead on SQLite and PostgreSQL, and
+falls back to bulk_update() elsewhere.
+"""
+from django.db import connection
+
+
+UPDATE_BATCH_SIZE = 400
+
+
+def update_rows(model, field_names, rows, batch_size=UPDATE_BATCH_SIZE):
+    """Write rows of (pk, value, ...) to field_names of model"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        model.objects.bulk_update(
+            [model(pk=pk, **dict(zip(field_names, values))) for pk, *values in rows], field_names,
+            batch_size=batch_size,
+        )
+        return
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    assignments = []
+    for index, field in enumerate(fields, start=2):
+        # PostgreSQL would type an all-NULL column as text
+        value = (f'CAST(v.column{index} AS {field.db_type(connection)})'
+                 if connection.vendor == 'postgresql' else f'v.column{index}')
+        assignments.append(f'{connection.ops.quote_name(field.column)} = {value}')
+    row_sql = '(' + ', '.join(['%s'] * (len(fields) + 1)) + ')'
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"UPDATE {table} SET {', '.join(assignments)} "
+                f"FROM (VALUES {', '.join([row_sql] * len(batch))}) AS v WHERE {table}.{pk_column} = v.column1",
+                [param for pk, *values in batch
+                 for param in (pk, *(field.get_db_prep_save(value, connection) for field, value in zip(fields, values)))],
+            )
@@ -0,0 +1,24 @@
+"""
+System checks for the core app
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when a production server would cache permissions per worker"""
+    if settings.DEBUG:
+        return []
+    aliases = {'default', getattr(settings, 'PERMISSION_CACHE_ALIAS', 'default')}
+    return [
+        Warning(
+            f"The '{alias}' cache is local memory, so permission, reference data, dashboard and projection "
+            f"changes reach only the worker that made them.",
+            hint="Set HR_APP_CACHE_BACKEND and HR_APP_CACHE_LOCATION to a cache shared by all workers.",
+            id='core.W001',
+        )
+        for alias in sorted(aliases) if isinstance(caches[alias], LocMemCache)
+    ]
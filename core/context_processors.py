@@ -0,0 +1,6 @@
+from .reference_data import ReferenceData
+
+
+def reference_data(request):
+    """Expose the cached reference tables to templates, e.g. {% for state in reference_data.states %}"""
+    return {'reference_data': ReferenceData()}
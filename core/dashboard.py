@@ -0,0 +1,131 @@
+"""
+Dashboard data
+
+Organisation-wide counters and lists are the same for every user, so they are
+computed with one conditional aggregate per model and cached for a short
+time (DASHBOARD_CACHE_TIMEOUT). Only the pieces that depend on the signed-in
+employee - tasks, leave balances, own leave dates - are queried per request.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import EmployeeProfile
+from hr_modules.models import Training, LeaveRequest, LeaveBalance, Examination
+from task_management.models import Task
+from file_management.models import File
+
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+UPCOMING_EVENT_DAYS = 30
+UPCOMING_EVENT_LIMIT = 5
+
+
+def get_org_summary(today):
+    """Counters and lists shared by every user, cached for a short time"""
+    cache_key = f'core:dashboard:summary:{today.isoformat()}'
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = build_org_summary(today)
+        cache.set(cache_key, summary, DASHBOARD_CACHE_TIMEOUT)
+    return summary
+
+
+def build_org_summary(today):
+    """Compute the shared counters with one aggregate query per model"""
+    last_month = today - timedelta(days=30)
+
+    summary = EmployeeProfile.objects.filter(user__is_active=True).aggregate(
+        employee_count=Count('id'),
+        new_employees=Count('id', filter=Q(date_of_assumption__gte=last_month)),
+    )
+    summary.update(LeaveRequest.objects.aggregate(
+        pending_leaves=Count('id', filter=Q(status='PENDING')),
+        approved_leaves=Count('id', filter=Q(status='APPROVED', approved_date__gte=last_month)),
+    ))
+    summary.update(Training.objects.aggregate(
+        upcoming_trainings=Count('id', filter=Q(start_date__gte=today, status='UPCOMING')),
+        ongoing_trainings=Count('id', filter=Q(start_date__lte=today, end_date__gte=today, status='ONGOING')),
+    ))
+
+    summary['available_trainings'] = list(
+        Training.objects.filter(
+            Q(status='UPCOMING') | Q(status='ONGOING'),
+            start_date__gte=today - timedelta(days=7)
+        ).select_related('training_type').annotate(
+            participant_count=Count('participants')
+        ).order_by('start_date')[:3]
+    )
+
+    summary['recent_files'] = list(
+        File.objects.filter(status='ACTIVE').select_related('created_by').order_by('-created_at')[:5]
+    )
+
+    # Organisation events for the next month; the user's own leave is merged in per request
+    event_window = (today, today + timedelta(days=UPCOMING_EVENT_DAYS))
+    summary['upcoming_events'] = [
+        {
+            'title': f"Training: {training.title}",
+            'description': f"Location: {training.location}",
+            'date': training.start_date,
+        }
+        for training in Training.objects.filter(
+            start_date__range=event_window
+        ).only('title', 'location', 'start_date').order_by('start_date')[:3]
+    ] + [
+        {
+            'title': f"Exam: {exam.title}",
+            'description': f"Venue: {exam.venue}",
+            'date': exam.scheduled_date,
+        }
+        for exam in Examination.objects.filter(
+            scheduled_date__range=event_window
+        ).only('title', 'venue', 'scheduled_date').order_by('scheduled_date')[:3]
+    ]
+
+    return summary
+
+
+def get_dashboard_context(user, today=None):
+    """Template context for the dashboard: cached org summary plus live per-user data"""
+    today = today or timezone.now().date()
+    employee_profile = user.employee_profile
+
+    context = dict(get_org_summary(today))
+
+    # My tasks: both counters in one query
+    start_of_today = timezone.make_aware(datetime.combine(today, time.min))
+    open_tasks = Task.objects.filter(assigned_to=employee_profile, status__is_completed=False)
+    context.update(open_tasks.aggregate(
+        my_tasks_count=Count('id'),
+        overdue_tasks=Count('id', filter=Q(due_date__lt=start_of_today)),
+    ))
+    context['my_tasks'] = open_tasks.select_related('status', 'priority').order_by('due_date')[:5]
+
+    # My leave balances
+    context['leave_balances'] = LeaveBalance.objects.filter(
+        employee=employee_profile,
+        year=today.year
+    ).select_related('leave_type')
+
+    # Upcoming events - merge my approved leave dates into the shared list
+    my_leaves = [
+        {
+            'title': f"Leave: {leave.leave_type.name}",
+            'description': f"{leave.start_date} to {leave.end_date}",
+            'date': leave.start_date,
+        }
+        for leave in LeaveRequest.objects.filter(
+            employee=employee_profile,
+            status='APPROVED',
+            start_date__gte=today
+        ).select_related('leave_type').order_by('start_date')[:3]
+    ]
+    context['upcoming_events'] = sorted(
+        context['upcoming_events'] + my_leaves, key=lambda event: event['date']
+    )[:UPCOMING_EVENT_LIMIT]
+
+    return context
@@ -0,0 +1,146 @@
+"""
+Background jobs
+
+Batch work that is too slow for a request - bulk staff uploads, retirement
+identification - is queued as a BackgroundJob and run by
+"manage.py run_jobs --loop" worker processes. The page that queued it
+redirects to the job status page, which polls until the job finishes.
+
+Tasks are plain functions registered with @task('app.name') and called as
+function(job, **payload). They report progress with job_progress() and return
+a JSON-serialisable result. A task that raises is retried with backoff up to
+the job's max_attempts, so tasks must be safe to run again: skip work that an
+earlier attempt already committed.
+
+Workers claim a job by moving it to RUNNING with a lease (locked_until) in a
+conditional UPDATE, so any number of workers can poll the same table. Progress
+reports renew the lease; a job whose worker died is picked up again when its
+lease runs out.
+
+enqueue() with an idempotency key returns the existing job instead of adding
+another while that job is queued or running, so a double-submitted form only
+runs once.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE = timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 300))
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a background task under name"""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def enqueue(name, title, payload=None, user=None, idempotency_key=None, max_attempts=3):
+    """Queue a task; returns the new job, or the active job already holding idempotency_key"""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+
+    if idempotency_key:
+        # A finished job gives its key up so the same work can be requested again
+        BackgroundJob.objects.filter(
+            idempotency_key=idempotency_key, status__in=['SUCCEEDED', 'FAILED']
+        ).update(idempotency_key=None)
+
+    try:
+        with transaction.atomic():
+            return BackgroundJob.objects.create(
+                name=name, title=title, payload=payload or {}, created_by=user,
+                idempotency_key=idempotency_key or None, max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        return BackgroundJob.objects.get(idempotency_key=idempotency_key)
+
+
+def retry_delay(attempts):
+    """30 seconds, 1 minute, 2 minutes... after each failed attempt"""
+    return RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+
+def claim_job(now=None):
+    """Take the next due job for this worker, or None when the queue is empty"""
+    now = now or timezone.now()
+    due = Q(status='QUEUED', run_after__lte=now) | Q(status='RUNNING', locked_until__lt=now)
+
+    for job_id in BackgroundJob.objects.filter(due).order_by('run_after', 'pk').values_list('pk', flat=True)[:10]:
+        # Only one worker's conditional update can match the row
+        claimed = BackgroundJob.objects.filter(due, pk=job_id).update(
+            status='RUNNING', locked_until=now + JOB_LEASE, attempts=F('attempts') + 1, started_at=now,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(pk=job_id)
+    return None
+
+
+def job_progress(job, done, total=None, message=None):
+    """Record a task's progress and renew the worker's lease on the job"""
+    job.progress_done = done
+    if total is not None:
+        job.progress_total = total
+    if message is not None:
+        job.progress_message = message[:255]
+    job.locked_until = timezone.now() + JOB_LEASE
+    BackgroundJob.objects.filter(pk=job.pk).update(
+        progress_done=job.progress_done, progress_total=job.progress_total,
+        progress_message=job.progress_message, locked_until=job.locked_until,
+    )
+
+
+def run_job(job):
+    """Run a claimed job and record its result, or schedule its retry"""
+    try:
+        result = TASKS[job.name](job, **job.payload)
+    except Exception:
+        logger.exception("Background job %s (%s) failed", job.pk, job.name)
+        job.error = traceback.format_exc()
+        job.locked_until = None
+        if job.attempts < job.max_attempts:
+            job.status = 'QUEUED'
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = 'FAILED'
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'locked_until', 'run_after', 'finished_at'])
+        return job
+
+    job.status = 'SUCCEEDED'
+    job.result = result
+    job.error = ''
+    job.locked_until = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'locked_until', 'finished_at'])
+    return job
+
+
+def run_pending_jobs(max_jobs=None):
+    """Run due jobs one after another until the queue is empty; returns how many ran"""
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+def can_view_job(user, job):
+    return user.is_superuser or job.created_by_id == user.pk
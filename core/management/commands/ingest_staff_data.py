@@ -0,0 +1,252 @@
+import glob
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.models import EmployeeProfile, EmployeeDetail, State, LGA, Department, Designation, Zone
+from core.retirement_dates import recalculate_retirement_dates
+from core.search import index_objects
+from core.staff_ingest import CodeMaps, normalise, parse_workbook
+from hr_modules.projections import invalidate_workforce_projection
+
+
+DEFAULT_DATA_DIR = os.path.join(settings.BASE_DIR, 'data', 'staff_data')
+
+
+def build_code_maps():
+    """Load the reference code tables once as dictionaries for the workers"""
+    states = {}
+    state_zones = {}
+    for state_id, code, name, zone_id in State.objects.values_list('id', 'code', 'name', 'zone_id'):
+        states[normalise(code)] = state_id
+        states[normalise(name)] = state_id
+        state_zones[state_id] = zone_id
+
+    lgas = {}
+    name_counts = Counter()
+    for lga_id, name, state_id in LGA.objects.values_list('id', 'name', 'state_id'):
+        lgas[(state_id, normalise(name))] = lga_id
+        lgas[(None, normalise(name))] = lga_id
+        name_counts[normalise(name)] += 1
+    # A bare LGA name is only usable on its own when no other state has one like it
+    for name, count in name_counts.items():
+        if count > 1:
+            del lgas[(None, name)]
+
+    def code_and_name_map(queryset):
+        mapping = {}
+        for object_id, code, name in queryset.values_list('id', 'code', 'name'):
+            mapping[normalise(name)] = object_id
+            mapping[normalise(code)] = object_id
+        return mapping
+
+    return CodeMaps(
+        states=states,
+        lgas=lgas,
+        departments=code_and_name_map(Department.objects.all()),
+        designations=code_and_name_map(Designation.objects.all()),
+        zones=code_and_name_map(Zone.objects.all()),
+        state_zones=state_zones,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Load the staff nominal roll workbooks into employee profiles, one worker process per file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Workbooks or directories (default: data/staff_data)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Parser processes (1 parses in this process)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Records written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report without writing')
+
+    def handle(self, *args, **options):
+        paths = self.collect_paths(options['paths'] or [DEFAULT_DATA_DIR])
+        if not paths:
+            raise CommandError('No .xlsx workbooks found')
+
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.totals = Counter()
+        code_maps = build_code_maps()
+        started = time.perf_counter()
+
+        if options['workers'] <= 1:
+            for path in paths:
+                self.apply(parse_workbook(path, code_maps))
+        else:
+            # Workers only parse; don't let forked children inherit open connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                futures = [executor.submit(parse_workbook, path, code_maps) for path in paths]
+                for future in as_completed(futures):
+                    self.apply(future.result())
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(paths)} files, {self.totals['rows']} rows in {elapsed:.2f}s "
+            f"({self.totals['rows'] / elapsed if elapsed else 0:.0f} rows/s): "
+            f"{self.totals['created']} created, {self.totals['updated']} updated, "
+            f"{self.totals['unchanged']} unchanged, {self.totals['skipped']} skipped"
+        ))
+
+    def collect_paths(self, targets):
+        paths = []
+        for target in targets:
+            if os.path.isdir(target):
+                paths.extend(sorted(glob.glob(os.path.join(target, '*.xlsx'))))
+            else:
+                paths.append(target)
+        return paths
+
+    def apply(self, result):
+        """Write one parsed workbook and report its metrics"""
+        name = os.path.basename(result['path'])
+        if result['error']:
+            self.stderr.write(f"{name}: skipped ({result['error']})")
+            return
+
+        records = result['records']
+        stats = Counter(rows=len(records), skipped=result['skipped'])
+        started = time.perf_counter()
+        if not self.dry_run:
+            for start in range(0, len(records), self.batch_size):
+                stats.update(self.upsert(records[start:start + self.batch_size]))
+        write_seconds = time.perf_counter() - started
+
+        seconds = result['parse_seconds'] + write_seconds
+        self.totals.update(stats)
+        self.stdout.write(
+            f"{name}: {stats['rows']} rows, parse {result['parse_seconds']:.2f}s, "
+            f"write {write_seconds:.2f}s, {stats['rows'] / seconds if seconds else 0:.0f} rows/s, "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+            f"{stats['skipped']} skipped"
+        )
+
+    @transaction.atomic
+    def upsert(self, records):
+        """Create or update profiles keyed on file number with a fixed number of queries"""
+        stats = Counter()
+
+        # Last row wins when a file number repeats within the batch
+        records = list({record['file_number']: record for record in records}.values())
+        file_numbers = [record['file_number'] for record in records]
+
+        existing = {
+            profile.file_number: profile
+            for profile in EmployeeProfile.objects.filter(
+                file_number__in=file_numbers
+            ).select_related('user', 'details')
+        }
+
+        self.release_unique_values(records, 'ippis_number')
+        self.release_unique_values(records, 'nin')
+
+        new_records = [record for record in records if record['file_number'] not in existing]
+        usernames = {f"nde{record['file_number'].lower()}": record for record in new_records}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        stats['skipped'] += len(taken_usernames)
+
+        # New staff: users, then profiles, then details
+        users = [
+            User(username=username, password=make_password(None), **record['user'])
+            for username, record in usernames.items() if username not in taken_usernames
+        ]
+        User.objects.bulk_create(users)
+        user_ids = dict(User.objects.filter(
+            username__in=[user.username for user in users]
+        ).values_list('username', 'id'))
+
+        EmployeeProfile.objects.bulk_create([
+            EmployeeProfile(user_id=user_ids[user.username], file_number=usernames[user.username]['file_number'],
+                            **usernames[user.username]['profile'])
+            for user in users
+        ])
+        profile_ids = dict(EmployeeProfile.objects.filter(
+            user_id__in=user_ids.values()
+        ).values_list('file_number', 'id'))
+
+        details = [
+            EmployeeDetail(employee_profile_id=profile_ids[record['file_number']], **record['details'])
+            for record in new_records if record['file_number'] in profile_ids
+        ]
+        stats['created'] += len(users)
+
+        # Existing staff: only overwrite fields the workbook actually has a value for
+        changed_users, changed_profiles, changed_details, changed_ids = [], [], [], []
+        for record in records:
+            profile = existing.get(record['file_number'])
+            if profile is None:
+                continue
+
+            changed = False
+            if self.assign(profile.user, record['user']):
+                changed_users.append(profile.user)
+                changed = True
+            if self.assign(profile, record['profile']):
+                changed_profiles.append(profile)
+                changed = True
+
+            try:
+                detail = profile.details
+            except EmployeeDetail.DoesNotExist:
+                details.append(EmployeeDetail(employee_profile=profile, **record['details']))
+                changed = True
+            else:
+                if self.assign(detail, record['details']):
+                    changed_details.append(detail)
+                    changed = True
+
+            # A re-run of the same roll matches every row but changes none
+            if changed:
+                changed_ids.append(profile.pk)
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+
+        EmployeeDetail.objects.bulk_create(details)
+        if changed_users:
+            User.objects.bulk_update(changed_users, ['first_name', 'last_name', 'email'])
+        if changed_profiles:
+            EmployeeProfile.objects.bulk_update(changed_profiles, list(records[0]['profile']))
+        if changed_details:
+            EmployeeDetail.objects.bulk_update(changed_details, list(records[0]['details']))
+
+        # The bulk writes skip the signals that keep the search index and workforce
+        # projection current, and clean() that computes retirement dates
+        written_ids = [*profile_ids.values(), *changed_ids]
+        index_objects('staff', written_ids)
+        recalculate_retirement_dates(EmployeeProfile.objects.filter(pk__in=written_ids))
+        invalidate_workforce_projection()
+
+        return stats
+
+    def release_unique_values(self, records, field):
+        """Drop a unique identifier when another file number already holds it"""
+        values = {record['profile'][field] for record in records if record['profile'][field]}
+        owners = dict(EmployeeProfile.objects.filter(
+            **{f'{field}__in': values}
+        ).values_list(field, 'file_number'))
+
+        for record in records:
+            value = record['profile'][field]
+            if not value:
+                continue
+            if owners.setdefault(value, record['file_number']) != record['file_number']:
+                record['profile'][field] = None
+
+    def assign(self, instance, values):
+        """Set non-empty values on an instance, returning whether anything changed"""
+        changed = False
+        for field, value in values.items():
+            if value not in (None, '') and getattr(instance, field) != value:
+                setattr(instance, field, value)
+                changed = True
+        return changed
@@ -0,0 +1,149 @@
+import csv
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Zone, State, LGA, Bank, PFA, Department, Unit
+from core.reference_data import invalidate_reference_data
+
+
+DEFAULT_DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+
+# Applied in dependency order. Every table is keyed on its unique code;
+# parents maps a foreign key to (parent model, CSV column holding the parent code).
+REFERENCE_TABLES = [
+    {'file': 'zones.csv', 'model': Zone, 'fields': ['name']},
+    {'file': 'states.csv', 'model': State, 'fields': ['name'], 'parents': {'zone': (Zone, 'zone_code')}},
+    {'file': 'lgas.csv', 'model': LGA, 'fields': ['name'], 'parents': {'state': (State, 'state_code')}},
+    {'file': 'banks.csv', 'model': Bank, 'fields': ['name']},
+    {'file': 'pfs.csv', 'model': PFA, 'fields': ['name']},
+    {'file': 'depts.csv', 'model': Department, 'fields': ['name', 'description', 'type'],
+     'parents': {'parent': (Department, 'parent_code')}},
+    {'file': 'units.csv', 'model': Unit, 'fields': ['name', 'description'],
+     'parents': {'department': (Department, 'department_code')}},
+]
+
+
+class Command(BaseCommand):
+    help = 'Load the reference code tables (zones, states, LGAs, banks, PFAs, departments, units) from data/*.csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Directory holding the reference CSVs')
+        parser.add_argument('--dry-run', action='store_true', help='Report the differences without saving them')
+
+    def handle(self, *args, **options):
+        self.data_dir = options['data_dir']
+        self.verbosity = options['verbosity']
+        self.code_maps = {}
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            for table in REFERENCE_TABLES:
+                self.load_table(table)
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                # bulk_create and bulk_update do not send the signals that normally do this
+                transaction.on_commit(invalidate_reference_data)
+
+        elapsed = time.perf_counter() - started
+        suffix = ' (dry run, nothing saved)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"Reference data loaded in {elapsed:.2f}s{suffix}"))
+
+    def read_rows(self, filename):
+        path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(path):
+            raise CommandError(f"{path} not found")
+
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            return [
+                {key.strip(): (value or '').strip() for key, value in row.items() if key}
+                for row in csv.DictReader(csv_file)
+            ]
+
+    def code_map(self, model):
+        """Parent code -> id, loaded once per model and refreshed after it is written"""
+        if model not in self.code_maps:
+            self.code_maps[model] = dict(model.objects.values_list('code', 'id'))
+        return self.code_maps[model]
+
+    def load_table(self, table):
+        model = table['model']
+        parents = table.get('parents', {})
+        rows = self.read_rows(table['file'])
+
+        # Self-references (department parents) can only resolve once every row exists
+        own_parents = {field: spec for field, spec in parents.items() if spec[0] is model}
+        other_parents = {field: spec for field, spec in parents.items() if spec[0] is not model}
+
+        self.apply(table, rows, table['fields'], other_parents)
+        self.code_maps.pop(model, None)
+        if own_parents:
+            self.apply(table, rows, [], own_parents, label=f"{table['file']} (parent links)")
+            self.code_maps.pop(model, None)
+
+    def apply(self, table, rows, fields, parents, label=None):
+        """Diff the CSV against the table and upsert only new and changed rows"""
+        model = table['model']
+        columns = fields + [f'{field}_id' for field in parents]
+        existing = {
+            values['code']: values
+            for values in model.objects.values('id', 'code', *columns)
+        }
+
+        created, updated, unchanged, errors = [], [], 0, []
+        for row in rows:
+            code = row.get('code')
+            if not code:
+                errors.append(f"row without a code: {row}")
+                continue
+
+            desired = {field: row.get(field) or None for field in fields}
+            missing_parent = False
+            for field, (parent_model, column) in parents.items():
+                parent_code = row.get(column)
+                parent_id = self.code_map(parent_model).get(parent_code) if parent_code else None
+                if parent_code and parent_id is None:
+                    errors.append(f"{code}: unknown {column} '{parent_code}'")
+                    missing_parent = True
+                desired[f'{field}_id'] = parent_id
+            if missing_parent:
+                continue
+
+            current = existing.get(code)
+            if current is None:
+                created.append(model(code=code, **desired))
+            elif any(current[column] != value for column, value in desired.items()):
+                changed = [column for column, value in desired.items() if current[column] != value]
+                updated.append((model(id=current['id'], code=code, **desired), changed))
+            else:
+                unchanged += 1
+
+        instances = created + [instance for instance, changed in updated]
+        if instances and fields:
+            # One upsert statement per batch for both new and changed rows
+            model.objects.bulk_create(
+                instances,
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=columns,
+            )
+        elif instances:
+            # Parent links only: every row already exists
+            model.objects.bulk_update(instances, columns)
+
+        self.stdout.write(
+            f"{label or table['file']}: {len(rows)} rows, {len(created)} created, "
+            f"{len(updated)} updated, {unchanged} unchanged"
+        )
+        if self.verbosity > 1:
+            for instance in created:
+                self.stdout.write(f"  + {instance.code}")
+            for instance, changed in updated:
+                self.stdout.write(f"  ~ {instance.code}: {', '.join(changed)}")
+        for error in errors:
+            self.stderr.write(f"  ! {table['file']}: {error}")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import SEARCH_INDEXES, rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the staff and file search indexes from their source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('indexes', nargs='*',
+                            help=f"Indexes to rebuild (default: all of {', '.join(SEARCH_INDEXES)})")
+
+    def handle(self, *args, **options):
+        names = options['indexes'] or list(SEARCH_INDEXES)
+        unknown = [name for name in names if name not in SEARCH_INDEXES]
+        if unknown:
+            raise CommandError(f"Unknown indexes: {', '.join(unknown)} (choose from {', '.join(SEARCH_INDEXES)})")
+
+        if search_backend() is None:
+            self.stdout.write(self.style.WARNING('This database has no search backend; searches use icontains'))
+            return
+
+        for name in names:
+            started = time.perf_counter()
+            indexed = rebuild_index(name)
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {indexed} objects indexed in {time.perf_counter() - started:.2f}s"
+            ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import EmployeeProfile
+from core.retirement_dates import recalculate_retirement_dates
+
+
+class Command(BaseCommand):
+    help = 'Recompute every staff retirement date from date of birth and assumption of duty'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changes = recalculate_retirement_dates(dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        added = sum(1 for pk, stored, computed in changes if stored is None)
+        cleared = sum(1 for pk, stored, computed in changes if computed is None)
+        moved = len(changes) - added - cleared
+
+        if options['verbosity'] > 1 and changes:
+            file_numbers = dict(EmployeeProfile.objects.filter(
+                pk__in=[pk for pk, stored, computed in changes[:1000]]
+            ).values_list('pk', 'file_number'))
+            for pk, stored, computed in changes[:1000]:
+                self.stdout.write(f"  {file_numbers.get(pk, pk)}: {stored or '-'} -> {computed or '-'}")
+            if len(changes) > 1000:
+                self.stdout.write(f"  ...and {len(changes) - 1000} more")
+
+        suffix = ' (dry run, nothing saved)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(changes)} retirement dates changed: {added} added, {moved} moved, {cleared} cleared "
+            f"in {elapsed:.2f}s{suffix}"
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs; start several with --loop for parallel workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, polling the queue every --interval seconds')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls with --loop')
+        parser.add_argument('--max-jobs', type=int, default=None,
+                            help='Exit after running this many jobs (lets a supervisor recycle the worker)')
+
+    def handle(self, *args, **options):
+        ran = 0
+        while True:
+            remaining = None if options['max_jobs'] is None else options['max_jobs'] - ran
+            count = run_pending_jobs(max_jobs=remaining)
+            ran += count
+            if count and options['verbosity'] > 0:
+                self.stdout.write(f"{count} jobs run")
+            if not options['loop'] or (options['max_jobs'] is not None and ran >= options['max_jobs']):
+                break
+            if not count:
+                time.sleep(options['interval'])
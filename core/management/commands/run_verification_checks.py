@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.verification_checks import CHECK_CHUNK_SIZE, FLAGS, active_checks, run_checks
+from core.verification_model import EmployeeVerification
+
+
+class Command(BaseCommand):
+    help = 'Run the active automated checks over every staff verification and record the flags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, help='Only check staff in this department id')
+        parser.add_argument('--status', help='Only check verifications with this status, e.g. PENDING')
+        parser.add_argument('--chunk-size', type=int, default=CHECK_CHUNK_SIZE, help='Verifications per batch')
+
+    def handle(self, *args, **options):
+        verifications = EmployeeVerification.objects.all()
+        if options['department']:
+            verifications = verifications.filter(employee_profile__current_department_id=options['department'])
+        if options['status']:
+            verifications = verifications.filter(verification_status=options['status'])
+
+        checks = active_checks()
+        if not checks:
+            self.stdout.write(self.style.WARNING("No active automated checks are configured."))
+            return
+
+        started = time.perf_counter()
+        counts = run_checks(verifications, chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        flags = ', '.join(f"{counts[flag]} {flag}" for flag in FLAGS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {len(checks)} checks over {counts['checked']} verifications in {elapsed:.2f}s: "
+            f"{counts['with_issues']} with issues ({flags})"
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import EMAIL_OUTBOX_BATCH_SIZE, deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails over pooled SMTP connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE,
+                            help='Messages sent per SMTP connection')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, polling the outbox every --interval seconds')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_outbox(options['batch_size'])
+            if sent or failed or options['verbosity'] > 1:
+                self.stdout.write(f"{sent} sent, {failed} failed")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
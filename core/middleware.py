@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.urls import resolve, reverse
 from django.contrib.auth.views import LoginView
 from django.conf import settings
-from .permissions import get_user_permissions
+from .permissions import get_cached_user_permissions
 
 class PermissionMiddleware:
     """
@@ -50,16 +50,17 @@ class PermissionMiddleware:
             return self.get_response(request)
         
         # Get the current URL name
-        url_name = resolve(request.path_info).url_name
-        namespace = resolve(request.path_info).namespace
+        match = resolve(request.path_info)
+        url_name = match.url_name
+        namespace = match.namespace
         
         # Check if the URL is public or doesn't need permission checks
         full_url_name = f"{namespace}:{url_name}" if namespace else url_name
         if self._is_public_url(full_url_name):
             return self.get_response(request)
         
-        # Get user permissions and add them to the request
-        request.user_permissions = get_user_permissions(request.user)
+        # Get user permissions (cached snapshot) and add them to the request
+        request.user_permissions = get_cached_user_permissions(request.user)
         
         # Check if the user has the required permissions for this URL
         if not self._has_required_permission(request.user, request.user_permissions, namespace, url_name):
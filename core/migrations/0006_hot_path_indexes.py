@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_role_attributebasedpermission_userrole'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(condition=models.Q(('date_of_retirement__isnull', False)), fields=['date_of_retirement'], name='profile_retirement_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeverification',
+            index=models.Index(fields=['verification_status', 'employee_profile'], name='verification_status_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from core.search import SearchIndex, batches, create_search_table, drop_search_table, search_backend, write_documents
+
+
+# The table as this migration creates it, whatever core.search registers later
+STAFF_INDEX = SearchIndex('staff', None, 'core_staff_search', ('name', 'file_number', 'ippis_number'), None, ())
+
+
+def create_index(apps, schema_editor):
+    create_search_table(schema_editor.connection, STAFF_INDEX)
+    if not search_backend(schema_editor.connection):
+        return
+
+    # Index the staff that already exist, from the historical model
+    EmployeeProfile = apps.get_model('core', 'EmployeeProfile')
+    rows = EmployeeProfile.objects.order_by('pk').values_list(
+        'pk', 'user__first_name', 'middle_name', 'user__last_name', 'file_number', 'ippis_number'
+    )
+    for batch in batches(rows):
+        write_documents(STAFF_INDEX, [
+            (pk, {
+                'name': ' '.join(part for part in (first_name, middle_name, last_name) if part),
+                'file_number': file_number,
+                'ippis_number': ippis_number,
+            })
+            for pk, first_name, middle_name, last_name, file_number, ippis_number in batch
+        ])
+
+
+def drop_index(apps, schema_editor):
+    drop_search_table(schema_editor.connection, STAFF_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_background_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='automatedcheck',
+            name='check_type',
+            field=models.CharField(choices=[('AGE_PRIMARY', 'Minimum Age for Primary Education'), ('AGE_SECONDARY', 'Minimum Age for Secondary Education'), ('AGE_TERTIARY', 'Minimum Age for Tertiary Education'), ('EMPLOYMENT_AGE', 'Minimum Age for Employment'), ('MAX_AGE', 'Maximum Age for Employment'), ('EDUCATION_GAP', 'Maximum Gap Between Education Levels'), ('EDUCATION_OVERLAP', 'Education Timeline Overlap'), ('APPOINTMENT_DATES', 'Appointment Date Consistency')], max_length=20),
+        ),
+    ]
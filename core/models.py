@@ -1,10 +1,11 @@
-from datetime import timedelta, date
+from datetime import date
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class Department(models.Model):
@@ -165,22 +166,10 @@ class EmployeeProfile(models.Model):
         if self.current_grade_level == 11:
             raise ValidationError('Grade level 11 is not allowed.')
         
-        # calculate retirement automatically based on 35 years in service or 60 years of age
-        if self.date_of_assumption and self.date_of_birth: # Corrected condition: check for date_of_birth
-            years_in_service_date = self.date_of_assumption + timedelta(days=35*365)
-            years_from_birth_date = self.date_of_birth + timedelta(days=60*365)
-
-            retirement_date = min(years_in_service_date, years_from_birth_date) # Get the minimum date
-
-            # Assign the calculated retirement date to the field (if in a model or form)
-            self.date_of_retirement = retirement_date
-
-        else:
-            # Handle cases where date_of_assumption or date_of_birth is missing
-            # 1. Set date_of_retirement to None
-            # 2. Raise a ValidationError if these dates are required
-            self.date_of_retirement = None # Or handle as appropriate
-            # raise ValidationError("Date of assumption and date of birth are required to calculate retirement date.")
+        # calculate retirement automatically based on 35 years in service or 60 years of age,
+        # in calendar years; None when neither date is known
+        from .retirement_dates import retirement_date
+        self.date_of_retirement = retirement_date(self.date_of_birth, self.date_of_assumption)
             
         # If retirement date = today turn is active in user model to false
         if self.date_of_retirement == date.today():
@@ -190,6 +179,13 @@ class EmployeeProfile(models.Model):
     class Meta:
         verbose_name = "Employee Profile"
         verbose_name_plural = "Employee Profiles"
+        indexes = [
+            # Retirement identification; most staff rows are skipped as undated
+            models.Index(
+                fields=['date_of_retirement'], name='profile_retirement_idx',
+                condition=models.Q(date_of_retirement__isnull=False),
+            ),
+        ]
 
 class EmployeeDetail(models.Model):
     employee_profile = models.OneToOneField(EmployeeProfile, on_delete=models.CASCADE, related_name='details')
@@ -311,4 +307,91 @@ class Newsletter(models.Model):
         return self.title
 
     class Meta:
-        ordering = ['-publish_date']  
\ No newline at end of file
+        ordering = ['-publish_date']  
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox for the delivery worker (see core.outbox)"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(help_text="List of recipient addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
+
+    class Meta:
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [
+            # The worker's queue: pending messages that are due
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+
+class BackgroundJob(models.Model):
+    """A long-running task queued for the job workers (see core.jobs)"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    title = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+
+    # Scheduling and retries
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    # Progress and outcome
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.title} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('SUCCEEDED', 'FAILED')
+
+    @property
+    def percent_complete(self):
+        if self.status == 'SUCCEEDED':
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, round(100 * self.progress_done / self.progress_total))
+
+    class Meta:
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
+        indexes = [
+            # The workers' queue: jobs that are due, oldest first
+            models.Index(fields=['status', 'run_after'], name='job_due_idx'),
+        ]
@@ -2,20 +2,25 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.conf import settings
 from django.http import JsonResponse
+from django.db.models import Q
 from django.urls import reverse
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Q
-from django.utils.crypto import get_random_string
-import csv
-import io
+import uuid
 from datetime import date
 
-from .models import EmployeeProfile, Department, Unit, State, LGA
+from .models import EmployeeProfile, Department, State
 from .forms import ProfileCompleteForm, StaffOnboardingForm, EmployeeVerificationForm
-from .verification_model import EmployeeVerification, AutomatedCheck, VerificationLog
+from .verification_model import EmployeeVerification, VerificationLog, latest_verification, verification_stats
+from .verification_checks import active_checks, check_verifications
+from .staff_import import parse_staff_csv, TEMPLATE_FIELDS
+from .jobs import enqueue
+from .reference_data import get_departments, get_lgas, get_units
+from .pagination import paginate_keyset, render_list
+from .search import search_filter
+from .outbox import queue_messages
 
 
 def is_hr_admin(user):
@@ -148,126 +153,32 @@ def staff_bulk_upload(request):
             messages.error(request, "File must be a CSV.")
             return redirect('staff_bulk_upload')
         
-        # Process CSV file
+        # Read the CSV here so a malformed file is reported straight away
         try:
-            # Read CSV file
-            csv_data = csv_file.read().decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(csv_data))
-            
-            # Track results
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            for row in csv_reader:
-                try:
-                    # Basic validation
-                    required_fields = ['username', 'first_name', 'last_name', 'email', 'file_number']
-                    missing_fields = [field for field in required_fields if not row.get(field)]
-                    
-                    if missing_fields:
-                        errors.append(f"Row {csv_reader.line_num}: Missing required fields: {', '.join(missing_fields)}")
-                        error_count += 1
-                        continue
-                    
-                    # Check for existing users/profiles
-                    if User.objects.filter(username=row['username']).exists():
-                        errors.append(f"Row {csv_reader.line_num}: Username '{row['username']}' already exists.")
-                        error_count += 1
-                        continue
-                    
-                    if User.objects.filter(email=row['email']).exists():
-                        errors.append(f"Row {csv_reader.line_num}: Email '{row['email']}' already exists.")
-                        error_count += 1
-                        continue
-                    
-                    if EmployeeProfile.objects.filter(file_number=row['file_number']).exists():
-                        errors.append(f"Row {csv_reader.line_num}: File number '{row['file_number']}' already exists.")
-                        error_count += 1
-                        continue
-                    
-                    # Create user
-                    password = get_random_string(10)
-                    user = User.objects.create_user(
-                        username=row['username'],
-                        email=row['email'],
-                        password=password,
-                        first_name=row['first_name'],
-                        last_name=row['last_name']
-                    )
-                    
-                    # Get employee profile (created automatically by signal)
-                    try:
-                        profile = user.employee_profile
-                    except EmployeeProfile.DoesNotExist:
-                        # If profile wasn't created by signal, create it now
-                        profile = EmployeeProfile.objects.create(user=user)
-                    
-                    # Update profile with basic info
-                    profile.file_number = row['file_number']
-                    profile.ippis_number = row.get('ippis_number', '')
-                    
-                    # Get department if provided
-                    department_code = row.get('department_code')
-                    if department_code:
-                        try:
-                            department = Department.objects.get(code=department_code)
-                            profile.current_department = department
-                        except Department.DoesNotExist:
-                            errors.append(f"Row {csv_reader.line_num}: Department code '{department_code}' not found.")
-                    
-                    # Save profile
-                    profile.save()
-                    
-                    # Create verification record
-                    verification = EmployeeVerification.objects.create(
-                        employee_profile=profile,
-                        verification_status='PENDING',
-                        verification_notes="Bulk uploaded by HR."
-                    )
-                    
-                    # Log the verification
-                    VerificationLog.objects.create(
-                        verification=verification,
-                        action='CREATED',
-                        performed_by=request.user,
-                        details="Created through bulk upload"
-                    )
-                    
-                    # Send welcome email with credentials
-                    send_welcome_email(user, password, request)
-                    
-                    success_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {csv_reader.line_num}: Error - {str(e)}")
-                    error_count += 1
-            
-            # Show results
-            if success_count > 0:
-                messages.success(request, f"Successfully created {success_count} employee accounts.")
-            
-            if error_count > 0:
-                error_message = f"Encountered {error_count} errors during import:<br>"
-                error_message += "<br>".join(errors[:10])
-                if len(errors) > 10:
-                    error_message += f"<br>...and {len(errors) - 10} more errors."
-                messages.error(request, error_message)
-            
-            return redirect('staff_list')
-            
+            rows = parse_staff_csv(csv_file)
         except Exception as e:
             messages.error(request, f"Error processing CSV file: {str(e)}")
             return redirect('staff_bulk_upload')
-    
-    # Show CSV template fields
-    template_fields = [
-        'username', 'first_name', 'last_name', 'email', 'file_number',
-        'ippis_number', 'department_code'
-    ]
+        
+        # The accounts are created by a job worker; resubmitting the same form reuses its job
+        job = enqueue(
+            'core.staff_import',
+            f"Bulk staff upload ({len(rows)} rows)",
+            {
+                'rows': rows,
+                'performed_by_id': request.user.pk,
+                'reset_url': request.build_absolute_uri(reverse('password_reset')),
+            },
+            user=request.user,
+            idempotency_key=f"staff_import:{request.POST.get('import_id') or uuid.uuid4().hex}",
+        )
+        
+        messages.info(request, "The upload is being processed. Welcome emails go out once the accounts are created.")
+        return redirect(f"{reverse('job_status', args=[job.pk])}?next={reverse('staff_list')}")
     
     return render(request, 'core/staff_bulk_upload.html', {
-        'template_fields': template_fields,
+        'template_fields': TEMPLATE_FIELDS,
+        'import_id': uuid.uuid4().hex,
     })
 
 
@@ -280,61 +191,48 @@ def staff_list(request):
     is_verified = request.GET.get('verified', '')
     search = request.GET.get('search', '')
     
-    # Base queryset
+    # Base queryset, with each profile's most recent verification
     employees = EmployeeProfile.objects.filter(
         user__is_active=True
-    ).select_related('user', 'current_department')
+    ).select_related(
+        'user', 'current_department', 'current_unit', 'current_designation'
+    ).annotate(
+        latest_verification_status=latest_verification(),
+        latest_verification_id=latest_verification('pk'),
+    )
     
     # Apply filters
     if department_id:
         employees = employees.filter(current_department_id=department_id)
     
     if is_verified == 'yes':
-        # Get verified profiles
-        verified_ids = EmployeeVerification.objects.filter(
-            verification_status='VERIFIED'
-        ).values_list('employee_profile_id', flat=True)
-        employees = employees.filter(id__in=verified_ids)
+        employees = employees.filter(latest_verification_status='VERIFIED')
     elif is_verified == 'no':
-        # Get unverified profiles
-        verified_ids = EmployeeVerification.objects.filter(
-            verification_status='VERIFIED'
-        ).values_list('employee_profile_id', flat=True)
-        employees = employees.exclude(id__in=verified_ids)
+        employees = employees.filter(
+            ~Q(latest_verification_status='VERIFIED') | Q(latest_verification_status__isnull=True)
+        )
     elif is_verified == 'flagged':
-        # Get flagged profiles
-        flagged_ids = EmployeeVerification.objects.filter(
-            verification_status='FLAGGED'
-        ).values_list('employee_profile_id', flat=True)
-        employees = employees.filter(id__in=flagged_ids)
+        employees = employees.filter(latest_verification_status='FLAGGED')
     
     if search:
-        employees = employees.filter(
-            Q(user__first_name__icontains=search) |
-            Q(user__last_name__icontains=search) |
-            Q(file_number__icontains=search) |
-            Q(ippis_number__icontains=search)
-        )
+        employees = employees.filter(search_filter('staff', search))
+    
+    # One page of staff, ordered by name
+    employees = paginate_keyset(request, employees, ['user__last_name', 'user__first_name'])
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     # Get verification statistics
-    total_count = EmployeeProfile.objects.filter(user__is_active=True).count()
-    verified_count = EmployeeVerification.objects.filter(verification_status='VERIFIED').count()
-    pending_count = EmployeeVerification.objects.filter(verification_status='PENDING').count()
-    flagged_count = EmployeeVerification.objects.filter(verification_status='FLAGGED').count()
+    stats = verification_stats(EmployeeProfile.objects.filter(user__is_active=True))
     
-    return render(request, 'core/staff_list.html', {
+    return render_list(request, 'core/staff_list.html', {
         'employees': employees,
         'departments': departments,
         'filter_department': department_id,
         'filter_verified': is_verified,
         'search': search,
-        'total_count': total_count,
-        'verified_count': verified_count,
-        'pending_count': pending_count,
-        'flagged_count': flagged_count,
+        **stats,
     })
 
 
@@ -464,8 +362,8 @@ def get_lgas_for_state(request):
     """AJAX view to get LGAs for a state"""
     state_id = request.GET.get('state_id')
     if state_id:
-        lgas = LGA.objects.filter(state_id=state_id).values('id', 'name')
-        return JsonResponse({'lgas': list(lgas)})
+        lgas = [{'id': lga.id, 'name': lga.name} for lga in get_lgas(state_id)]
+        return JsonResponse({'lgas': lgas})
     return JsonResponse({'lgas': []})
 
 
@@ -473,8 +371,8 @@ def get_units_for_department(request):
     """AJAX view to get units for a department"""
     department_id = request.GET.get('department_id')
     if department_id:
-        units = Unit.objects.filter(department_id=department_id).values('id', 'name')
-        return JsonResponse({'units': list(units)})
+        units = [{'id': unit.id, 'name': unit.name} for unit in get_units(department_id)]
+        return JsonResponse({'units': units})
     return JsonResponse({'units': []})
 
 
@@ -482,9 +380,23 @@ def get_units_for_department(request):
 
 def send_welcome_email(user, password, request):
     """Send welcome email with login credentials"""
-    subject = "Welcome to the HR Management System"
+    send_welcome_emails([(user, password)], request)
+
+
+def send_welcome_emails(credentials, request):
+    """Queue welcome emails for (user, password) pairs in the outbox"""
     login_url = request.build_absolute_uri(reverse('login'))
     
+    queue_messages([
+        welcome_email_message(user, password, login_url)
+        for user, password in credentials
+    ])
+
+
+def welcome_email_message(user, password, login_url):
+    """Build the welcome email with login credentials"""
+    subject = "Welcome to the HR Management System"
+    
     message = f"""
     Dear {user.get_full_name()},
     
@@ -502,60 +414,31 @@ def send_welcome_email(user, password, request):
     HR Department
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
-    )
+    return EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
 
 
-def run_automated_checks(employee_profile, verification):
-    """Run automated checks on an employee profile"""
-    # Reset flags
-    verification.has_age_flag = False
-    verification.has_education_flag = False
-    verification.has_employment_flag = False
+def account_email_message(user, reset_url):
+    """Build the welcome email for an account created without a password"""
+    subject = "Welcome to the HR Management System"
     
-    # Get active checks
-    checks = AutomatedCheck.objects.filter(is_active=True)
+    message = f"""
+    Dear {user.get_full_name()},
     
-    # Collect issues
-    issues = []
+    Welcome to the HR Management System. Your account has been created successfully.
     
-    for check in checks:
-        # Skip checks that don't apply (e.g., education checks for profiles without education data)
-        if check.check_type.startswith('AGE_') and not employee_profile.date_of_birth:
-            continue
-        
-        # Age checks
-        if check.check_type == 'EMPLOYMENT_AGE' and employee_profile.date_of_birth and employee_profile.date_of_assumption:
-            # Calculate age at employment
-            employment_date = employee_profile.date_of_assumption
-            birth_date = employee_profile.date_of_birth
-            age_at_employment = employment_date.year - birth_date.year
-            
-            # Adjust for month/day
-            if (employment_date.month, employment_date.day) < (birth_date.month, birth_date.day):
-                age_at_employment -= 1
-            
-            if age_at_employment < check.min_value:
-                verification.has_age_flag = True
-                issues.append(f"Employee was {age_at_employment} years old at employment, which is below the minimum age of {check.min_value}")
-    
-    # If any issues were found, update the verification
-    if issues:
-        verification.issue_description = "\n".join(issues)
-    
-    verification.save()
-    
-    # Log the automated check
-    VerificationLog.objects.create(
-        verification=verification,
-        action='AUTO_CHECK',
-        performed_by=None,  # System check
-        details=f"Automated checks run. Issues found: {len(issues)}"
-    )
+    Username: {user.username}
+    
+    To set your password, request a password reset at {reset_url} using this email address.
     
-    return issues
\ No newline at end of file
+    Best regards,
+    HR Department
+    """
+    
+    return EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def run_automated_checks(employee_profile, verification):
+    """Run automated checks on an employee profile"""
+    # The batch engine updates the verification in place, so callers can keep using it
+    verification.employee_profile = employee_profile
+    return check_verifications([verification], active_checks())[verification.pk]
@@ -0,0 +1,134 @@
+"""
+Email outbox
+
+Views queue their mail in OutboundEmail rows instead of talking to the SMTP
+server inside the request; "manage.py send_queued_email" delivers them.
+
+The worker claims up to EMAIL_OUTBOX_BATCH_SIZE due messages at a time and
+sends them over one SMTP connection. Claiming pushes next_attempt_at forward
+by CLAIM_TIMEOUT, so two workers never send the same message and a message
+held by a worker that died becomes due again. A failed send is retried with
+exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then marked FAILED.
+
+Bodies are cleared once sent: welcome and reset emails carry credentials.
+Tests run with Django's locmem email backend, so delivered messages land in
+django.core.mail.outbox.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.message import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE_DELAY = timedelta(minutes=1)
+
+
+def outbound_email(message):
+    """Unsaved OutboundEmail for an EmailMessage"""
+    return OutboundEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+    )
+
+
+def queue_messages(messages):
+    """Add EmailMessages to the outbox with one insert; returns the rows"""
+    return OutboundEmail.objects.bulk_create([outbound_email(message) for message in messages])
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Queue one email; the arguments follow django.core.mail.send_mail"""
+    return queue_messages([EmailMessage(subject, message, from_email, recipient_list)])[0]
+
+
+def retry_delay(attempts):
+    """1, 2, 4, 8... minutes after the first, second, third... failed attempt"""
+    return RETRY_BASE_DELAY * 2 ** (attempts - 1)
+
+
+def claim_batch(batch_size, now):
+    """Lease the next due messages to this worker and return them"""
+    with transaction.atomic():
+        due = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status='PENDING', next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in due]).update(
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return due
+
+
+def record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'FAILED'
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def send_batch(emails, connection):
+    """Send claimed messages over one open connection; returns (sent, failed)"""
+    sent = failed = 0
+    for email in emails:
+        message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+        try:
+            message.send()
+        except Exception as error:
+            record_failure(email, error, timezone.now())
+            failed += 1
+            continue
+
+        email.status = 'SENT'
+        email.sent_at = timezone.now()
+        email.attempts += 1
+        email.body = ''
+        email.last_error = ''
+        email.save(update_fields=['status', 'sent_at', 'attempts', 'body', 'last_error'])
+        sent += 1
+    return sent, failed
+
+
+def deliver_outbox(batch_size=None, max_batches=None):
+    """Send due messages batch by batch until none are left; returns (sent, failed)"""
+    batch_size = batch_size or EMAIL_OUTBOX_BATCH_SIZE
+    sent = failed = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size, timezone.now())
+        if not emails:
+            break
+        batches += 1
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as error:
+            # Server unreachable: the whole batch waits for its next attempt
+            now = timezone.now()
+            for email in emails:
+                record_failure(email, error, now)
+            failed += len(emails)
+            break
+
+        try:
+            batch_sent, batch_failed = send_batch(emails, connection)
+        finally:
+            connection.close()
+        sent += batch_sent
+        failed += batch_failed
+
+    return sent, failed
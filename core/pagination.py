@@ -0,0 +1,175 @@
+"""
+Keyset pagination
+
+List pages seek past the last row shown instead of using OFFSET, so a late
+page costs the same as the first. The page position is a signed cursor that
+holds the sort values of the boundary row, carried in the query string with
+the list's other filters.
+
+Sort keys must not be NULL (annotate a Coalesce for nullable columns); the
+primary key is appended so the order is total. Totals are counted up to
+APPROXIMATE_COUNT_LIMIT rows so they stay cheap on large tables.
+
+A sort key that depends on the current time must use a time kept in the
+cursor (pass it as state and read it back with cursor_state()), or a row can
+change place between pages and be skipped or repeated.
+
+HTMX requests (HX-Request header) render "<template>_rows.html" when it
+exists, so the pager can swap just the list instead of the whole page.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import F, Q
+from django.shortcuts import render
+
+
+LIST_PAGE_SIZE = getattr(settings, 'LIST_PAGE_SIZE', 25)
+APPROXIMATE_COUNT_LIMIT = 1000
+CURSOR_SALT = 'core.pagination.cursor'
+
+
+class KeysetPage:
+    """One page of rows plus the links and counts the pager template needs"""
+
+    def __init__(self, object_list, has_next, has_previous, next_query, previous_query, count, count_is_exact):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def count_display(self):
+        return f"{self.count:,}" if self.count_is_exact else f"{self.count:,}+"
+
+
+def parse_ordering(ordering):
+    """['-created_at', 'title'] -> [('created_at', True), ('title', False), ('pk', True)]"""
+    keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    if keys[-1][0] not in ('pk', 'id'):
+        keys.append(('pk', keys[-1][1]))
+    return keys
+
+
+def order_by_keys(queryset, keys, reverse=False):
+    return queryset.order_by(*[
+        F(name).desc() if descending != reverse else F(name).asc() for name, descending in keys
+    ])
+
+
+def seek_filter(keys, values, forward=True):
+    """Rows strictly after the cursor values in key order (before them when not forward)"""
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(keys, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def encode_value(value):
+    # Full-precision ISO strings; the ORM parses them back when filtering
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def key_values(instance, keys):
+    values = []
+    for name, _ in keys:
+        value = instance
+        for part in name.split('__'):
+            value = getattr(value, part)
+        values.append(encode_value(value))
+    return values
+
+
+def make_cursor(instance, keys, forward, state=None):
+    return signing.dumps(
+        {'values': key_values(instance, keys), 'forward': forward, 'state': state or {}}, salt=CURSOR_SALT
+    )
+
+
+def load_cursor(token):
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def cursor_state(request, param='cursor'):
+    """The state paginate_keyset() saved in the request's cursor, {} on the first page"""
+    cursor = load_cursor(request.GET.get(param))
+    return cursor.get('state', {}) if cursor else {}
+
+
+def approximate_count(queryset, limit=APPROXIMATE_COUNT_LIMIT):
+    """Count at most limit + 1 rows; returns (count, whether the count is exact)"""
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count <= limit
+
+
+def query_with(request, param, cursor):
+    query = request.GET.copy()
+    query[param] = cursor
+    return '?' + query.urlencode()
+
+
+def paginate_keyset(request, queryset, ordering, per_page=None, param='cursor', state=None):
+    """Return the KeysetPage of queryset selected by the request's cursor; state (JSON) rides along in its links"""
+    per_page = per_page or LIST_PAGE_SIZE
+    keys = parse_ordering(ordering)
+    cursor = load_cursor(request.GET.get(param))
+    forward = cursor is None or cursor['forward']
+
+    rows = queryset
+    if cursor is not None:
+        rows = rows.filter(seek_filter(keys, cursor['values'], forward))
+    rows = list(order_by_keys(rows, keys, reverse=not forward)[:per_page + 1])
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else cursor is not None
+    has_previous = cursor is not None if forward else more
+    count, count_is_exact = approximate_count(queryset)
+
+    return KeysetPage(
+        rows,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_query=query_with(request, param, make_cursor(rows[-1], keys, True, state)) if has_next and rows else None,
+        previous_query=(
+            query_with(request, param, make_cursor(rows[0], keys, False, state)) if has_previous and rows else None
+        ),
+        count=count,
+        count_is_exact=count_is_exact,
+    )
+
+
+def render_list(request, template_name, context):
+    """Render a list page, or only its rows partial for HTMX pager requests"""
+    if request.headers.get('HX-Request'):
+        return render(request, [template_name.replace('.html', '_rows.html'), template_name], context)
+    return render(request, template_name, context)
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.core.cache import caches
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import Group, User, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.db.models import Q
 
 
@@ -118,6 +123,13 @@ class Role(models.Model):
         super().save(*args, **kwargs)
 
 
+# Boolean can_* flags on Role, resolved once instead of on every permission lookup
+ROLE_PERMISSION_FIELDS = tuple(
+    field.name for field in Role._meta.fields
+    if isinstance(field, models.BooleanField) and field.name.startswith('can_')
+)
+
+
 class UserRole(models.Model):
     """Mapping between users and roles"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_roles')
@@ -205,66 +217,23 @@ class AttributeBasedPermission(models.Model):
         Convert this permission to a Django Q object for filtering
         Handles dynamic values by replacing placeholders with actual user attributes
         """
-        value = self.condition_value
-        
-        # Handle dynamic values
-        if '{' in value and '}' in value:
-            # Extract the placeholder
-            placeholder = value[value.find('{')+1:value.find('}')]
-            
-            # Get the actual value from the user object
-            parts = placeholder.split('.')
-            obj = user
-            for part in parts:
-                if hasattr(obj, part):
-                    obj = getattr(obj, part)
-                else:
-                    # If attribute doesn't exist, return an impossible condition
-                    return Q(pk=-1)
-            
-            value = obj
-        
-        # Build the appropriate Q object based on condition type
-        if self.condition_type == 'EQUALS':
-            return Q(**{self.field_name: value})
-        elif self.condition_type == 'NOT_EQUALS':
-            return ~Q(**{self.field_name: value})
-        elif self.condition_type == 'IN':
-            # Assume value is a comma-separated list
-            values = [v.strip() for v in value.split(',')] if isinstance(value, str) else value
-            return Q(**{f"{self.field_name}__in": values})
-        elif self.condition_type == 'NOT_IN':
-            values = [v.strip() for v in value.split(',')] if isinstance(value, str) else value
-            return ~Q(**{f"{self.field_name}__in": values})
-        elif self.condition_type == 'GREATER_THAN':
-            return Q(**{f"{self.field_name}__gt": value})
-        elif self.condition_type == 'LESS_THAN':
-            return Q(**{f"{self.field_name}__lt": value})
-        elif self.condition_type == 'CONTAINS':
-            return Q(**{f"{self.field_name}__contains": value})
-        elif self.condition_type == 'STARTS_WITH':
-            return Q(**{f"{self.field_name}__startswith": value})
-        elif self.condition_type == 'ENDS_WITH':
-            return Q(**{f"{self.field_name}__endswith": value})
-        
-        # Default fallback - impossible condition
-        return Q(pk=-1)
+        value = resolve_condition_value(self.condition_value, user)
+        return build_condition_q(self.field_name, self.condition_type, value)
 
 
 # Helper functions for permission checking
 def get_user_permissions(user):
     """Get all permissions for a user, including role-based and attribute-based"""
-    user_roles = UserRole.objects.filter(user=user, is_active=True)
+    user_roles = UserRole.objects.filter(user=user, is_active=True).select_related('role')
     permissions = {}
     
     for user_role in user_roles:
         role = user_role.role
         
         # Add boolean permission fields
-        for field in role._meta.fields:
-            if isinstance(field, models.BooleanField) and field.name.startswith('can_'):
-                if getattr(role, field.name):
-                    permissions[field.name] = True
+        for field_name in ROLE_PERMISSION_FIELDS:
+            if getattr(role, field_name):
+                permissions[field_name] = True
         
         # Add scope information if available
         if user_role.scope_type and user_role.scope_id:
@@ -276,6 +245,319 @@ def get_user_permissions(user):
     return permissions
 
 
+# Permission snapshot cache
+PERMISSION_VERSION_KEY = 'core:permissions:version'
+
+
+def _permission_cache():
+    """Cache backend holding permission snapshots (PERMISSION_CACHE_ALIAS setting)"""
+    return caches[getattr(settings, 'PERMISSION_CACHE_ALIAS', 'default')]
+
+
+def get_permissions_version():
+    """Current permission version; any role or rule change moves it forward"""
+    cache = _permission_cache()
+    version = cache.get(PERMISSION_VERSION_KEY)
+    if version is None:
+        # add() so concurrent workers agree on the first value
+        cache.add(PERMISSION_VERSION_KEY, 1, timeout=None)
+        version = cache.get(PERMISSION_VERSION_KEY, 1)
+    return version
+
+
+def bump_permissions_version():
+    """Invalidate every cached permission snapshot"""
+    cache = _permission_cache()
+    try:
+        return cache.incr(PERMISSION_VERSION_KEY)
+    except ValueError:
+        # Key expired or was evicted - start a fresh series
+        cache.set(PERMISSION_VERSION_KEY, 2, timeout=None)
+        return 2
+
+
+def get_cached_user_permissions(user):
+    """
+    Same result as get_user_permissions, served from a per-user snapshot
+    keyed by the permission version, so warm requests run no queries
+    """
+    cache = _permission_cache()
+    key = f"core:permissions:{get_permissions_version()}:{user.pk}"
+    permissions = cache.get(key)
+    
+    if permissions is None:
+        permissions = get_user_permissions(user)
+        cache.set(key, permissions, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300))
+    
+    return permissions
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+@receiver(post_save, sender=AttributeBasedPermission)
+@receiver(post_delete, sender=AttributeBasedPermission)
+def invalidate_permission_snapshots(sender, **kwargs):
+    bump_permissions_version()
+
+
+# Compiled ABAC rules
+UNRESOLVED = object()  # Placeholder that points at a missing user attribute
+
+
+def _user_memo(user, name):
+    """Dict stored on the user instance, i.e. living as long as the request"""
+    memo = getattr(user, name, None)
+    if memo is None:
+        memo = {}
+        setattr(user, name, memo)
+    return memo
+
+
+def resolve_condition_value(value, user):
+    """Replace a {user.x.y} placeholder with the user's attribute, once per request"""
+    if not ('{' in value and '}' in value):
+        return value
+    
+    placeholder = value[value.find('{')+1:value.find('}')]
+    placeholders = _user_memo(user, '_abac_placeholders')
+    
+    if placeholder not in placeholders:
+        parts = placeholder.split('.')
+        if parts[0] == 'user':
+            # {user.x} names the user itself, not a user.user attribute
+            parts = parts[1:]
+        
+        obj = user
+        for part in parts:
+            if hasattr(obj, part):
+                obj = getattr(obj, part)
+            else:
+                obj = UNRESOLVED
+                break
+        placeholders[placeholder] = obj
+    
+    return placeholders[placeholder]
+
+
+def _split_values(value):
+    # Assume value is a comma-separated list
+    return [v.strip() for v in value.split(',')] if isinstance(value, str) else value
+
+
+def build_condition_q(field_name, condition_type, value):
+    """Build the Q object for a single rule with an already resolved value"""
+    if value is UNRESOLVED:
+        # If attribute doesn't exist, return an impossible condition
+        return Q(pk=-1)
+    
+    if condition_type == 'EQUALS':
+        return Q(**{field_name: value})
+    elif condition_type == 'NOT_EQUALS':
+        return ~Q(**{field_name: value})
+    elif condition_type == 'IN':
+        return Q(**{f"{field_name}__in": _split_values(value)})
+    elif condition_type == 'NOT_IN':
+        return ~Q(**{f"{field_name}__in": _split_values(value)})
+    elif condition_type == 'GREATER_THAN':
+        return Q(**{f"{field_name}__gt": value})
+    elif condition_type == 'LESS_THAN':
+        return Q(**{f"{field_name}__lt": value})
+    # Text matches ignore case, as SQLite's LIKE does anyway; _condition_matches agrees
+    elif condition_type == 'CONTAINS':
+        return Q(**{f"{field_name}__icontains": value})
+    elif condition_type == 'STARTS_WITH':
+        return Q(**{f"{field_name}__istartswith": value})
+    elif condition_type == 'ENDS_WITH':
+        return Q(**{f"{field_name}__iendswith": value})
+    
+    # Default fallback - impossible condition
+    return Q(pk=-1)
+
+
+class InMemoryLookupError(Exception):
+    """A rule cannot be evaluated on the loaded instance without a query"""
+
+
+def _loaded_value(obj, field_name):
+    """
+    Follow a rule's lookup path on an already loaded instance
+    Returns (value, field); relations are only followed when already cached
+    """
+    parts = field_name.split('__')
+    current = obj
+    
+    for index, part in enumerate(parts):
+        opts = current._meta
+        try:
+            field = opts.pk if part == 'pk' else opts.get_field(part)
+        except FieldDoesNotExist:
+            raise InMemoryLookupError(field_name)
+        
+        if not field.concrete or field.many_to_many:
+            raise InMemoryLookupError(field_name)
+        
+        remaining = parts[index + 1:]
+        if not field.is_relation:
+            if remaining:
+                # Transforms such as __year are left to the database
+                raise InMemoryLookupError(field_name)
+            return getattr(current, field.attname), field
+        
+        target = field.target_field
+        fk_value = getattr(current, field.attname)
+        
+        # relation, relation_id and relation__pk all compare the stored key
+        if not remaining or remaining in (['pk'], [target.name]):
+            return fk_value, target
+        
+        if fk_value is None:
+            return None, None
+        
+        if not field.is_cached(current):
+            raise InMemoryLookupError(field_name)
+        current = getattr(current, field.name)
+    
+    raise InMemoryLookupError(field_name)
+
+
+def _condition_matches(actual, field, condition_type, value):
+    """Python equivalent of build_condition_q for one loaded value (SQL NULL semantics)"""
+    if value is UNRESOLVED:
+        return False
+    
+    def coerce(raw):
+        if isinstance(raw, models.Model):
+            raw = raw.pk
+        if field is None or raw is None:
+            return raw
+        try:
+            return field.to_python(raw)
+        except ValidationError:
+            raise InMemoryLookupError(field.name)
+    
+    if condition_type in ('EQUALS', 'NOT_EQUALS'):
+        expected = coerce(value)
+        equal = actual is None if expected is None else (actual is not None and actual == expected)
+        return equal if condition_type == 'EQUALS' else not equal
+    
+    if condition_type in ('IN', 'NOT_IN'):
+        found = actual is not None and actual in [coerce(v) for v in _split_values(value)]
+        return found if condition_type == 'IN' else not found
+    
+    if actual is None:
+        return False
+    
+    try:
+        if condition_type == 'GREATER_THAN':
+            return actual > coerce(value)
+        elif condition_type == 'LESS_THAN':
+            return actual < coerce(value)
+    except TypeError:
+        raise InMemoryLookupError(condition_type)
+    
+    # Case-insensitive, like the __icontains / __istartswith / __iendswith lookups
+    text, expected = str(actual).casefold(), str(value).casefold()
+    if condition_type == 'CONTAINS':
+        return expected in text
+    elif condition_type == 'STARTS_WITH':
+        return text.startswith(expected)
+    elif condition_type == 'ENDS_WITH':
+        return text.endswith(expected)
+    
+    return False
+
+
+class CompiledRules:
+    """
+    A user's ABAC rules for one model and action, compiled into a single Q
+    with placeholders already resolved
+    """
+    
+    def __init__(self, model, rules, user):
+        self.model = model
+        self.conditions = [
+            (field_name, condition_type, resolve_condition_value(condition_value, user))
+            for field_name, condition_type, condition_value in rules
+        ]
+        
+        # Combine all permission Q objects with OR
+        self.q = Q(pk=-1)  # Start with an impossible condition
+        for field_name, condition_type, value in self.conditions:
+            self.q |= build_condition_q(field_name, condition_type, value)
+    
+    def __bool__(self):
+        return bool(self.conditions)
+    
+    def matches(self, obj):
+        """Check a loaded instance in Python; falls back to one query if a rule needs a join"""
+        try:
+            for field_name, condition_type, value in self.conditions:
+                actual, field = _loaded_value(obj, field_name)
+                if _condition_matches(actual, field, condition_type, value):
+                    return True
+            return False
+        except InMemoryLookupError:
+            return self.model._default_manager.filter(self.q, pk=obj.pk).exists()
+
+
+def get_user_role_ids(user):
+    """Ids of the user's active roles, cached alongside the permission snapshot"""
+    cache = _permission_cache()
+    key = f"core:permissions:{get_permissions_version()}:{user.pk}:roles"
+    role_ids = cache.get(key)
+    
+    if role_ids is None:
+        role_ids = tuple(sorted(set(
+            UserRole.objects.filter(user=user, is_active=True).values_list('role_id', flat=True)
+        )))
+        cache.set(key, role_ids, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300))
+    
+    return role_ids
+
+
+def _get_role_rules(role_ids, content_type_id, action):
+    """Raw (field, condition, value) rules for a set of roles, shared by every user holding them"""
+    if not role_ids:
+        return ()
+    
+    cache = _permission_cache()
+    roles_key = '-'.join(str(role_id) for role_id in role_ids)
+    key = f"core:abac:{get_permissions_version()}:{content_type_id}:{action}:{roles_key}"
+    rules = cache.get(key)
+    
+    if rules is None:
+        rules = tuple(AttributeBasedPermission.objects.filter(
+            role_id__in=role_ids,
+            content_type_id=content_type_id,
+            permission_action=action
+        ).order_by('pk').values_list('field_name', 'condition_type', 'condition_value'))
+        cache.set(key, rules, getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300))
+    
+    return rules
+
+
+def compile_rules(user, model, action='VIEW'):
+    """CompiledRules for (model, action), memoised on the user for the rest of the request"""
+    compiled = _user_memo(user, '_abac_compiled')
+    key = (model, action)
+    
+    if key not in compiled:
+        content_type = ContentType.objects.get_for_model(model)
+        rules = _get_role_rules(get_user_role_ids(user), content_type.pk, action)
+        compiled[key] = CompiledRules(model, rules, user)
+    
+    return compiled[key]
+
+
+def _has_blanket_permission(user, model, action):
+    # Blanket permissions like can_manage_users, can_view_all_files, etc.
+    model_name = model.__name__.lower()
+    blanket_perm_name = f"can_{'manage' if action in ('CHANGE', 'ADD', 'DELETE') else 'view_all'}_{model_name}s"
+    return get_cached_user_permissions(user).get(blanket_perm_name, False)
+
+
 def can_access_object(user, obj, action='VIEW'):
     """
     Check if a user can access a specific object based on ABAC rules
@@ -288,51 +570,14 @@ def can_access_object(user, obj, action='VIEW'):
     Returns:
     - True if the user can access the object, False otherwise
     """
-    # Get all active roles for the user
-    user_roles = UserRole.objects.filter(user=user, is_active=True)
-    role_ids = user_roles.values_list('role_id', flat=True)
-    
-    # Get the model name
-    model_name = obj.__class__.__name__.lower()
-    content_type = ContentType.objects.get_for_model(obj.__class__)
-    
-    # Check attribute-based permissions
-    attribute_permissions = AttributeBasedPermission.objects.filter(
-        role_id__in=role_ids,
-        content_type=content_type,
-        permission_action=action
-    )
+    rules = compile_rules(user, obj.__class__, action)
     
     # If no specific permissions exist, check if user has a role with blanket permission
-    if not attribute_permissions.exists():
-        # Check for blanket permissions like can_manage_users, can_view_all_files, etc.
-        blanket_perm_name = f"can_{'manage' if action in ('CHANGE', 'ADD', 'DELETE') else 'view_all'}_{model_name}s"
-        
-        for role_id in role_ids:
-            try:
-                role = Role.objects.get(id=role_id)
-                if hasattr(role, blanket_perm_name) and getattr(role, blanket_perm_name):
-                    return True
-            except (Role.DoesNotExist, AttributeError):
-                continue
-        
-        # If we're here, there are no blanket permissions either
-        # Default to False for most objects
-        return False
-    
-    # Check each permission rule
-    for permission in attribute_permissions:
-        # Convert permission to Q object and check if the object matches
-        q_obj = permission.get_q_object(user)
-        
-        # Get model class and check if object matches the condition
-        model_class = obj.__class__
-        query = model_class.objects.filter(q_obj, pk=obj.pk)
-        
-        if query.exists():
-            return True
+    if not rules:
+        return _has_blanket_permission(user, obj.__class__, action)
     
-    return False
+    # Evaluated against the loaded instance, without a query per rule
+    return rules.matches(obj)
 
 
 def filter_queryset_by_permissions(user, queryset, action='VIEW'):
@@ -347,42 +592,17 @@ def filter_queryset_by_permissions(user, queryset, action='VIEW'):
     Returns:
     - Filtered queryset with only objects the user can access
     """
-    # Get all active roles for the user
-    user_roles = UserRole.objects.filter(user=user, is_active=True)
-    role_ids = user_roles.values_list('role_id', flat=True)
-    
-    # Get the model name
     model = queryset.model
-    model_name = model.__name__.lower()
-    content_type = ContentType.objects.get_for_model(model)
     
     # Check if user has blanket permission
-    blanket_perm_name = f"can_{'manage' if action in ('CHANGE', 'ADD', 'DELETE') else 'view_all'}_{model_name}s"
+    if _has_blanket_permission(user, model, action):
+        return queryset  # User can access all objects
     
-    for role_id in role_ids:
-        try:
-            role = Role.objects.get(id=role_id)
-            if hasattr(role, blanket_perm_name) and getattr(role, blanket_perm_name):
-                return queryset  # User can access all objects
-        except (Role.DoesNotExist, AttributeError):
-            continue
-    
-    # Get attribute-based permissions
-    attribute_permissions = AttributeBasedPermission.objects.filter(
-        role_id__in=role_ids,
-        content_type=content_type,
-        permission_action=action
-    )
+    rules = compile_rules(user, model, action)
     
     # If no permissions, return empty queryset
-    if not attribute_permissions.exists():
+    if not rules:
         return queryset.none()
     
-    # Combine all permission Q objects with OR
-    combined_q = Q(pk=-1)  # Start with an impossible condition
-    
-    for permission in attribute_permissions:
-        combined_q |= permission.get_q_object(user)
-    
     # Apply the combined filter
-    return queryset.filter(combined_q)
\ No newline at end of file
+    return queryset.filter(rules.q)
@@ -0,0 +1,172 @@
+"""
+Reference data cache
+
+Departments, units, states, LGAs, banks, PFAs, designations and zones change
+a few times a year but feed dropdowns on almost every page. Each table is
+loaded once per process into a tuple of small immutable records and reused
+until a save or delete on any of them bumps the shared version in the cache,
+which makes every process reload on its next access.
+
+Bulk writes (bulk_create/update) skip signals; call invalidate_reference_data()
+after them.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Department, Unit, Zone, State, LGA, Bank, PFA, Designation
+
+
+REFERENCE_VERSION_KEY = 'core:reference_data:version'
+
+
+def reference_record(name, fields):
+    """Immutable row type with the pk alias and str() templates expect from model instances"""
+    base = namedtuple(name, fields)
+    return type(name, (base,), {
+        '__slots__': (),
+        'pk': property(lambda self: self.id),
+        '__str__': lambda self: self.name,
+    })
+
+
+DepartmentRef = reference_record('DepartmentRef', 'id code name type parent_id')
+UnitRef = reference_record('UnitRef', 'id code name department_id')
+ZoneRef = reference_record('ZoneRef', 'id code name')
+StateRef = reference_record('StateRef', 'id code name zone_id')
+LGARef = reference_record('LGARef', 'id code name state_id')
+BankRef = reference_record('BankRef', 'id code name')
+PFARef = reference_record('PFARef', 'id code name')
+DesignationRef = reference_record('DesignationRef', 'id code name grade_level department_id')
+
+# table name -> (model, record type)
+REFERENCE_TABLES = {
+    'departments': (Department, DepartmentRef),
+    'units': (Unit, UnitRef),
+    'zones': (Zone, ZoneRef),
+    'states': (State, StateRef),
+    'lgas': (LGA, LGARef),
+    'banks': (Bank, BankRef),
+    'pfas': (PFA, PFARef),
+    'designations': (Designation, DesignationRef),
+}
+
+_loaded = {'version': None, 'tables': {}, 'groups': {}}
+
+
+def get_reference_version():
+    cache.add(REFERENCE_VERSION_KEY, 1, None)
+    return cache.get(REFERENCE_VERSION_KEY, 1)
+
+
+def invalidate_reference_data():
+    """Make every process reload the reference tables on next access"""
+    try:
+        cache.incr(REFERENCE_VERSION_KEY)
+    except ValueError:
+        cache.set(REFERENCE_VERSION_KEY, 2, None)
+    _loaded['tables'].clear()
+    _loaded['groups'].clear()
+
+
+def _current_tables():
+    version = get_reference_version()
+    if version != _loaded['version']:
+        _loaded['version'] = version
+        _loaded['tables'].clear()
+        _loaded['groups'].clear()
+    return _loaded['tables']
+
+
+def get_reference_table(name):
+    """All rows of a reference table as a tuple of records ordered by name"""
+    tables = _current_tables()
+    if name not in tables:
+        model, record = REFERENCE_TABLES[name]
+        tables[name] = tuple(
+            record(*row) for row in model.objects.order_by('name').values_list(*record._fields)
+        )
+    return tables[name]
+
+
+def _grouped(name, key):
+    """Rows of a table grouped by a foreign key, built once per load"""
+    rows = get_reference_table(name)
+    groups = _loaded['groups']
+    if (name, key) not in groups:
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(getattr(row, key), []).append(row)
+        groups[(name, key)] = {group: tuple(items) for group, items in grouped.items()}
+    return groups[(name, key)]
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_departments():
+    return get_reference_table('departments')
+
+
+def get_department(department_id):
+    return next((row for row in get_departments() if row.id == _to_id(department_id)), None)
+
+
+def get_units(department_id=None):
+    if department_id is None:
+        return get_reference_table('units')
+    return _grouped('units', 'department_id').get(_to_id(department_id), ())
+
+
+def get_zones():
+    return get_reference_table('zones')
+
+
+def get_states():
+    return get_reference_table('states')
+
+
+def get_lgas(state_id=None):
+    if state_id is None:
+        return get_reference_table('lgas')
+    return _grouped('lgas', 'state_id').get(_to_id(state_id), ())
+
+
+def get_banks():
+    return get_reference_table('banks')
+
+
+def get_pfas():
+    return get_reference_table('pfas')
+
+
+def get_designations():
+    return get_reference_table('designations')
+
+
+class ReferenceData:
+    """Template access to the cached tables; nothing is loaded until a table is used"""
+
+    def __getattr__(self, name):
+        if name not in REFERENCE_TABLES:
+            raise AttributeError(name)
+        return get_reference_table(name)
+
+
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Unit)
+@receiver([post_save, post_delete], sender=Zone)
+@receiver([post_save, post_delete], sender=State)
+@receiver([post_save, post_delete], sender=LGA)
+@receiver([post_save, post_delete], sender=Bank)
+@receiver([post_save, post_delete], sender=PFA)
+@receiver([post_save, post_delete], sender=Designation)
+def reference_table_changed(sender, **kwargs):
+    """Invalidate the cached reference tables when any of them changes"""
+    invalidate_reference_data()
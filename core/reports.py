@@ -0,0 +1,76 @@
+"""
+Report aggregation
+
+Summary reports group a queryset by one or two fields and total a value for
+each group. The grouping runs in the database with values().annotate(), so a
+report holds one entry per group no matter how many records feed it.
+"""
+from .reference_data import DepartmentRef, get_department
+
+
+NO_DEPARTMENT = DepartmentRef(id=None, code='', name='No Department', type=None, parent_id=None)
+
+
+class Matrix:
+    """
+    Totals keyed by (row, column) with row, column and grand totals
+    - rows / columns: keys that have data, in first-seen order
+    - cell(row, column): the total for one pair, 0 when there is none
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.rows = []
+        self.columns = []
+        self.row_totals = {}
+        self.column_totals = {}
+        self.total = 0
+
+    def add(self, row, column, value):
+        value = value or 0
+        if row not in self.row_totals:
+            self.rows.append(row)
+            self.row_totals[row] = 0
+        if column not in self.column_totals:
+            self.columns.append(column)
+            self.column_totals[column] = 0
+
+        self.cells[(row, column)] = self.cells.get((row, column), 0) + value
+        self.row_totals[row] += value
+        self.column_totals[column] += value
+        self.total += value
+
+    def cell(self, row, column):
+        return self.cells.get((row, column), 0)
+
+    def row(self, row, columns=None):
+        """One row as {column: total}, over the given columns or every column with data"""
+        return {column: self.cell(row, column) for column in (columns or self.columns)}
+
+    def sort_rows(self, key=None, reverse=False):
+        self.rows.sort(key=key, reverse=reverse)
+        return self
+
+
+def pivot(queryset, row, column, value):
+    """Total value (an aggregate such as Sum or Count) for every row x column pair"""
+    matrix = Matrix()
+    # order_by() drops the model's default ordering, which would otherwise split the groups
+    for entry in queryset.order_by().values(row, column).annotate(total=value).order_by(row, column):
+        matrix.add(entry[row], entry[column], entry['total'])
+    return matrix
+
+
+def group_totals(queryset, field, **aggregates):
+    """One dict per distinct value of field with the given aggregates"""
+    return list(queryset.order_by().values(field).annotate(**aggregates).order_by(field))
+
+
+def department_label(department_id):
+    """Cached department record, or a stand-in for rows without a department"""
+    return (get_department(department_id) if department_id else None) or NO_DEPARTMENT
+
+
+def by_department_name(department_id):
+    """Sort key: departments by name with 'No Department' last"""
+    return department_id is None, department_label(department_id).name
@@ -0,0 +1,67 @@
+"""
+Retirement dates
+
+Staff retire at RETIREMENT_AGE or after MAX_YEARS_OF_SERVICE from assumption
+of duty, whichever comes first. Years are calendar years: a birthday on
+29 February falls on 28 February in years that have none.
+
+EmployeeProfile.clean() uses retirement_date() for one profile; bulk writes
+(staff import, ingest_staff_data) skip clean(), so recalculate_retirement_dates()
+recomputes whole batches and writes only the rows that changed with
+update_rows() (see core.bulk), one statement per batch instead of the
+CASE WHEN per row that bulk_update() builds.
+"""
+from django.db import transaction
+
+from .bulk import update_rows
+from .models import EmployeeProfile
+
+
+RETIREMENT_AGE = 60
+MAX_YEARS_OF_SERVICE = 35
+READ_CHUNK_SIZE = 5000
+
+
+def add_years(day, years):
+    """The same calendar day years later (28 February for 29 February in a common year)"""
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        return day.replace(year=day.year + years, day=28)
+
+
+def retirement_date(date_of_birth, date_of_assumption):
+    """Earlier of the age and service limits, from whichever dates are known; None without either"""
+    limits = []
+    if date_of_birth:
+        limits.append(add_years(date_of_birth, RETIREMENT_AGE))
+    if date_of_assumption:
+        limits.append(add_years(date_of_assumption, MAX_YEARS_OF_SERVICE))
+    return min(limits) if limits else None
+
+
+def retirement_date_changes(queryset=None):
+    """(profile id, stored date, recomputed date) for every profile whose stored date is wrong"""
+    queryset = EmployeeProfile.objects.all() if queryset is None else queryset
+    rows = queryset.order_by().values_list('pk', 'date_of_birth', 'date_of_assumption', 'date_of_retirement')
+
+    changes = []
+    for pk, date_of_birth, date_of_assumption, stored in rows.iterator(chunk_size=READ_CHUNK_SIZE):
+        computed = retirement_date(date_of_birth, date_of_assumption)
+        if computed != stored:
+            changes.append((pk, stored, computed))
+    return changes
+
+
+def write_retirement_dates(values):
+    """Store (profile id, date) pairs, a batch of rows per UPDATE statement"""
+    update_rows(EmployeeProfile, ['date_of_retirement'], values)
+
+
+def recalculate_retirement_dates(queryset=None, dry_run=False):
+    """Recompute retirement dates for queryset (default: every profile); returns the changes"""
+    changes = retirement_date_changes(queryset)
+    if changes and not dry_run:
+        with transaction.atomic():
+            write_retirement_dates([(pk, computed) for pk, stored, computed in changes])
+    return changes
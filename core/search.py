@@ -0,0 +1,244 @@
+"""
+Search indexes
+
+Staff and file search look terms up in a small per-model search table instead
+of OR-ing icontains lookups across joined tables:
+- SQLite: an FTS5 table with the trigram tokenizer (SQLite 3.34+)
+- PostgreSQL: a plain table with pg_trgm GIN indexes, so ILIKE '%term%' is
+  answered from the index
+
+Both match a term anywhere inside a column, ignoring case, like icontains.
+Terms shorter than MIN_TERM_LENGTH have no trigrams and fall back to the
+icontains lookups, as does any other database.
+
+Each app declares its indexes with register() and keeps them current with
+signals. bulk_create/bulk_update and queryset.update() skip signals; call
+index_objects() afterwards or run "manage.py rebuild_search_index".
+"""
+import sqlite3
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import EmployeeProfile
+from .tracking import fields_changed, remember_fields
+
+
+MIN_TERM_LENGTH = 3
+INDEX_BATCH_SIZE = 500
+
+SEARCH_INDEXES = {}
+
+
+class SearchIndex:
+    """
+    A search table for one model
+    - columns: the text columns stored per object, keyed by the object's pk
+    - documents(queryset): yields (pk, {column: text}) for the objects in queryset
+    - lookups: the icontains lookups used when the index cannot answer a term
+    """
+
+    def __init__(self, name, model, table, columns, documents, lookups):
+        self.name = name
+        self.model = model
+        self.table = table
+        self.columns = columns
+        self.documents = documents
+        self.lookups = lookups
+
+
+def register(index):
+    SEARCH_INDEXES[index.name] = index
+    return index
+
+
+def search_backend(db=connection):
+    """'fts5', 'trigram' or None when the database has no supported search backend"""
+    if db.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0):
+        return 'fts5'
+    if db.vendor == 'postgresql':
+        return 'trigram'
+    return None
+
+
+def create_search_table(db, index):
+    """Create the index table (used by the migrations that add an index)"""
+    backend = search_backend(db)
+    table = db.ops.quote_name(index.table)
+    columns = [db.ops.quote_name(column) for column in index.columns]
+
+    with db.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({', '.join(columns)}, tokenize='trigram')")
+        elif backend == 'trigram':
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE TABLE {table} (id bigint PRIMARY KEY, "
+                + ', '.join(f"{column} text NOT NULL DEFAULT ''" for column in columns) + ")"
+            )
+            for name, column in zip(index.columns, columns):
+                trigram_index = db.ops.quote_name(f'{index.table}_{name}_trgm')
+                cursor.execute(f"CREATE INDEX {trigram_index} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def drop_search_table(db, index):
+    if search_backend(db):
+        with db.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {db.ops.quote_name(index.table)}")
+
+
+def key_column(backend):
+    # FTS5 tables key their rows on the built-in rowid
+    return 'rowid' if backend == 'fts5' else 'id'
+
+
+def batches(values, size=INDEX_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def write_documents(index, documents):
+    backend = search_backend()
+    table = connection.ops.quote_name(index.table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in index.columns)
+    placeholders = ', '.join(['%s'] * (len(index.columns) + 1))
+    rows = [[pk] + [texts.get(column) or '' for column in index.columns] for pk, texts in documents]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} ({key_column(backend)}, {columns}) VALUES ({placeholders})", rows
+            )
+    return len(rows)
+
+
+def remove_objects(name, pks):
+    """Drop objects from an index"""
+    index = SEARCH_INDEXES[name]
+    backend = search_backend()
+    if not backend:
+        return
+    table = connection.ops.quote_name(index.table)
+    with connection.cursor() as cursor:
+        for batch in batches(pks):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {key_column(backend)} IN ({', '.join(['%s'] * len(batch))})", batch
+            )
+
+
+def index_objects(name, pks):
+    """Re-index the given objects; pks that no longer exist are removed"""
+    index = SEARCH_INDEXES[name]
+    if not search_backend():
+        return
+    for batch in batches(pks):
+        remove_objects(name, batch)
+        write_documents(index, index.documents(index.model.objects.filter(pk__in=batch)))
+
+
+def rebuild_index(name):
+    """Replace the whole index from the model table; returns the number of objects indexed"""
+    index = SEARCH_INDEXES[name]
+    if not search_backend():
+        return 0
+    indexed = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(index.table)}")
+        pks = index.model.objects.order_by('pk').values_list('pk', flat=True)
+        for batch in batches(pks):
+            indexed += write_documents(index, index.documents(index.model.objects.filter(pk__in=batch)))
+    return indexed
+
+
+def match_sql(index, term):
+    """SQL selecting the pks whose indexed text contains term, or (None, None)"""
+    backend = search_backend()
+    if backend is None or len(term) < MIN_TERM_LENGTH:
+        return None, None
+
+    table = connection.ops.quote_name(index.table)
+    if backend == 'fts5':
+        # One quoted phrase: with the trigram tokenizer it matches as a substring
+        phrase = '"' + term.replace('"', '""') + '"'
+        return f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [phrase]
+
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    columns = [connection.ops.quote_name(column) for column in index.columns]
+    return (
+        f"SELECT id FROM {table} WHERE " + ' OR '.join(f"{column} ILIKE %s" for column in columns),
+        [pattern] * len(columns),
+    )
+
+
+def search_filter(name, term, field='pk'):
+    """
+    Q limiting a queryset to objects whose indexed text contains term;
+    field is the path from the queryset's model to the indexed model
+    """
+    index = SEARCH_INDEXES[name]
+    term = term.strip()
+    sql, params = match_sql(index, term)
+    if sql is not None:
+        return Q(**{f'{field}__in': RawSQL(sql, params)})
+
+    # The fallback lookups run in a subquery so joins cannot duplicate rows
+    matches = Q()
+    for lookup in index.lookups:
+        matches |= Q(**{f'{lookup}__icontains': term})
+    return Q(**{f'{field}__in': index.model.objects.filter(matches).values('pk')})
+
+
+def staff_documents(queryset):
+    for pk, first_name, middle_name, last_name, file_number, ippis_number in queryset.values_list(
+        'pk', 'user__first_name', 'middle_name', 'user__last_name', 'file_number', 'ippis_number'
+    ):
+        yield pk, {
+            'name': ' '.join(part for part in (first_name, middle_name, last_name) if part),
+            'file_number': file_number,
+            'ippis_number': ippis_number,
+        }
+
+
+register(SearchIndex(
+    'staff', EmployeeProfile, 'core_staff_search', ('name', 'file_number', 'ippis_number'), staff_documents,
+    lookups=('user__first_name', 'middle_name', 'user__last_name', 'file_number', 'ippis_number'),
+))
+
+
+# The fields each staff document is built from, per model
+STAFF_TEXT_FIELDS = {
+    EmployeeProfile: ('middle_name', 'file_number', 'ippis_number'),
+    User: ('first_name', 'last_name'),
+}
+
+
+# Remember the indexed text each profile and user was loaded with
+@receiver(post_init, sender=EmployeeProfile)
+@receiver(post_init, sender=User)
+def remember_staff_text(sender, instance, **kwargs):
+    remember_fields(instance, '_search_text', STAFF_TEXT_FIELDS[sender])
+
+
+# Saving a User also saves its profile (on every login, for last_login), so
+# only saves that change the indexed text touch the index
+@receiver(post_save, sender=EmployeeProfile)
+def index_staff(sender, instance, created, raw=False, **kwargs):
+    if not raw and (fields_changed(instance, '_search_text', STAFF_TEXT_FIELDS[sender]) or created):
+        index_objects('staff', [instance.pk])
+
+
+@receiver(post_save, sender=User)
+def index_staff_name(sender, instance, created, raw=False, **kwargs):
+    # A new user's profile is indexed when it is created
+    if not raw and fields_changed(instance, '_search_text', STAFF_TEXT_FIELDS[sender]) and not created:
+        index_objects('staff', EmployeeProfile.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def remove_staff(sender, instance, **kwargs):
+    remove_objects('staff', [instance.pk])
@@ -0,0 +1,328 @@
+"""
+Staff nominal roll parsing
+
+Turns the per-state nominal roll workbooks in data/staff_data into clean
+staff records. This module deliberately does not touch the ORM: parse_workbook()
+runs inside worker processes, and the reference code tables it needs are
+passed in as plain dictionaries built once by the caller (see CodeMaps).
+"""
+import os
+import re
+import time
+from datetime import date, datetime, timedelta
+
+from openpyxl import load_workbook
+
+
+# Normalised spreadsheet header -> record field
+HEADER_ALIASES = {
+    'SURNAME': 'last_name',
+    'SURNNAME': 'last_name',
+    'LAST NAME': 'last_name',
+    'FULL NAME': 'full_name',
+    'FIRST NAME': 'first_name',
+    'MIDDLE NAME': 'middle_name',
+    'OTHERS': 'middle_name',
+    'FILE NUMBER': 'file_number',
+    'FILE NUMBERS': 'file_number',
+    'FILE/ID NO': 'file_number',
+    'HQ FILE NO NUMBER': 'file_number',
+    'IPPIS EMPLOYEE NUMBER': 'ippis_number',
+    'IPPIS NO': 'ippis_number',
+    'IPPIS NUMBER': 'ippis_number',
+    'DATE OF BIRTH': 'date_of_birth',
+    'SEX': 'sex',
+    'SEX (M/F)': 'sex',
+    'MARITAL STATUS': 'marital_status',
+    'STATE OF ORIGIN': 'state_of_origin',
+    'STATE OF ORGIN': 'state_of_origin',
+    'LGA': 'lga_of_origin',
+    'LGA OF ORIGIN': 'lga_of_origin',
+    'LOCAL GOVT. OF ORIGIN': 'lga_of_origin',
+    'DEPARTMENT': 'department',
+    'STAFF LOCATION': 'location',
+    'STAFF LOCATION/DEPARTMENT': 'location',
+    'STAFF LOCATION/DEPT': 'location',
+    'LOCATION/DEPARTMENT': 'location',
+    'PRESENT LOCATION': 'location',
+    'HIGHEST QUAL.': 'qualification',
+    'HIGHEST QUALIFICATION': 'qualification',
+    'HIGHEST QUALIFICATIONS': 'qualification',
+    'RANK': 'rank',
+    'CURRENT DESIGNATION': 'rank',
+    'DESIGNATION': 'rank',
+    'DATE OF 1ST APPT.': 'date_of_appointment',
+    'DATE OF FIRST APPOINT.': 'date_of_appointment',
+    'DATE OF FIRST APPOINTMENT': 'date_of_appointment',
+    'DATE OF FIRST APPT.': 'date_of_appointment',
+    'DATE OF PRESENT APPT': 'date_of_present_appointment',
+    'DATE OF PRESENT APPOINT.': 'date_of_present_appointment',
+    'DATE OF PRESENT APPOINTMENT': 'date_of_present_appointment',
+    'DATE OF PRESENT APPT.': 'date_of_present_appointment',
+    'GL/S': 'grade_step',
+    'GL/STEP': 'grade_step',
+    'GL/STEPS': 'grade_step',
+    'GRADE LEVEL': 'grade_step',
+    'CURRENT GRADE LEVEL': 'grade_level',
+    'CURRENT STEP': 'step',
+    'E-MAIL': 'email',
+    'EMAIL': 'email',
+    'GSM': 'phone_number',
+    'PHONE NUMBER': 'phone_number',
+    'TELEPHONE': 'phone_number',
+    'NIN': 'nin',
+}
+
+MARITAL_STATUS_CODES = {'S': 'S', 'SINGLE': 'S', 'M': 'M', 'MARRIED': 'M',
+                        'D': 'D', 'DIVORCED': 'D', 'W': 'W', 'WIDOW': 'W', 'WIDOWED': 'W', 'WIDOWER': 'W'}
+
+# Checked in order, so higher qualifications win when several appear
+QUALIFICATION_PATTERNS = [
+    ('DOR', r'\bPH\.?\s?D\b'),
+    ('MAS', r'\bM\.?\s?(SC|A|ED|BA|PA|PH|IL|ENG|TECH)\b'),
+    ('BAC', r'\bB\.?\s?(SC|A|ED|ENG|TECH|AGRIC|PHARM|L)\b|\bLL\.?B\b|\bB\.ED'),
+    ('HND', r'\bHND\b'),
+    ('OND', r'\bO?ND\b|\bNCE\b'),
+    ('SSCE', r'\bSSCE?\b|\bWAEC\b|\bGCE\b|\bNECO\b'),
+    ('JSCE', r'\bJSCE\b'),
+    ('FSLC', r'\bFSLC\b'),
+]
+
+HEADER_SCAN_ROWS = 10
+
+
+class CodeMaps:
+    """
+    Reference code tables as plain dictionaries, built once and shipped to workers
+    - states / departments / designations: normalised name or code -> id
+    - lgas: (state id, normalised name) -> id, plus name -> id for unambiguous names
+    - zones: normalised name or code -> id; state_zones: state id -> zone id
+    """
+
+    def __init__(self, states, lgas, departments, designations, zones, state_zones):
+        self.states = states
+        self.lgas = lgas
+        self.departments = departments
+        self.designations = designations
+        self.zones = zones
+        self.state_zones = state_zones
+
+
+def normalise(value):
+    """Upper-case and collapse whitespace, dropping non-breaking spaces"""
+    if value is None:
+        return ''
+    return ' '.join(str(value).replace('\xa0', ' ').split()).upper()
+
+
+def normalise_header(value):
+    header = normalise(value).replace('_', ' ')
+    return re.sub(r'\s*(/\s*)+', '/', header)
+
+
+def parse_date(value):
+    """Accept datetime cells, Excel serial numbers and d/m/Y strings"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, (int, float)):
+        if 1 < value < 100000:
+            return date(1899, 12, 30) + timedelta(days=int(value))
+        return None
+
+    text = normalise(value).replace('-', '/').replace('.', '/')
+    for fmt in ('%d/%m/%Y', '%d/%m/%y', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_code(value, max_length):
+    """Numeric identifiers arrive as ints, floats or strings; keep the digits as text"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, float):
+        value = int(value)
+    text = normalise(value)
+    if not text or len(text) > max_length:
+        return None
+    return text
+
+
+def parse_int(value, low, high):
+    try:
+        number = int(float(normalise(value)))
+    except ValueError:
+        return None
+    return number if low <= number <= high else None
+
+
+def parse_phone_number(value):
+    digits = re.sub(r'\D', '', str(value or ''))
+    if len(digits) == 10:
+        # Leading zero lost when the column was stored as a number
+        digits = '0' + digits
+    return digits if len(digits) == 11 else ''
+
+
+def parse_qualification(value):
+    text = normalise(value)
+    for code, pattern in QUALIFICATION_PATTERNS:
+        if re.search(pattern, text):
+            return code
+    return None
+
+
+def workbook_location(path, code_maps):
+    """Work out the state (or zone) a workbook covers from its file name"""
+    name = normalise(re.sub(r'-\d+$', '', os.path.splitext(os.path.basename(path))[0]))
+    state_id = code_maps.states.get(name)
+    if state_id:
+        return state_id, code_maps.state_zones.get(state_id)
+
+    # Zonal office rolls are named after the zone code, e.g. NCZ
+    zone_id = code_maps.zones.get(name[:-1]) if name.endswith('Z') else None
+    return None, zone_id
+
+
+def find_header(rows):
+    """Return (index, field per column) for the first row that looks like a header"""
+    for index, row in enumerate(rows):
+        columns = [HEADER_ALIASES.get(normalise_header(cell)) for cell in row]
+        if 'file_number' in columns and ('last_name' in columns or 'full_name' in columns):
+            return index, columns
+    return None, None
+
+
+def department_from_location(record, code_maps):
+    """Resolve the department from 'DEPARTMENT' or codes like 'Lagos ( HR)' / 'HQ(INSP.)'"""
+    candidates = [record.get('department')]
+    location = normalise(record.get('location'))
+    candidates += re.findall(r'\(\s*([^)]*?)\s*\)', location)
+    candidates.append(location)
+
+    for candidate in candidates:
+        code = normalise(candidate).rstrip('.')
+        for key in (code, code.replace(' ', '')):
+            if key in code_maps.departments:
+                return code_maps.departments[key]
+    return None
+
+
+def normalise_record(raw, code_maps, state_id, zone_id):
+    """Turn one spreadsheet row into model field values, or None if it is not a staff row"""
+    if raw.get('full_name') and not raw.get('last_name'):
+        # Full names are written surname first
+        names = normalise(raw['full_name']).split()
+        raw['last_name'], raw['first_name'] = names[0], names[-1] if len(names) > 1 else ''
+        raw['middle_name'] = ' '.join(names[1:-1])
+
+    file_number = parse_code(raw.get('file_number'), 7)
+    last_name = normalise(raw.get('last_name')).title()
+    if not file_number or not last_name:
+        return None
+
+    state_of_origin_id = code_maps.states.get(normalise(raw.get('state_of_origin')))
+    lga_name = normalise(raw.get('lga_of_origin'))
+    lga_of_origin_id = (
+        code_maps.lgas.get((state_of_origin_id, lga_name)) or code_maps.lgas.get((None, lga_name))
+    )
+
+    grade_level, step = raw.get('grade_level'), raw.get('step')
+    if raw.get('grade_step'):
+        grade_level, _, step = normalise(raw['grade_step']).partition('/')
+
+    sex = normalise(raw.get('sex'))[:1]
+
+    return {
+        'file_number': file_number,
+        'user': {
+            'first_name': normalise(raw.get('first_name')).title()[:150],
+            'last_name': last_name[:150],
+            'email': normalise(raw.get('email')).lower()[:254],
+        },
+        'profile': {
+            'middle_name': normalise(raw.get('middle_name')).strip('-').title()[:30] or None,
+            'ippis_number': parse_code(raw.get('ippis_number'), 10),
+            'nin': parse_code(raw.get('nin'), 11),
+            'sex': sex if sex in ('M', 'F') else None,
+            'marital_status': MARITAL_STATUS_CODES.get(normalise(raw.get('marital_status'))),
+            'date_of_birth': parse_date(raw.get('date_of_birth')),
+            'phone_number': parse_phone_number(raw.get('phone_number')),
+            'state_of_origin_id': state_of_origin_id,
+            'lga_of_origin_id': lga_of_origin_id,
+            'date_of_appointment': parse_date(raw.get('date_of_appointment')),
+            'date_of_present_appointment': parse_date(raw.get('date_of_present_appointment')),
+            'current_state_id': state_id,
+            'current_zone_id': zone_id,
+            'current_department_id': department_from_location(raw, code_maps),
+            'current_designation_id': code_maps.designations.get(normalise(raw.get('rank'))),
+            'current_grade_level': parse_int(grade_level, 1, 18) if grade_level else None,
+            'current_step': parse_int(step, 1, 15) if step else None,
+        },
+        'details': {
+            'highest_formal_eduation': parse_qualification(raw.get('qualification')),
+            'course_of_study': normalise(raw.get('qualification'))[:50] or None,
+        },
+    }
+
+
+def parse_workbook(path, code_maps):
+    """
+    Parse one workbook into normalised records
+
+    Runs in a worker process. Returns a dict with the records and timing so
+    the caller can report per-file metrics.
+    """
+    started = time.perf_counter()
+    result = {'path': path, 'records': [], 'skipped': 0, 'error': None}
+
+    try:
+        # read_only streams rows instead of building the whole sheet in memory
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except Exception as e:
+        result['error'] = str(e)
+        result['parse_seconds'] = time.perf_counter() - started
+        return result
+
+    try:
+        state_id, zone_id = workbook_location(path, code_maps)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+
+        head = []
+        for row in rows:
+            head.append(row)
+            if len(head) == HEADER_SCAN_ROWS:
+                break
+
+        header_index, columns = find_header(head)
+        if header_index is None:
+            result['error'] = 'No header row found'
+            return result
+
+        def body():
+            yield from head[header_index + 1:]
+            yield from rows
+
+        for row in body():
+            raw = {}
+            for field, cell in zip(columns, row):
+                # Keep the first non-empty value when a column is repeated
+                if field and raw.get(field) in (None, ''):
+                    raw[field] = cell
+
+            record = normalise_record(raw, code_maps, state_id, zone_id)
+            if record:
+                result['records'].append(record)
+            elif any(cell not in (None, '') for cell in row):
+                result['skipped'] += 1
+    finally:
+        workbook.close()
+        result['parse_seconds'] = time.perf_counter() - started
+
+    return result
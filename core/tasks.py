@@ -0,0 +1,44 @@
+"""
+Background tasks for the core app (run by the job workers, see core.jobs)
+"""
+from django.contrib.auth.models import User
+
+from .jobs import job_progress, task
+from .onboarding_views import account_email_message
+from .outbox import queue_messages
+from .staff_import import StaffImport
+
+
+@task('core.staff_import')
+def import_staff(job, rows, performed_by_id, reset_url=None, login_url=None):
+    """
+    Create staff accounts from uploaded CSV rows and queue their welcome emails
+    - The accounts have no password; the emails point to the password reset
+      page (jobs queued before reset_url existed point to the login page)
+    - Each chunk's emails are queued in the chunk's transaction, so accounts
+      committed before a failure already have their mail in the outbox
+    - A retry re-validates every row, so accounts committed by an earlier
+      attempt are reported as taken instead of being created twice
+    """
+    def report(staff_import, status):
+        job_progress(
+            job, staff_import.processed, len(staff_import.rows),
+            f"{status.title()}: {staff_import.created} accounts created, {len(staff_import.errors)} errors",
+        )
+
+    def queue_welcome(users):
+        queue_messages([account_email_message(user, reset_url or login_url) for user in users])
+
+    staff_import = StaffImport(
+        [(line_num, row) for line_num, row in rows],
+        performed_by=User.objects.filter(pk=performed_by_id).first(),
+        progress=report,
+        created=queue_welcome,
+    ).run()
+
+    return {
+        'summary': f"{staff_import.created} accounts created, {len(staff_import.errors)} rows rejected",
+        'created': staff_import.created,
+        'error_count': len(staff_import.errors),
+        'errors': staff_import.errors[:50],
+    }
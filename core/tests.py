@@ -1,3 +1,816 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, update_last_login
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.db import DatabaseError, connection
+from django.db.models import Count, Sum
+from datetime import date, datetime, timedelta
+from unittest import mock, skipUnless
+import re
+from collections import Counter
+from io import StringIO
 
-# Create your tests here.
+from file_management.models import File, FileAccessLog, FileTag, FileTagAssignment
+from hr_modules.models import Examination, ExaminationType, LeaveRequest, LeaveType, RetirementPlan, TransferRequest
+from task_management.models import Task, TaskStatus
+
+from .models import BackgroundJob, Department, EducationalQualification, EmployeeProfile, LGA, OutboundEmail, State, Unit, Zone
+from .checks import check_shared_cache
+from .management.commands.ingest_staff_data import Command as IngestStaffData
+from .reference_data import get_departments, get_lgas, get_units
+from .pagination import cursor_state, paginate_keyset
+from .search import rebuild_index, search_filter
+from .reports import NO_DEPARTMENT, by_department_name, department_label, pivot
+from .dashboard import get_dashboard_context
+from .outbox import deliver_outbox, queue_email, queue_messages, retry_delay
+from .jobs import enqueue, run_pending_jobs, task
+from .retirement_dates import add_years, recalculate_retirement_dates, retirement_date
+from .staff_import import StaffImport
+from .staff_ingest import CodeMaps, find_header, normalise_record, parse_date
+from .verification_checks import run_checks
+from .verification_model import AutomatedCheck, EmployeeVerification, VerificationLog
+from .permissions import (
+    Role, UserRole, AttributeBasedPermission, get_user_permissions, get_cached_user_permissions,
+    can_access_object, compile_rules, filter_queryset_by_permissions
+)
+
+
+class PermissionSnapshotTests(TestCase):
+    """Query cost of resolving a user's permissions, uncached vs. cached snapshot"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='officer', password='pass')
+        for name in ('Leave Officer', 'Training Officer', 'File Clerk'):
+            role = Role.objects.create(name=name, role_type='HR_OFFICER', can_manage_leaves=True)
+            UserRole.objects.create(user=self.user, role=role, scope_type='department', scope_id=1)
+
+    def test_warm_snapshot_runs_no_queries(self):
+        with CaptureQueriesContext(connection) as uncached:
+            expected = get_user_permissions(self.user)
+
+        # Cold: builds the snapshot once
+        get_cached_user_permissions(self.user)
+
+        with CaptureQueriesContext(connection) as warm:
+            permissions = get_cached_user_permissions(self.user)
+
+        self.assertEqual(permissions, expected)
+        self.assertEqual(len(uncached), 1)
+        self.assertEqual(len(warm), 0)
+
+    def test_role_change_invalidates_snapshot(self):
+        self.assertNotIn('can_export_data', get_cached_user_permissions(self.user))
+
+        role = Role.objects.get(name='File Clerk')
+        role.can_export_data = True
+        role.save()
+
+        self.assertTrue(get_cached_user_permissions(self.user)['can_export_data'])
+
+    def test_user_role_deactivation_invalidates_snapshot(self):
+        self.assertTrue(get_cached_user_permissions(self.user)['can_manage_leaves'])
+
+        for user_role in UserRole.objects.filter(user=self.user):
+            user_role.is_active = False
+            user_role.save()
+
+        self.assertEqual(get_cached_user_permissions(self.user), {})
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Production settings are warned about per-process caches"""
+
+    def test_local_cache_warns_without_debug(self):
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(DEBUG=False):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['core.W001'])
+
+
+class CompiledRulesTests(TestCase):
+    """ABAC checks evaluate loaded instances in Python instead of one query per rule"""
+
+    def setUp(self):
+        cache.clear()
+        zone = Zone.objects.create(code='NC', name='North Central')
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        self.ict = Department.objects.create(name='ICT', code='ICT', type='SERV')
+        self.state = State.objects.create(code='FCT', name='FCT', zone=zone)
+
+        self.user = User.objects.create_user(username='hr_officer', password='pass')
+        self.user.employee_profile.current_department = self.hr
+        self.user.employee_profile.save()
+
+        role = Role.objects.create(name='HR Officer', role_type='HR_OFFICER')
+        UserRole.objects.create(user=self.user, role=role)
+        content_type = ContentType.objects.get_for_model(EmployeeProfile)
+        AttributeBasedPermission.objects.create(
+            role=role, content_type=content_type, model_name='employeeprofile',
+            field_name='current_department', condition_type='EQUALS',
+            condition_value='{user.employee_profile.current_department_id}', permission_action='VIEW'
+        )
+        AttributeBasedPermission.objects.create(
+            role=role, content_type=content_type, model_name='employeeprofile',
+            field_name='current_state__code', condition_type='IN',
+            condition_value='FCT, LAG', permission_action='VIEW'
+        )
+
+        for index, (department, state) in enumerate([(self.hr, None), (self.ict, None), (self.ict, self.state)]):
+            staff = User.objects.create_user(username=f'staff{index}', password='pass')
+            staff.employee_profile.current_department = department
+            staff.employee_profile.current_state = state
+            staff.employee_profile.save()
+
+    def test_filter_and_object_checks_agree(self):
+        queryset = EmployeeProfile.objects.exclude(user=self.user)
+        allowed = set(filter_queryset_by_permissions(self.user, queryset).values_list('pk', flat=True))
+
+        profiles = list(queryset.select_related('current_state'))
+        with CaptureQueriesContext(connection) as queries:
+            checked = {profile.pk for profile in profiles if can_access_object(self.user, profile)}
+
+        self.assertEqual(checked, allowed)
+        self.assertEqual(len(allowed), 2)
+        self.assertEqual(len(queries), 0)
+
+    def test_text_rules_ignore_case_on_both_paths(self):
+        AttributeBasedPermission.objects.create(
+            role=Role.objects.get(name='HR Officer'), content_type=ContentType.objects.get_for_model(EmployeeProfile),
+            model_name='employeeprofile', field_name='file_number', condition_type='CONTAINS',
+            condition_value='ict', permission_action='VIEW'
+        )
+        EmployeeProfile.objects.filter(user__username='staff1').update(file_number='NDE/ICT/0001')
+        cache.clear()
+
+        queryset = EmployeeProfile.objects.exclude(user=self.user)
+        allowed = set(filter_queryset_by_permissions(self.user, queryset).values_list('pk', flat=True))
+        checked = {profile.pk for profile in queryset.select_related('current_state')
+                   if can_access_object(self.user, profile)}
+
+        self.assertEqual(checked, allowed)
+        self.assertIn(EmployeeProfile.objects.get(user__username='staff1').pk, allowed)
+
+    def test_unloaded_relation_falls_back_to_single_query(self):
+        profiles = list(EmployeeProfile.objects.exclude(user=self.user).filter(current_department=self.ict))
+        compile_rules(self.user, EmployeeProfile)
+
+        with CaptureQueriesContext(connection) as queries:
+            checked = [can_access_object(self.user, profile) for profile in profiles]
+
+        # Only the profile whose state relation is set but not loaded needs the database
+        self.assertEqual(sorted(checked), [False, True])
+        self.assertEqual(len(queries), 1)
+
+
+class StaffImportTests(TestCase):
+    """Bulk staff import runs a fixed set of queries per chunk, not per row"""
+
+    def setUp(self):
+        cache.clear()
+        self.hr_admin = User.objects.create_user(username='hr_admin', password='pass', is_staff=True)
+        self.ict = Department.objects.create(name='ICT', code='ICT', type='SERV')
+
+    def make_rows(self, count):
+        return [
+            (index + 2, {
+                'username': f'staff{index}', 'first_name': 'Staff', 'last_name': str(index),
+                'email': f'staff{index}@example.com', 'file_number': f'NDE{index:04d}',
+                'ippis_number': '', 'department_code': 'ICT',
+            })
+            for index in range(count)
+        ]
+
+    def test_import_runs_far_fewer_queries_than_rows(self):
+        statuses = []
+        with CaptureQueriesContext(connection) as large:
+            staff_import = StaffImport(self.make_rows(200), performed_by=self.hr_admin,
+                                       progress=lambda staff_import, status: statuses.append(status)).run()
+
+        self.assertEqual(staff_import.created, 200)
+        # Only SQLite's bind-parameter limit splits the inserts into more statements
+        self.assertLess(len(large), 40)
+        self.assertEqual(EmployeeVerification.objects.count(), 200)
+        self.assertEqual(VerificationLog.objects.count(), 200)
+        self.assertEqual(EmployeeProfile.objects.filter(current_department=self.ict).count(), 200)
+        self.assertEqual(statuses[-1], 'COMPLETED')
+
+        # No password is hashed; staff set theirs through a password reset
+        self.assertFalse(User.objects.get(pk=staff_import.users[0].pk).has_usable_password())
+
+    def test_mail_for_committed_chunks_survives_a_failure(self):
+        def fail_after_first_chunk(staff_import, status):
+            if staff_import.processed:
+                raise RuntimeError('worker died')
+
+        def queue(users):
+            queue_messages([EmailMessage('Welcome', user.username, to=[user.email]) for user in users])
+
+        with self.assertRaises(RuntimeError):
+            StaffImport(self.make_rows(5), performed_by=self.hr_admin, progress=fail_after_first_chunk,
+                        created=queue, chunk_size=2).run()
+
+        self.assertEqual(User.objects.filter(username__startswith='staff').count(), 2)
+        self.assertEqual(sorted(to for to, in OutboundEmail.objects.values_list('to')),
+                         [['staff0@example.com'], ['staff1@example.com']])
+
+    def test_duplicates_are_rejected(self):
+        rows = self.make_rows(3)
+        rows[1][1]['username'] = 'hr_admin'
+        rows[2][1]['file_number'] = rows[0][1]['file_number']
+        rows[2][1]['department_code'] = 'XYZ'
+
+        staff_import = StaffImport(rows, performed_by=self.hr_admin).run()
+
+        self.assertEqual(staff_import.created, 1)
+        self.assertEqual(staff_import.errors, [
+            "Row 3: Username 'hr_admin' already exists.",
+            "Row 4: File number 'NDE0000' already exists.",
+        ])
+
+
+class StaffIngestParsingTests(SimpleTestCase):
+    """Nominal roll rows are normalised without touching the database"""
+
+    code_maps = CodeMaps(
+        states={'ABIA': 1, 'ABI': 1}, lgas={(1, 'UMUNNEOCHI'): 7}, departments={'REP': 3, 'F&A': 4},
+        designations={}, zones={'SE': 2}, state_zones={1: 2},
+    )
+
+    def test_header_found_below_title_rows(self):
+        rows = [
+            ('NATIONAL DIRECTORATE OF EMPLOYMENT', None),
+            ('S/NO.', 'SURNAME', 'FIRST NAME', 'HQ FILE NO NUMBER', 'STAFF LOCATION/ / DEPARTMENT'),
+        ]
+        index, columns = find_header(rows)
+
+        self.assertEqual(index, 1)
+        self.assertEqual(columns, [None, 'last_name', 'first_name', 'file_number', 'location'])
+
+    def test_parse_date_formats(self):
+        self.assertEqual(parse_date(datetime(1967, 3, 11)), date(1967, 3, 11))
+        self.assertEqual(parse_date('21/8/1966'), date(1966, 8, 21))
+        self.assertEqual(parse_date(26393), date(1972, 4, 4))
+        self.assertIsNone(parse_date('#VALUE!'))
+
+    def test_normalise_record(self):
+        record = normalise_record({
+            'last_name': 'CHUKWUEKEZIE', 'first_name': 'STELLA', 'file_number': 3529.0,
+            'sex': '\xa0F', 'marital_status': 'MARRIED', 'state_of_origin': 'ABIA',
+            'lga_of_origin': 'UMUNNEOCHI', 'location': 'Abia (F & A)', 'grade_step': '15/9',
+            'qualification': 'B.ED AGRIC', 'phone_number': 8033377247,
+        }, self.code_maps, state_id=1, zone_id=2)
+
+        self.assertEqual(record['file_number'], '3529')
+        self.assertEqual(record['user']['last_name'], 'Chukwuekezie')
+        self.assertEqual(record['profile']['sex'], 'F')
+        self.assertEqual(record['profile']['lga_of_origin_id'], 7)
+        self.assertEqual(record['profile']['current_department_id'], 4)
+        self.assertEqual(record['profile']['current_grade_level'], 15)
+        self.assertEqual(record['profile']['current_step'], 9)
+        self.assertEqual(record['profile']['phone_number'], '08033377247')
+        self.assertEqual(record['details']['highest_formal_eduation'], 'BAC')
+
+
+class StaffIngestUpsertTests(TestCase):
+    """Re-ingesting a roll reports only the rows whose values changed"""
+
+    def record(self, phone_number):
+        code_maps = CodeMaps(states={}, lgas={}, departments={}, designations={}, zones={}, state_zones={})
+        return normalise_record({
+            'last_name': 'OKAFOR', 'first_name': 'NGOZI', 'file_number': 4120.0, 'sex': 'F',
+            'grade_step': '12/3', 'phone_number': phone_number,
+        }, code_maps, state_id=None, zone_id=None)
+
+    def test_unchanged_rows_are_not_counted_as_updated(self):
+        command = IngestStaffData()
+
+        self.assertEqual(command.upsert([self.record(8030000000)])['created'], 1)
+        self.assertEqual(command.upsert([self.record(8030000000)]), Counter(unchanged=1))
+        self.assertEqual(command.upsert([self.record(8031111111)]), Counter(updated=1))
+        self.assertEqual(EmployeeProfile.objects.get(file_number='4120').phone_number, '08031111111')
+
+
+class LoadReferenceDataTests(TestCase):
+    """Reference loader is idempotent and reports what changed"""
+
+    def test_second_load_changes_nothing(self):
+        call_command('load_reference_data', stdout=StringIO())
+        self.assertEqual(LGA.objects.count(), 774)
+        self.assertEqual(Department.objects.get(code='NE-Z').parent, None)
+        self.assertTrue(Department.objects.filter(parent__isnull=False).exists())
+
+        output = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('load_reference_data', stdout=output)
+
+        for line in output.getvalue().splitlines()[:-1]:
+            self.assertIn('0 created, 0 updated', line)
+        self.assertIn('lgas.csv: 774 rows, 0 created, 0 updated, 774 unchanged', output.getvalue())
+        self.assertLess(len(queries), 30)
+
+
+class ReferenceDataCacheTests(TestCase):
+    """Dropdown tables are served from the process cache until one of them changes"""
+
+    def setUp(self):
+        cache.clear()
+        zone = Zone.objects.create(code='SE', name='South East')
+        self.abia = State.objects.create(code='ABI', name='Abia', zone=zone)
+        LGA.objects.create(code='10001', name='UMUAHIA NORTH', state=self.abia)
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        Unit.objects.create(code='LEAVE', name='Leave', department=self.hr)
+
+    def test_warm_lookups_run_no_queries(self):
+        get_departments(), get_lgas(self.abia.pk), get_units(self.hr.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            departments = get_departments()
+            lgas = get_lgas(str(self.abia.pk))
+            units = get_units(self.hr.pk)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([str(department) for department in departments], ['Human Resources'])
+        self.assertEqual([lga.name for lga in lgas], ['UMUAHIA NORTH'])
+        self.assertEqual(units[0].pk, Unit.objects.get().pk)
+
+    def test_save_invalidates(self):
+        get_departments()
+        Department.objects.create(name='ICT', code='ICT', type='SERV')
+
+        self.assertEqual([department.code for department in get_departments()], ['HR', 'ICT'])
+
+
+class DashboardTests(TestCase):
+    """Org-wide dashboard counters are shared; only per-user pieces are queried each time"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dashboard_user', password='pass')
+
+    def test_warm_dashboard_only_queries_user_data(self):
+        with CaptureQueriesContext(connection) as cold:
+            get_dashboard_context(self.user)
+
+        with CaptureQueriesContext(connection) as warm:
+            context = get_dashboard_context(self.user)
+            list(context['my_tasks']), list(context['leave_balances'])
+
+        self.assertEqual(context['employee_count'], 1)
+        self.assertLess(len(warm), len(cold))
+        # Task counters, open tasks, leave balances and own leave dates
+        self.assertEqual(len(warm), 4)
+
+    def test_dashboard_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+
+
+class ReportAggregationTests(TestCase):
+    """Summary reports total groups in the database and keep one entry per group"""
+
+    def setUp(self):
+        cache.clear()
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        annual = LeaveType.objects.create(name='Annual', max_days=30)
+        sick = LeaveType.objects.create(name='Sick', max_days=10)
+        self.leave_types = annual, sick
+
+        staff = User.objects.create_user(username='report_staff').employee_profile
+        staff.current_department = self.hr
+        staff.save()
+        unassigned = User.objects.create_user(username='report_unassigned').employee_profile
+
+        for employee, leave_type, days in [(staff, annual, 5), (staff, annual, 3), (staff, sick, 2),
+                                           (unassigned, annual, 4)]:
+            LeaveRequest.objects.create(
+                employee=employee, leave_type=leave_type, start_date=date(2024, 3, 1),
+                end_date=date(2024, 3, 10), days_requested=days, reason='Rest', status='APPROVED',
+            )
+        self.leaves = LeaveRequest.objects.all()
+
+    def test_pivot_totals_in_one_query(self):
+        annual, sick = self.leave_types
+        with CaptureQueriesContext(connection) as queries:
+            days = pivot(self.leaves, 'employee__current_department_id', 'leave_type_id', Sum('days_requested'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(days.cell(self.hr.pk, annual.pk), 8)
+        self.assertEqual(days.cell(self.hr.pk, sick.pk), 2)
+        self.assertEqual(days.cell(None, sick.pk), 0)
+        self.assertEqual(days.row_totals, {self.hr.pk: 10, None: 4})
+        self.assertEqual(days.column_totals, {annual.pk: 12, sick.pk: 2})
+        self.assertEqual(days.total, 14)
+
+    def test_department_rows_sorted_with_no_department_last(self):
+        counts = pivot(self.leaves, 'employee__current_department_id', 'status', Count('id'))
+        counts.sort_rows(key=by_department_name)
+
+        self.assertEqual([department_label(row) for row in counts.rows], [get_departments()[0], NO_DEPARTMENT])
+
+
+class KeysetPaginationTests(TestCase):
+    """List pages seek by cursor and walk the whole list without gaps or repeats"""
+
+    def setUp(self):
+        for number in range(7):
+            # Two staff share each surname so the primary key has to break ties
+            User.objects.create_user(username=f'page_{number}', last_name=f'Surname {number // 2}')
+        self.employees = EmployeeProfile.objects.select_related('user')
+        self.ordering = ['user__last_name']
+
+    def page(self, query=''):
+        return paginate_keyset(RequestFactory().get('/staff/list/' + query), self.employees, self.ordering, per_page=3)
+
+    def test_walks_forward_and_back(self):
+        expected = list(self.employees.order_by('user__last_name', 'pk'))
+
+        first = self.page()
+        second = self.page(first.next_query)
+        third = self.page(second.next_query)
+
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        self.assertEqual(list(self.page(second.previous_query)), list(first))
+        self.assertEqual(first.count_display, '7')
+
+    def test_keeps_filters_and_ignores_tampered_cursor(self):
+        first = self.page('?search=x')
+
+        self.assertIn('search=x', first.next_query)
+        self.assertEqual(list(self.page('?cursor=forged')), list(first))
+
+    def test_state_travels_with_the_cursor(self):
+        first = paginate_keyset(RequestFactory().get('/staff/list/'), self.employees, self.ordering, per_page=3,
+                                state={'as_of': '2025-01-01T00:00:00+00:00'})
+
+        self.assertEqual(cursor_state(RequestFactory().get('/staff/list/')), {})
+        self.assertEqual(cursor_state(RequestFactory().get('/staff/list/' + first.next_query)),
+                         {'as_of': '2025-01-01T00:00:00+00:00'})
+
+    def test_htmx_request_renders_rows_only(self):
+        admin = User.objects.create_user(username='page_admin', is_staff=True)
+        self.client.force_login(admin)
+
+        full = self.client.get('/staff/list/')
+        rows = self.client.get('/staff/list/', headers={'HX-Request': 'true'})
+
+        self.assertContains(full, 'id="staff-results"')
+        self.assertContains(rows, 'id="staff-results"')
+        self.assertNotContains(rows, '<html')
+
+
+class StaffListVerificationTests(TestCase):
+    """The staff roster reads each profile's latest verification and its stats in a fixed number of queries"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='roster_admin', is_staff=True))
+        EmployeeVerification.objects.create(
+            employee_profile=User.objects.get(username='roster_admin').employee_profile, verification_status='VERIFIED'
+        )
+        # Verified once, then flagged on a later review
+        self.reviewed = User.objects.create_user(username='reviewed', last_name='Reviewed').employee_profile
+        EmployeeVerification.objects.create(employee_profile=self.reviewed, verification_status='VERIFIED')
+        self.flag = EmployeeVerification.objects.create(employee_profile=self.reviewed, verification_status='FLAGGED')
+        User.objects.create_user(username='unchecked', last_name='Unchecked')
+
+    def staff(self, query=''):
+        return [employee.user.username for employee in self.client.get('/staff/list/' + query).context['employees']]
+
+    def test_filters_and_stats_use_the_latest_verification(self):
+        response = self.client.get('/staff/list/')
+
+        self.assertEqual(
+            [response.context[key] for key in ('total_count', 'verified_count', 'pending_count', 'flagged_count')],
+            [3, 1, 1, 1],
+        )
+        self.assertContains(response, f'/staff/resolve-issues/{self.flag.pk}/')
+        self.assertEqual(self.staff('?verified=flagged'), ['reviewed'])
+        self.assertEqual(self.staff('?verified=yes'), ['roster_admin'])
+        self.assertEqual(sorted(self.staff('?verified=no')), ['reviewed', 'unchecked'])
+
+    def test_query_count_does_not_grow_with_staff(self):
+        self.client.get('/staff/list/')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/staff/list/')
+        for number in range(20):
+            profile = User.objects.create_user(username=f'roster_{number}').employee_profile
+            EmployeeVerification.objects.create(employee_profile=profile)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get('/staff/list/')
+
+        self.assertEqual(len(many), len(few))
+
+
+class SearchIndexTests(TestCase):
+    """Staff and file search go through the index and follow edits made through the ORM"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='search_staff', first_name='Ngozi', last_name='Okonjo')
+        self.employee = self.user.employee_profile
+        self.employee.file_number = 'NDE4821'
+        self.employee.save()
+        User.objects.create_user(username='other_staff', first_name='Bala', last_name='Musa')
+
+    def staff_matching(self, term):
+        return list(EmployeeProfile.objects.filter(search_filter('staff', term)).values_list('user__username', flat=True))
+
+    def test_staff_search_matches_names_and_numbers(self):
+        self.assertEqual(self.staff_matching('konj'), ['search_staff'])
+        self.assertEqual(self.staff_matching('e482'), ['search_staff'])
+        self.assertEqual(self.staff_matching('ngozi okonjo'), ['search_staff'])
+        # Too short for trigrams: answered by the icontains fallback
+        self.assertEqual(self.staff_matching('Mu'), ['other_staff'])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.user.last_name = 'Iweala'
+        self.user.save()
+        self.assertEqual(self.staff_matching('okonjo'), [])
+        self.assertEqual(self.staff_matching('iweala'), ['search_staff'])
+
+        self.user.delete()
+        self.assertEqual(self.staff_matching('iweala'), [])
+
+    def test_login_does_not_touch_the_index(self):
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            update_last_login(None, user)
+
+        self.assertFalse([query for query in queries if 'core_staff_search' in query['sql']])
+        self.assertEqual(self.staff_matching('okonjo'), ['search_staff'])
+
+    def test_file_search_covers_tags_without_duplicates(self):
+        file = File.objects.create(title='Posting Order', description='Zonal office', file_reference='p.pdf',
+                                   file_type='PDF')
+        for name in ('transfer', 'transfer-2024'):
+            FileTagAssignment.objects.create(file=file, tag=FileTag.objects.create(name=name))
+
+        self.assertEqual(list(File.objects.filter(search_filter('files', 'transfer'))), [file])
+
+        tag = FileTag.objects.get(name='transfer-2024')
+        tag.name = 'relocation'
+        tag.save()
+        self.assertEqual(list(File.objects.filter(search_filter('files', 'relocat'))), [file])
+
+        rebuild_index('files')
+        self.assertEqual(list(File.objects.filter(search_filter('files', 'zonal'))), [file])
+
+
+class EmailOutboxTests(TestCase):
+    """Queued mail is delivered in batches by the worker and retried with backoff"""
+
+    def test_worker_delivers_and_clears_bodies(self):
+        for number in range(3):
+            queue_email('Welcome', f'Password: secret{number}', [f'staff{number}@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('send_queued_email', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['staff0@example.com', 'staff1@example.com', 'staff2@example.com'])
+        self.assertEqual(OutboundEmail.objects.filter(status='SENT', body='').count(), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        email = queue_email('Reset', 'Link', ['staff@example.com'])
+        with override_settings(EMAIL_BACKEND='core.tests.BrokenEmailBackend'):
+            self.assertEqual(deliver_outbox(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+            self.assertGreater(email.next_attempt_at, timezone.now() + retry_delay(1) - timedelta(seconds=5))
+
+            # Not due yet
+            self.assertEqual(deliver_outbox(), (0, 0))
+
+            with mock.patch('core.outbox.EMAIL_OUTBOX_MAX_ATTEMPTS', 2):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                deliver_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('FAILED', 2, 'connection refused'))
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('connection refused')
+
+
+@task('tests.flaky')
+def flaky_task(job, failures):
+    if job.attempts <= failures:
+        raise RuntimeError('temporary failure')
+    return {'summary': f'done after {job.attempts} attempts'}
+
+
+class BackgroundJobTests(TestCase):
+    """Jobs are deduplicated by key, retried with backoff and run off the request"""
+
+    def test_idempotency_key_reuses_the_active_job(self):
+        first = enqueue('tests.flaky', 'Flaky', {'failures': 0}, idempotency_key='same')
+        self.assertEqual(enqueue('tests.flaky', 'Flaky', {'failures': 0}, idempotency_key='same'), first)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.result['summary']), ('SUCCEEDED', 'done after 1 attempts'))
+
+        # Once finished, the same key can start a new run
+        self.assertNotEqual(enqueue('tests.flaky', 'Flaky', {'failures': 0}, idempotency_key='same').pk, first.pk)
+
+    def test_failed_attempts_are_retried_then_given_up(self):
+        job = enqueue('tests.flaky', 'Flaky', {'failures': 5}, max_attempts=2)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertGreater(job.run_after, timezone.now())
+
+        BackgroundJob.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+        self.assertIn('temporary failure', job.error)
+
+    def test_bulk_upload_runs_as_a_job(self):
+        Department.objects.create(name='ICT', code='ICT', type='SERV')
+        hr_admin = User.objects.create_user(username='hr_admin', password='pass', is_staff=True)
+        self.client.force_login(hr_admin)
+        upload = SimpleUploadedFile('staff.csv', (
+            'username,first_name,last_name,email,file_number,ippis_number,department_code\n'
+            'ada,Ada,Obi,ada@example.com,NDE0001,,ICT\n'
+        ).encode(), content_type='text/csv')
+
+        response = self.client.post('/staff/bulk-upload/', {'csv_file': upload, 'import_id': 'abc'})
+        job = BackgroundJob.objects.get()
+        self.assertRedirects(response, f'/jobs/{job.pk}/?next=/staff/list/', fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(username='ada').exists())
+
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['created']), ('SUCCEEDED', 1))
+        self.assertTrue(User.objects.filter(username='ada').exists())
+        self.assertEqual(list(OutboundEmail.objects.values_list('to', flat=True)), [['ada@example.com']])
+
+        panel = self.client.get(f'/jobs/{job.pk}/?next=/staff/list/', headers={'HX-Request': 'true'})
+        self.assertContains(panel, '1 accounts created')
+        self.assertNotContains(panel, 'hx-trigger')
+
+
+class RetirementDateTests(TestCase):
+    """Retirement dates use calendar years and are recomputed in batches"""
+
+    def test_calendar_years(self):
+        self.assertEqual(add_years(date(1964, 2, 29), 60), date(2024, 2, 29))
+        self.assertEqual(add_years(date(1992, 2, 29), 35), date(2027, 2, 28))
+        # 60 * 365 days would land 15 days early
+        self.assertEqual(retirement_date(date(1970, 6, 1), None), date(2030, 6, 1))
+        self.assertEqual(retirement_date(date(1970, 6, 1), date(1990, 3, 1)), date(2025, 3, 1))
+        self.assertIsNone(retirement_date(None, None))
+
+    def test_recalculation_writes_only_changed_rows(self):
+        profiles = [User.objects.create_user(username=f'retire{index}').employee_profile for index in range(3)]
+        EmployeeProfile.objects.filter(pk=profiles[0].pk).update(date_of_birth=date(1970, 6, 1))
+        EmployeeProfile.objects.filter(pk=profiles[1].pk).update(
+            date_of_birth=date(1980, 1, 1), date_of_retirement=date(2040, 1, 1))
+        EmployeeProfile.objects.filter(pk=profiles[2].pk).update(date_of_retirement=date(2030, 1, 1))
+
+        self.assertEqual(len(recalculate_retirement_dates(dry_run=True)), 2)
+        changes = recalculate_retirement_dates()
+
+        self.assertEqual(sorted((pk, computed) for pk, stored, computed in changes), [
+            (profiles[0].pk, date(2030, 6, 1)), (profiles[2].pk, None),
+        ])
+        self.assertEqual(recalculate_retirement_dates(), [])
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """The hot list, dashboard and report queries must not fall back to full table scans"""
+
+    def setUp(self):
+        today = date.today()
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        self.user = User.objects.create_user(username='plan_user')
+        self.employee = self.user.employee_profile
+        self.employee.date_of_retirement = today + timedelta(days=200)
+        self.employee.save()
+
+        annual = LeaveType.objects.create(name='Annual', max_days=30)
+        exam_type = ExaminationType.objects.create(name='Confirmation')
+        open_status = TaskStatus.objects.create(name='Open', order=1)
+        for offset in range(5):
+            day = today + timedelta(days=offset * 10)
+            LeaveRequest.objects.create(employee=self.employee, leave_type=annual, start_date=day, end_date=day,
+                                        days_requested=1, reason='Rest', status='APPROVED')
+            TransferRequest.objects.create(employee=self.employee, request_type='EMPLOYEE_REQUESTED',
+                                           current_department=self.hr, requested_department=self.hr, reason='Move')
+            Examination.objects.create(title=f'Exam {offset}', examination_type=exam_type, scheduled_date=day,
+                                       registration_deadline=day, venue='HQ', max_participants=10)
+            Task.objects.create(title=f'Task {offset}', description='', status=open_status,
+                                assigned_to=self.employee, due_date=timezone.now())
+        self.file = File.objects.create(title='Policy', file_reference='policy.pdf', file_type='PDF')
+        FileAccessLog.objects.create(file=self.file, user=self.user, action='VIEW')
+        RetirementPlan.objects.create(employee=self.employee, expected_retirement_date=today + timedelta(days=200))
+        EmployeeVerification.objects.create(employee_profile=self.employee, verification_status='VERIFIED')
+
+    def full_scans(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        table = queryset.model._meta.db_table
+        return [step for step in plan if re.match(rf'SCAN {table}\b', step) and 'INDEX' not in step]
+
+    def hot_queries(self):
+        today = date.today()
+        return {
+            'pending leave queue': LeaveRequest.objects.filter(status='PENDING').order_by('start_date'),
+            'own upcoming leave': LeaveRequest.objects.filter(
+                employee=self.employee, status='APPROVED', start_date__gte=today).order_by('start_date')[:3],
+            'leave list page': LeaveRequest.objects.order_by('-created_at', '-pk')[:26],
+            'transfer list page': TransferRequest.objects.order_by('-created_at', '-pk')[:26],
+            'transfer review queue': TransferRequest.objects.filter(status='UNDER_REVIEW', current_department=self.hr),
+            'examination list page': Examination.objects.order_by('-scheduled_date', '-pk')[:26],
+            'retirement list by year': RetirementPlan.objects.filter(
+                expected_retirement_date__year=today.year + 1).order_by('expected_retirement_date', 'pk')[:26],
+            'retirements in progress': RetirementPlan.objects.filter(status__in=['NOTIFIED', 'IN_PROGRESS']),
+            'my open tasks': Task.objects.filter(assigned_to=self.employee, status__is_completed=False),
+            'recent active files': File.objects.filter(status='ACTIVE').order_by('-created_at', '-pk')[:5],
+            'file access history': FileAccessLog.objects.filter(file=self.file).order_by('-timestamp'),
+            'retirement identification': EmployeeProfile.objects.filter(
+                date_of_retirement__isnull=False, date_of_retirement__lte=today + timedelta(days=365)),
+            'verified staff': EmployeeVerification.objects.filter(
+                verification_status='VERIFIED').values('employee_profile_id'),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                self.assertEqual(self.full_scans(queryset), [])
+
+
+class VerificationCheckTests(TestCase):
+    """Active checks run over whole querysets in chunks, with flags and logs written in bulk"""
+
+    def setUp(self):
+        for check_type, min_value, max_value in [
+            ('EMPLOYMENT_AGE', 18, None), ('AGE_TERTIARY', 16, None), ('EDUCATION_OVERLAP', None, None),
+            ('EDUCATION_GAP', None, 15), ('APPOINTMENT_DATES', None, None),
+        ]:
+            AutomatedCheck.objects.create(check_name=check_type, check_type=check_type, description='',
+                                          min_value=min_value, max_value=max_value)
+        AutomatedCheck.objects.create(check_name='off', check_type='MAX_AGE', description='', max_value=20,
+                                      is_active=False)
+
+        self.profiles = {}
+        for username, fields in {
+            'clean': {'date_of_birth': date(1980, 1, 1), 'date_of_assumption': date(2005, 1, 1)},
+            'young': {'date_of_birth': date(1990, 6, 1), 'date_of_assumption': date(2007, 5, 31)},
+            'dates': {'date_of_appointment': date(2010, 1, 1), 'date_of_assumption': date(2009, 1, 1)},
+            'school': {'date_of_birth': date(1980, 1, 1)},
+        }.items():
+            profile = User.objects.create_user(username=username).employee_profile
+            EmployeeProfile.objects.filter(pk=profile.pk).update(**fields)
+            EmployeeVerification.objects.create(employee_profile=profile)
+            self.profiles[username] = profile
+        for qualification_type, year in [('SSCE', 1997), ('BAC', 1995), ('MAS', 2020)]:
+            EducationalQualification.objects.create(
+                employee_profile=self.profiles['school'], qualification_type=qualification_type,
+                course_of_study='Science', institution='School', year_of_graduation=year,
+            )
+
+    def flags(self, username):
+        verification = EmployeeVerification.objects.get(employee_profile=self.profiles[username])
+        return verification.has_age_flag, verification.has_education_flag, verification.has_employment_flag
+
+    def test_rules_flag_each_verification(self):
+        with CaptureQueriesContext(connection) as queries:
+            counts = run_checks(chunk_size=3)
+
+        self.assertEqual(counts, {'checked': 4, 'with_issues': 3, 'age': 1, 'education': 1, 'employment': 1})
+        # Two chunks, each a read, two qualification reads and the bulk writes
+        self.assertLess(len(queries), 20)
+        self.assertEqual(self.flags('clean'), (False, False, False))
+        self.assertEqual(self.flags('young'), (True, False, False))
+        self.assertEqual(self.flags('dates'), (False, False, True))
+        self.assertEqual(self.flags('school'), (False, True, False))
+        issues = EmployeeVerification.objects.get(employee_profile=self.profiles['school']).issue_description
+        self.assertIn('BAC (1995) was obtained before SSCE (1997)', issues)
+        self.assertIn('25 years between BAC (1995) and MAS (2020)', issues)
+        self.assertIn('about 15 years old', issues)
+        self.assertEqual(VerificationLog.objects.filter(action='AUTO_CHECK').count(), 4)
+
+    def test_cleared_problems_drop_their_flags(self):
+        run_checks()
+        EmployeeProfile.objects.filter(pk=self.profiles['dates'].pk).update(date_of_assumption=date(2010, 2, 1))
+
+        run_checks(EmployeeVerification.objects.filter(employee_profile=self.profiles['dates']))
+
+        self.assertEqual(self.flags('dates'), (False, False, False))
@@ -0,0 +1,30 @@
+"""
+Field change tracking
+
+Signal handlers that only care about some fields remember the values an
+instance was loaded with (remember_fields, from post_init) and compare on save
+(fields_changed, from post_save). Saving a User re-saves its profile, on every
+login among others, so this keeps those saves from rewriting caches and
+indexes that nothing changed for.
+
+Fields deferred at load time (only()/defer()) are not read, which would cost a
+query per row; a deferred field that is assigned before saving counts as
+changed.
+"""
+
+
+def loaded_values(instance, fields):
+    return {field: instance.__dict__[field] for field in fields if field in instance.__dict__}
+
+
+def remember_fields(instance, name, fields):
+    """Store the loaded values of fields on instance under name"""
+    setattr(instance, name, loaded_values(instance, fields))
+
+
+def fields_changed(instance, name, fields):
+    """Whether any of fields differs from the remembered values; remembers the current ones"""
+    before = getattr(instance, name, {})
+    after = loaded_values(instance, fields)
+    setattr(instance, name, after)
+    return any(field not in before or before[field] != value for field, value in after.items())
@@ -34,6 +34,9 @@ urlpatterns = [
     path('staff/verify/<int:employee_id>/', verify_employee, name='verify_employee'),
     path('staff/resolve-issues/<int:verification_id>/', resolve_verification_issues, name='resolve_verification_issues'),
     
+    # Background jobs
+    path('jobs/<int:pk>/', views.job_status, name='job_status'),
+    
     # AJAX endpoints
     path('ajax/lgas/', get_lgas_for_state, name='ajax_lgas'),
     path('ajax/units/', get_units_for_department, name='ajax_units'),
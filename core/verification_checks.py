@@ -0,0 +1,251 @@
+"""
+Automated verification checks
+
+Each AutomatedCheck.check_type has a rule registered with @rule(check_type,
+flag): a function called as function(check, profile, qualifications) that
+returns a list of issue messages. The flag names the EmployeeVerification
+has_<flag>_flag field that its issues set. Check types without a rule are
+skipped.
+
+run_checks() loads the active checks once and evaluates them over a
+verification queryset in chunks: per chunk one query reads the verifications
+with their profile dates and two read the qualifications, then the flags are
+written with update_rows() (see core.bulk) and the AUTO_CHECK logs with
+bulk_create. That lets "manage.py run_verification_checks" re-verify the whole
+workforce in one pass.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import update_rows
+from .models import EducationalQualification, EmployeeDetail
+from .verification_model import AutomatedCheck, EmployeeVerification, VerificationLog
+
+
+CHECK_CHUNK_SIZE = 1000
+FLAGS = ('age', 'education', 'employment')
+UPDATED_FIELDS = ['has_age_flag', 'has_education_flag', 'has_employment_flag', 'issue_description', 'updated_at']
+
+# Education levels in the order they are completed; professional certificates have no place
+EDUCATION_LEVELS = {'FSLC': 0, 'JSCE': 1, 'SSCE': 2, 'OND': 3, 'HND': 4, 'BAC': 4, 'MAS': 5, 'DOR': 6}
+PRIMARY_LEVELS = {'FSLC'}
+SECONDARY_LEVELS = {'JSCE', 'SSCE'}
+TERTIARY_LEVELS = {'OND', 'HND', 'BAC', 'MAS', 'DOR'}
+
+PROFILE_FIELDS = (
+    'date_of_birth', 'date_of_appointment', 'date_of_present_appointment', 'date_of_assumption',
+    'date_of_confirmation',
+)
+
+RULES = {}
+
+
+def rule(check_type, flag):
+    """Register a function as the rule for an AutomatedCheck type"""
+    def register(function):
+        RULES[check_type] = (flag, function)
+        return function
+    return register
+
+
+def age_on(date_of_birth, day):
+    """Age in whole years on day"""
+    return day.year - date_of_birth.year - ((day.month, day.day) < (date_of_birth.month, date_of_birth.day))
+
+
+def employment_date(profile):
+    return profile.date_of_assumption or profile.date_of_appointment
+
+
+@rule('EMPLOYMENT_AGE', 'age')
+def check_employment_age(check, profile, qualifications):
+    started = employment_date(profile)
+    if check.min_value is None or not (profile.date_of_birth and started):
+        return []
+    age = age_on(profile.date_of_birth, started)
+    if age < check.min_value:
+        return [f"Employee was {age} years old at employment, which is below the minimum age of {check.min_value}"]
+    return []
+
+
+@rule('MAX_AGE', 'age')
+def check_maximum_age(check, profile, qualifications):
+    started = employment_date(profile)
+    if check.max_value is None or not (profile.date_of_birth and started):
+        return []
+    age = age_on(profile.date_of_birth, started)
+    if age > check.max_value:
+        return [f"Employee was {age} years old at employment, which is above the maximum age of {check.max_value}"]
+    return []
+
+
+def graduation_age_rule(levels, stage):
+    """Rule flagging qualifications of levels gained younger than the check's minimum age"""
+    def check_graduation_age(check, profile, qualifications):
+        if check.min_value is None or not profile.date_of_birth:
+            return []
+        return [
+            f"{qualification_type} obtained in {year} at about {year - profile.date_of_birth.year} years old, "
+            f"below the minimum age of {check.min_value} for {stage} education"
+            for qualification_type, year in qualifications
+            if qualification_type in levels and year - profile.date_of_birth.year < check.min_value
+        ]
+    return check_graduation_age
+
+
+rule('AGE_PRIMARY', 'education')(graduation_age_rule(PRIMARY_LEVELS, 'primary'))
+rule('AGE_SECONDARY', 'education')(graduation_age_rule(SECONDARY_LEVELS, 'secondary'))
+rule('AGE_TERTIARY', 'education')(graduation_age_rule(TERTIARY_LEVELS, 'tertiary'))
+
+
+def education_timeline(qualifications):
+    """Qualifications on the education ladder, lowest level first"""
+    return sorted(
+        ((qualification_type, year) for qualification_type, year in qualifications
+         if qualification_type in EDUCATION_LEVELS),
+        key=lambda qualification: (EDUCATION_LEVELS[qualification[0]], qualification[1])
+    )
+
+
+@rule('EDUCATION_GAP', 'education')
+def check_education_gap(check, profile, qualifications):
+    if check.max_value is None:
+        return []
+    timeline = education_timeline(qualifications)
+    return [
+        f"{gap} years between {earlier} ({earlier_year}) and {later} ({later_year}), "
+        f"more than the maximum of {check.max_value}"
+        for (earlier, earlier_year), (later, later_year) in zip(timeline, timeline[1:])
+        for gap in [later_year - earlier_year]
+        if gap > check.max_value
+    ]
+
+
+@rule('EDUCATION_OVERLAP', 'education')
+def check_education_overlap(check, profile, qualifications):
+    timeline = education_timeline(qualifications)
+    return [
+        f"{later} ({later_year}) was obtained before {earlier} ({earlier_year})"
+        for (earlier, earlier_year), (later, later_year) in zip(timeline, timeline[1:])
+        if EDUCATION_LEVELS[later] > EDUCATION_LEVELS[earlier] and later_year < earlier_year
+    ]
+
+
+# Employment dates that must not run backwards: (earlier field, later field)
+APPOINTMENT_SEQUENCE = (
+    ('date_of_birth', 'date_of_appointment'),
+    ('date_of_appointment', 'date_of_assumption'),
+    ('date_of_assumption', 'date_of_confirmation'),
+    ('date_of_appointment', 'date_of_present_appointment'),
+)
+
+
+@rule('APPOINTMENT_DATES', 'employment')
+def check_appointment_dates(check, profile, qualifications):
+    issues = []
+    for earlier, later in APPOINTMENT_SEQUENCE:
+        earlier_date, later_date = getattr(profile, earlier), getattr(profile, later)
+        if earlier_date and later_date and later_date < earlier_date:
+            issues.append(
+                f"{profile._meta.get_field(later).verbose_name} ({later_date}) is before "
+                f"{profile._meta.get_field(earlier).verbose_name} ({earlier_date})"
+            )
+    today = timezone.now().date()
+    for field in PROFILE_FIELDS[1:]:
+        value = getattr(profile, field)
+        if value and value > today:
+            issues.append(f"{profile._meta.get_field(field).verbose_name} ({value}) is in the future")
+    return issues
+
+
+def active_checks():
+    """Active checks that have a rule, loaded once per run"""
+    return [check for check in AutomatedCheck.objects.filter(is_active=True).order_by('pk') if check.check_type in RULES]
+
+
+def load_qualifications(profile_ids):
+    """{profile id: [(qualification type, graduation year)]} from qualifications and employee details"""
+    qualifications = {profile_id: set() for profile_id in profile_ids}
+    for profile_id, qualification_type, year in EducationalQualification.objects.filter(
+        employee_profile_id__in=profile_ids
+    ).values_list('employee_profile_id', 'qualification_type', 'year_of_graduation'):
+        qualifications[profile_id].add((qualification_type, year))
+    for profile_id, qualification_type, year in EmployeeDetail.objects.filter(
+        employee_profile_id__in=profile_ids, highest_formal_eduation__isnull=False, year_of_graduation__isnull=False
+    ).values_list('employee_profile_id', 'highest_formal_eduation', 'year_of_graduation'):
+        qualifications[profile_id].add((qualification_type, year))
+    return {profile_id: sorted(values) for profile_id, values in qualifications.items()}
+
+
+def evaluate(checks, profile, qualifications):
+    """({flag: issues}, all issues) for one profile"""
+    found = {flag: [] for flag in FLAGS}
+    for check in checks:
+        flag, function = RULES[check.check_type]
+        found[flag].extend(function(check, profile, qualifications))
+    return found, [issue for flag in FLAGS for issue in found[flag]]
+
+
+def check_verifications(verifications, checks, performed_by=None):
+    """Evaluate loaded verifications and write their flags and logs in bulk; returns {pk: issues}"""
+    qualifications = load_qualifications([verification.employee_profile_id for verification in verifications])
+    now = timezone.now()
+
+    results, logs = {}, []
+    for verification in verifications:
+        found, issues = evaluate(checks, verification.employee_profile, qualifications[verification.employee_profile_id])
+        for flag in FLAGS:
+            setattr(verification, f'has_{flag}_flag', bool(found[flag]))
+        if issues:
+            verification.issue_description = "\n".join(issues)
+        # Bulk writes skip auto_now
+        verification.updated_at = now
+        results[verification.pk] = issues
+        logs.append(VerificationLog(
+            verification=verification,
+            action='AUTO_CHECK',
+            performed_by=performed_by,
+            details=f"Automated checks run. Issues found: {len(issues)}",
+        ))
+
+    with transaction.atomic():
+        update_rows(EmployeeVerification, UPDATED_FIELDS, [
+            (verification.pk, *(getattr(verification, field) for field in UPDATED_FIELDS))
+            for verification in verifications
+        ])
+        VerificationLog.objects.bulk_create(logs)
+    return results
+
+
+def run_checks(verifications=None, chunk_size=CHECK_CHUNK_SIZE, performed_by=None, progress=None):
+    """
+    Run the active checks over a verification queryset (default: all of them)
+
+    Returns the counts: verifications checked, verifications with issues, and
+    verifications carrying each flag. progress(done) is called after every chunk.
+    """
+    verifications = EmployeeVerification.objects.all() if verifications is None else verifications
+    checks = active_checks()
+    counts = {'checked': 0, 'with_issues': 0, **{flag: 0 for flag in FLAGS}}
+
+    last_pk = 0
+    while True:
+        chunk = list(
+            verifications.filter(pk__gt=last_pk).select_related('employee_profile').only(
+                'employee_profile_id', 'issue_description', 'has_age_flag', 'has_education_flag',
+                'has_employment_flag', 'updated_at',
+                *(f'employee_profile__{field}' for field in PROFILE_FIELDS),
+            ).order_by('pk')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+
+        results = check_verifications(chunk, checks, performed_by)
+        counts['checked'] += len(chunk)
+        counts['with_issues'] += sum(1 for issues in results.values() if issues)
+        for flag in FLAGS:
+            counts[flag] += sum(1 for verification in chunk if getattr(verification, f'has_{flag}_flag'))
+        if progress:
+            progress(counts['checked'])
+    return counts
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
 from django.contrib.auth.models import User
 from datetime import date
 
@@ -51,6 +52,12 @@ class EmployeeVerification(models.Model):
     def __str__(self):
         return f"Verification of {self.employee_profile.user.get_full_name()} - {self.get_verification_status_display()}"
     
+    class Meta:
+        indexes = [
+            # Status counters and verified / flagged staff filters
+            models.Index(fields=['verification_status', 'employee_profile'], name='verification_status_idx'),
+        ]
+    
     def verify(self, verified_by, notes=None):
         """Mark this verification as completed"""
         self.verified_by = verified_by
@@ -88,6 +95,26 @@ class EmployeeVerification(models.Model):
         self.save()
     
 
+def latest_verification(field='verification_status'):
+    """Subquery for a field of each profile's most recent verification, to annotate EmployeeProfile querysets"""
+    return Subquery(
+        EmployeeVerification.objects.filter(
+            employee_profile=OuterRef('pk')
+        ).order_by('-created_at', '-pk').values(field)[:1]
+    )
+
+
+def verification_stats(profiles):
+    """Total, verified, pending and flagged counts of profiles by latest verification, in one query"""
+    return profiles.annotate(latest_status=latest_verification()).aggregate(
+        total_count=Count('pk'),
+        verified_count=Count('pk', filter=Q(latest_status='VERIFIED')),
+        # Staff without a verification record show as pending
+        pending_count=Count('pk', filter=Q(latest_status='PENDING') | Q(latest_status__isnull=True)),
+        flagged_count=Count('pk', filter=Q(latest_status='FLAGGED')),
+    )
+
+
 class AutomatedCheck(models.Model):
     """Model for storing automated verification check rules"""
     
@@ -99,6 +126,7 @@ class AutomatedCheck(models.Model):
         ('MAX_AGE', 'Maximum Age for Employment'),
         ('EDUCATION_GAP', 'Maximum Gap Between Education Levels'),
         ('EDUCATION_OVERLAP', 'Education Timeline Overlap'),
+        ('APPOINTMENT_DATES', 'Appointment Date Consistency'),
     ]
     
     check_name = models.CharField(max_length=100)
@@ -10,6 +10,7 @@ from .forms import *
 from .models import *
 from django.contrib.auth.models import Group
 from django.http import HttpResponseForbidden
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth import logout
 
 from django.shortcuts import render, redirect, get_object_or_404
@@ -19,7 +20,7 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import EmployeeProfile, Department, Unit
+from .models import EmployeeProfile, Department, Unit, BackgroundJob
 from hr_modules.models import (
     Training, TrainingParticipant, 
     LeaveRequest, LeaveBalance, 
@@ -29,133 +30,15 @@ from hr_modules.models import (
 )
 from task_management.models import Task, TaskStatus, TaskPriority
 from file_management.models import File
+from .dashboard import get_dashboard_context
+from .jobs import can_view_job
 
 
 @login_required
 def dashboard(request):
     """Main dashboard view showing key metrics and recent activities"""
-    today = timezone.now().date()
-    user = request.user
-    employee_profile = user.employee_profile
-    
-    # Employee stats
-    employee_count = EmployeeProfile.objects.filter(user__is_active=True).count()
-    new_employees = EmployeeProfile.objects.filter(
-        date_of_assumption__gte=today - timedelta(days=30),
-        user__is_active=True
-    ).count()
-    
-    # Leave stats
-    pending_leaves = LeaveRequest.objects.filter(status='PENDING').count()
-    approved_leaves = LeaveRequest.objects.filter(
-        status='APPROVED',
-        approved_date__gte=today - timedelta(days=30)
-    ).count()
-    
-    # My tasks
-    my_tasks = Task.objects.filter(
-        assigned_to=employee_profile,
-        status__is_completed=False
-    ).select_related('status', 'priority').order_by('due_date')[:5]
-    
-    my_tasks_count = Task.objects.filter(
-        assigned_to=employee_profile,
-        status__is_completed=False
-    ).count()
-    
-    overdue_tasks = Task.objects.filter(
-        assigned_to=employee_profile,
-        status__is_completed=False,
-        due_date__lt=today
-    ).count()
-    
-    # Training stats
-    upcoming_trainings = Training.objects.filter(
-        start_date__gte=today,
-        status='UPCOMING'
-    ).count()
-    
-    ongoing_trainings = Training.objects.filter(
-        start_date__lte=today,
-        end_date__gte=today,
-        status='ONGOING'
-    ).count()
-    
-    # Available trainings
-    available_trainings = Training.objects.filter(
-        Q(status='UPCOMING') | Q(status='ONGOING'),
-        start_date__gte=today - timedelta(days=7)
-    ).order_by('start_date')[:3]
-    
-    # My leave balances
-    leave_balances = LeaveBalance.objects.filter(
-        employee=employee_profile,
-        year=today.year
-    ).select_related('leave_type')
-    
-    # Recent files
-    recent_files = File.objects.filter(
-        status='ACTIVE'
-    ).select_related('created_by').order_by('-created_at')[:5]
-    
-    # Upcoming events - combine trainings, exams, etc.
-    upcoming_events = []
-    
-    # Add trainings
-    for training in Training.objects.filter(
-        start_date__gte=today,
-        start_date__lte=today + timedelta(days=30)
-    ).order_by('start_date')[:3]:
-        upcoming_events.append({
-            'title': f"Training: {training.title}",
-            'description': f"Location: {training.location}",
-            'date': training.start_date,
-        })
-    
-    # Add exams
-    for exam in Examination.objects.filter(
-        scheduled_date__gte=today,
-        scheduled_date__lte=today + timedelta(days=30)
-    ).order_by('scheduled_date')[:3]:
-        upcoming_events.append({
-            'title': f"Exam: {exam.title}",
-            'description': f"Venue: {exam.venue}",
-            'date': exam.scheduled_date,
-        })
-    
-    # Add approved leave dates
-    for leave in LeaveRequest.objects.filter(
-        employee=employee_profile,
-        status='APPROVED',
-        start_date__gte=today
-    ).order_by('start_date')[:3]:
-        upcoming_events.append({
-            'title': f"Leave: {leave.leave_type.name}",
-            'description': f"{leave.start_date} to {leave.end_date}",
-            'date': leave.start_date,
-        })
-    
-    # Sort all events by date
-    upcoming_events.sort(key=lambda x: x['date'])
-    
-    # Get only the next 5 events
-    upcoming_events = upcoming_events[:5]
-    
-    context = {
-        'employee_count': employee_count,
-        'new_employees': new_employees,
-        'pending_leaves': pending_leaves,
-        'approved_leaves': approved_leaves,
-        'my_tasks': my_tasks,
-        'my_tasks_count': my_tasks_count,
-        'overdue_tasks': overdue_tasks,
-        'upcoming_trainings': upcoming_trainings,
-        'ongoing_trainings': ongoing_trainings,
-        'available_trainings': available_trainings,
-        'leave_balances': leave_balances,
-        'recent_files': recent_files,
-        'upcoming_events': upcoming_events,
-    }
+    # Org-wide counters come from a short-lived shared cache; per-user data is live
+    context = get_dashboard_context(request.user)
     
     return render(request, 'dashboard.html', context)
 
@@ -280,4 +163,25 @@ def employee_detail(request, pk):
         'employee_profile': employee_profile,
     }
     
-    return render(request, 'employee_detail.html', context) 
\ No newline at end of file
+    return render(request, 'employee_detail.html', context) 
+
+@login_required
+def job_status(request, pk):
+    """Progress and outcome of a background job; HTMX polls re-render only the status panel"""
+    job = get_object_or_404(BackgroundJob, pk=pk)
+    if not can_view_job(request.user, job):
+        return HttpResponseForbidden("You don't have permission to view this job.")
+    
+    # Where to go once the job has finished, as given by the page that queued it
+    next_url = request.GET.get('next', '')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = ''
+    
+    context = {
+        'job': job,
+        'next_url': next_url,
+    }
+    
+    if request.headers.get('HX-Request'):
+        return render(request, 'core/job_status_panel.html', context)
+    return render(request, 'core/job_status.html', context)
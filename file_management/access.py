@@ -0,0 +1,122 @@
+"""
+File access checks
+
+accessible_file_ids() decides access for a whole page of files at once: one
+query reads ownership and visibility of the files, one reads the user's active
+shares for them. The answers are memoised on the user instance, which lives as
+long as the request, so asking again about the same files (a list and then its
+row actions, or VIEW, EDIT and DELETE on one file) runs no further queries.
+
+viewable_files() applies the VIEW rule to a whole queryset in SQL, for search
+results and pickers where the candidates are too many to check by id.
+
+The rules are those of user_can_access_file(), which now goes through the same
+code with the file it is given:
+- superusers and staff can do anything
+- the creator and the owning employee can do anything
+- VIEW: files owned by the user's department, files shared with the user or
+  their department; every file for the can_view_all_files role permission in
+  lists (viewable_files)
+- EDIT / DELETE: for files owned by the user's department, the can_manage_files
+  role permission; otherwise a share with that permission or FULL
+- FULL: the creator, the owning employee or the can_manage_file_permissions
+  role permission
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from core.permissions import _user_memo, get_cached_user_permissions
+
+from .models import File, FileSharePermission
+
+
+def user_department_id(user):
+    return user.employee_profile.current_department_id
+
+
+def active_shares(user):
+    """Unexpired shares with the user or their department"""
+    department_id = user_department_id(user)
+    shared_with = Q(user=user) | Q(department_id=department_id) if department_id else Q(user=user)
+    return FileSharePermission.objects.filter(
+        shared_with, Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    )
+
+
+def load_file_facts(user, rows):
+    """Memoise (created_by, owner_employee, owner_department, share permissions) per file row"""
+    facts = _user_memo(user, '_file_access_facts')
+    rows = [row for row in rows if row[0] not in facts]
+    if not rows:
+        return facts
+
+    shares = {}
+    for file_id, permission in active_shares(user).filter(
+        file_id__in=[row[0] for row in rows],
+    ).values_list('file_id', 'permission'):
+        shares.setdefault(file_id, set()).add(permission)
+
+    for file_id, *ownership in rows:
+        facts[file_id] = (*ownership, shares.get(file_id, set()))
+    return facts
+
+
+def allowed(user, facts, permission):
+    """Whether the memoised facts of one file grant permission to a user who is not staff"""
+    created_by_id, owner_employee_id, owner_department_id, shares = facts
+    if created_by_id == user.pk or (owner_employee_id and owner_employee_id == user.employee_profile.pk):
+        return True
+
+    department_owned = bool(owner_department_id) and owner_department_id == user_department_id(user)
+    if permission == 'VIEW':
+        return department_owned or bool(shares)
+    if permission in ('EDIT', 'DELETE'):
+        if department_owned:
+            return bool(get_cached_user_permissions(user).get('can_manage_files', False))
+        return permission in shares or 'FULL' in shares
+    if permission == 'FULL':
+        return bool(get_cached_user_permissions(user).get('can_manage_file_permissions', False))
+    return False
+
+
+def accessible_file_ids(user, file_ids, permission='VIEW'):
+    """The ids among file_ids that user may access with permission"""
+    file_ids = set(file_ids)
+    if user.is_superuser or user.is_staff:
+        return file_ids
+
+    facts = _user_memo(user, '_file_access_facts')
+    missing = [pk for pk in file_ids if pk not in facts]
+    if missing:
+        load_file_facts(user, File.objects.filter(pk__in=missing).values_list(
+            'pk', 'created_by_id', 'owner_employee_id', 'owner_department_id'
+        ))
+    return {pk for pk in file_ids if pk in facts and allowed(user, facts[pk], permission)}
+
+
+def user_can_access_file(user, file, permission='VIEW'):
+    """Check if a user has the specified permission for a file"""
+    if user.is_superuser or user.is_staff:
+        return True
+
+    # The file is already loaded, so only its shares need a query
+    facts = load_file_facts(user, [(
+        file.pk, file.created_by_id, file.owner_employee_id, file.owner_department_id
+    )])
+    return allowed(user, facts[file.pk], permission)
+
+
+def viewable_files(user, files):
+    """files narrowed to those user may view, as one SQL filter"""
+    if user.is_superuser or user.is_staff or get_cached_user_permissions(user).get('can_view_all_files', False):
+        return files
+
+    department_id = user_department_id(user)
+    # The shares are a subquery, so a file shared twice is not repeated
+    visible = (
+        Q(created_by=user) | Q(owner_employee_id=user.employee_profile.pk) |
+        Q(pk__in=active_shares(user).values('file_id'))
+    )
+    if department_id:
+        visible |= Q(owner_department_id=department_id)
+    return files.filter(visible)
@@ -0,0 +1,210 @@
+"""
+File access log buffer
+
+Views record file access with log_access(), which only appends to a
+per-process buffer; the write never runs inside a view. The buffer is written
+with one bulk_create once it holds FILE_ACCESS_LOG_BATCH_SIZE events, or once
+its oldest event is FILE_ACCESS_LOG_FLUSH_SECONDS old: after the next response
+is sent, or from a timer thread when the process sits idle. Viewing or
+downloading a file therefore no longer waits on a write, and SQLite's single
+writer sees one insert per batch instead of one per page view.
+
+Events whose file or user was deleted while they waited are dropped before the
+insert. SQLite only checks foreign keys when the outermost transaction
+commits, so a bad row could not be caught at the insert itself.
+
+Events carry the time they happened, not the time they were written. A batch
+that cannot be written (database locked or unreachable, or any other error),
+and whatever is still buffered when the process exits, is appended to
+FILE_ACCESS_LOG_SPOOL as JSON lines; the next successful flush replays the
+spool.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import File, FileAccessLog
+
+
+logger = logging.getLogger(__name__)
+
+FILE_ACCESS_LOG_BATCH_SIZE = getattr(settings, 'FILE_ACCESS_LOG_BATCH_SIZE', 100)
+FILE_ACCESS_LOG_FLUSH_SECONDS = getattr(settings, 'FILE_ACCESS_LOG_FLUSH_SECONDS', 5)
+FILE_ACCESS_LOG_SPOOL = getattr(
+    settings, 'FILE_ACCESS_LOG_SPOOL', os.path.join(settings.BASE_DIR, 'data', 'file_access_spool.jsonl')
+)
+
+FIELDS = ('file_id', 'user_id', 'action', 'timestamp', 'ip_address', 'user_agent')
+
+
+def get_client_ip(request):
+    """Get client IP address from request"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+class AccessLogBuffer:
+    """Thread-safe list of unsaved FileAccessLog rows with size and age thresholds"""
+
+    def __init__(self, batch_size=FILE_ACCESS_LOG_BATCH_SIZE, flush_seconds=FILE_ACCESS_LOG_FLUSH_SECONDS,
+                 spool_path=FILE_ACCESS_LOG_SPOOL, background=True):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_path = spool_path
+        self.background = background
+        self.entries = []
+        self.oldest = None
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        # Only appends: a full batch is written after the response (or by the timer), never in the view
+        with self.lock:
+            if not self.entries:
+                self.oldest = time.monotonic()
+                self.schedule()
+            self.entries.append(entry)
+
+    def schedule(self):
+        # Called with the lock held, when the first event of a batch arrives
+        if self.background and self.timer is None:
+            self.timer = threading.Timer(self.flush_seconds, self.flush_idle)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush_idle(self):
+        """Timer thread: write what the process is holding without waiting for a request"""
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+    def due(self):
+        return bool(self.entries) and (
+            len(self.entries) >= self.batch_size or time.monotonic() - self.oldest >= self.flush_seconds
+        )
+
+    def take(self):
+        with self.lock:
+            entries, self.entries, self.oldest = self.entries, [], None
+        return entries
+
+    def flush(self):
+        """Write the buffered events and any spooled ones; returns how many were written"""
+        entries = self.take()
+        try:
+            entries += self.read_spool()
+            return self.write(entries) if entries else 0
+        except Exception:
+            # The buffer is already emptied, so whatever went wrong the events go to the spool
+            logger.exception("Could not write %s file access log entries; spooling them", len(entries))
+            if entries:
+                self.spool(entries)
+            return 0
+
+    def write(self, entries):
+        entries = self.existing(entries)
+        try:
+            with transaction.atomic():
+                FileAccessLog.objects.bulk_create(entries, batch_size=self.batch_size)
+        except IntegrityError:
+            # Deleted between the check and the insert
+            entries = self.existing(entries)
+            FileAccessLog.objects.bulk_create(entries, batch_size=self.batch_size)
+        return len(entries)
+
+    def existing(self, entries):
+        """The entries whose file and user still exist"""
+        file_ids = set(File.objects.filter(pk__in={entry.file_id for entry in entries}).values_list('pk', flat=True))
+        user_ids = set(User.objects.filter(pk__in={entry.user_id for entry in entries}).values_list('pk', flat=True))
+        return [entry for entry in entries if entry.file_id in file_ids and entry.user_id in user_ids]
+
+    def spool(self, entries):
+        """Append events to the spool file to be written by a later flush"""
+        lines = ''.join(
+            json.dumps({
+                field: value.isoformat() if field == 'timestamp' else value
+                for field in FIELDS for value in [getattr(entry, field)]
+            }) + '\n'
+            for entry in entries
+        )
+        os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+        with open(self.spool_path, 'a', encoding='utf-8') as spool:
+            spool.write(lines)
+
+    def read_spool(self):
+        """Take the spooled events, leaving no spool behind"""
+        # Renaming first means two processes never replay the same lines
+        claimed = f'{self.spool_path}.{os.getpid()}.{threading.get_ident()}'
+        try:
+            os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        with open(claimed, encoding='utf-8') as spool:
+            for line in spool:
+                if line.strip():
+                    values = json.loads(line)
+                    values['timestamp'] = parse_datetime(values['timestamp'])
+                    entries.append(FileAccessLog(**values))
+        os.remove(claimed)
+        return entries
+
+    def close(self):
+        """Write what is left at shutdown, falling back to the spool"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        entries = self.take()
+        if not entries:
+            return
+        try:
+            self.write(entries)
+        except Exception:
+            self.spool(entries)
+
+
+buffer = AccessLogBuffer()
+atexit.register(buffer.close)
+
+
+def log_access(request, file, action):
+    """Record that request.user performed action on file"""
+    buffer.add(FileAccessLog(
+        file_id=file.pk,
+        user_id=request.user.pk,
+        action=action,
+        timestamp=timezone.now(),
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+    ))
+
+
+def flush_access_logs():
+    """Write buffered file access events now"""
+    return buffer.flush()
+
+
+# Runs once the response has gone to the client
+@receiver(request_finished)
+def flush_due_access_logs(sender, **kwargs):
+    if buffer.due():
+        buffer.flush()
@@ -6,7 +6,7 @@ from import_export.widgets import ForeignKeyWidget
 
 from .models import (
     FileCategory, FileAccessLevel, File, FileSharePermission, 
-    FileAccessLog, FileTag, FileTagAssignment, FileComment,
+    FileAccessLog, FileAccessDailyCount, FileTag, FileTagAssignment, FileComment,
     Folder, FolderFile
 )
 from core.models import EmployeeProfile, Department
@@ -146,6 +146,14 @@ class FileAccessLogAdmin(admin.ModelAdmin):
     readonly_fields = ('timestamp',)
 
 
+@admin.register(FileAccessDailyCount)
+class FileAccessDailyCountAdmin(admin.ModelAdmin):
+    list_display = ('file', 'user', 'action', 'day', 'count')
+    list_filter = ('action', 'day')
+    search_fields = ('file__title', 'user__username')
+    date_hierarchy = 'day'
+
+
 @admin.register(FileTag)
 class FileTagAdmin(admin.ModelAdmin):
     list_display = ('name',)
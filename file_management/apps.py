@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class FileManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'file_management'
+
+    def ready(self):
+        # Keep the file search index in step with files and their tags
+        from . import search  # noqa: F401
+        # Flush buffered file access events after each response
+        from . import access_log  # noqa: F401
+        # Keep the folder closure table in step with the folder tree
+        from . import folder_tree  # noqa: F401
@@ -0,0 +1,99 @@
+"""
+Folder tree
+
+FolderClosure holds a row for every folder and each of its ancestors, so a
+folder's breadcrumbs (Folder.get_ancestors), its whole subtree
+(Folder.get_descendants) and recursive file counts are single queries however
+deep the hierarchy goes.
+
+The signals below keep the table current:
+- a new folder gets its parent's ancestor rows plus its own
+- changing a folder's parent moves its whole subtree: the links between the
+  subtree and its old ancestors are deleted and links to the new ancestors
+  inserted, two statements whatever the subtree's size
+- deleting a folder cascades to its subfolders and their closure rows; the
+  folder_delete view allows it when the user may delete the whole subtree
+
+A folder cannot be moved into its own subtree. Folder.clean() reports it as
+a form error; saving one there anyway raises FolderCycleError before anything
+is written.
+"""
+from django.db.models import DEFERRED, Count
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Folder, FolderClosure, FolderFile
+
+
+class FolderCycleError(Exception):
+    """A folder was saved inside its own subtree"""
+
+
+def move_folder(folder, parent):
+    """Move folder and its subtree under parent (None for the top level); raises FolderCycleError"""
+    folder.parent = parent
+    folder.save(update_fields=['parent', 'modified_at'])
+    return folder
+
+
+def subtree_file_counts(folders):
+    """{folder id: files anywhere in the folder's subtree} for the given folders, in one query"""
+    return dict(
+        FolderFile.objects.filter(
+            folder__ancestor_links__ancestor__in=folders
+        ).values_list('folder__ancestor_links__ancestor').annotate(Count('file', distinct=True)).order_by()
+    )
+
+
+def subtree_size(folder):
+    """(subfolders, distinct files) anywhere below folder"""
+    subfolders = folder.get_descendants(include_self=False).count()
+    return subfolders, subtree_file_counts([folder]).get(folder.pk, 0)
+
+
+def link_subtree(folder, parent_id):
+    """Insert the links between parent_id's ancestors and every folder in folder's subtree"""
+    if parent_id is None:
+        return
+    ancestors = list(FolderClosure.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+    descendants = list(FolderClosure.objects.filter(ancestor=folder).values_list('descendant_id', 'depth'))
+    FolderClosure.objects.bulk_create([
+        FolderClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=above + below + 1)
+        for ancestor_id, above in ancestors
+        for descendant_id, below in descendants
+    ], batch_size=1000)
+
+
+# Remember the parent each folder was loaded with, to spot moves on save
+@receiver(post_init, sender=Folder)
+def remember_parent(sender, instance, **kwargs):
+    # A deferred parent is loaded when first read; reading it here would cost a query per row
+    instance._tree_parent_id = instance.__dict__.get('parent_id', DEFERRED)
+
+
+@receiver(pre_save, sender=Folder)
+def load_deferred_parent(sender, instance, raw=False, **kwargs):
+    if instance._tree_parent_id is DEFERRED and instance.pk is not None:
+        instance._tree_parent_id = Folder.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Folder)
+def refuse_cycles(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or instance.parent_id == instance._tree_parent_id:
+        return
+    if instance.contains(instance.parent_id):
+        raise FolderCycleError("A folder cannot be moved into itself or one of its subfolders.")
+
+
+@receiver(post_save, sender=Folder)
+def update_closure(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        FolderClosure.objects.create(ancestor=instance, descendant=instance, depth=0)
+        link_subtree(instance, instance.parent_id)
+    elif instance.parent_id != instance._tree_parent_id:
+        subtree = FolderClosure.objects.filter(ancestor=instance).values('descendant_id')
+        FolderClosure.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        link_subtree(instance, instance.parent_id)
+    instance._tree_parent_id = instance.parent_id
@@ -0,0 +1,127 @@
+"""
+File access log retention
+
+FileAccessLog keeps every event for FILE_ACCESS_LOG_RETENTION_DAYS. After that,
+"manage.py compact_file_access_logs" folds each day's events into one
+FileAccessDailyCount row per file, user and action, and deletes them, a month
+of days per transaction. The raw
+log then holds only the recent window, so inserts and the newest-first history
+on the file page stay fast however long the system runs.
+
+access_counts() and access_totals() read both tables, so reports see the
+whole history without caring where a day's events are stored. Only counts
+survive compaction; the time of day, IP address and user agent of old events
+do not.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import FileAccessDailyCount, FileAccessLog
+
+
+FILE_ACCESS_LOG_RETENTION_DAYS = getattr(settings, 'FILE_ACCESS_LOG_RETENTION_DAYS', 90)
+COMPACTION_WINDOW_DAYS = 31
+COMPACTION_BATCH_SIZE = 1000
+
+
+def day_start(day):
+    """Midnight at the start of day in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def retention_cutoff(days=None, today=None):
+    """First day whose events are kept in full"""
+    today = today or timezone.localdate()
+    return today - timedelta(days=FILE_ACCESS_LOG_RETENTION_DAYS if days is None else days)
+
+
+def compact_window(first_day, end_day, dry_run=False):
+    """Fold the events from first_day up to end_day into daily counts and delete them; returns (days, events, count rows)"""
+    events = FileAccessLog.objects.filter(timestamp__gte=day_start(first_day), timestamp__lt=day_start(end_day))
+    counts = {
+        (row['file_id'], row['user_id'], row['action'], row['day']): row['events']
+        for row in events.annotate(day=TruncDate('timestamp')).values(
+            'file_id', 'user_id', 'action', 'day'
+        ).annotate(events=Count('pk')).order_by()
+    }
+    totals = (len({key[3] for key in counts}), sum(counts.values()), len(counts))
+    if dry_run or not counts:
+        return totals
+
+    with transaction.atomic():
+        # Events flushed late can land on a day that was already compacted
+        existing = {
+            (row.file_id, row.user_id, row.action, row.day): row
+            for row in FileAccessDailyCount.objects.filter(day__gte=first_day, day__lt=end_day)
+        }
+        changed = []
+        for key, number in counts.items():
+            if key in existing:
+                existing[key].count += number
+                changed.append(existing[key])
+        FileAccessDailyCount.objects.bulk_update(changed, ['count'], batch_size=COMPACTION_BATCH_SIZE)
+        FileAccessDailyCount.objects.bulk_create([
+            FileAccessDailyCount(file_id=file_id, user_id=user_id, action=action, day=day, count=number)
+            for (file_id, user_id, action, day), number in counts.items()
+            if (file_id, user_id, action, day) not in existing
+        ], batch_size=COMPACTION_BATCH_SIZE)
+        events.delete()
+    return totals
+
+
+def compact_access_logs(before, dry_run=False):
+    """Compact every day before the date before, oldest first, a window of days per transaction"""
+    cutoff = day_start(before)
+    counts = {'days': 0, 'events': 0, 'count_rows': 0}
+
+    older = FileAccessLog.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True)
+    oldest = older.first()
+    while oldest is not None:
+        first_day = timezone.localdate(oldest)
+        end_day = min(first_day + timedelta(days=COMPACTION_WINDOW_DAYS), before)
+        days, events, rows = compact_window(first_day, end_day, dry_run)
+        counts['days'] += days
+        counts['events'] += events
+        counts['count_rows'] += rows
+        # Skip straight to the next window that has events
+        oldest = older.filter(timestamp__gte=day_start(end_day)).first()
+    return counts
+
+
+def access_counts(file=None, user=None, since=None):
+    """[(day, action, count)] over raw and compacted events, newest day first"""
+    events = FileAccessLog.objects.all()
+    compacted = FileAccessDailyCount.objects.all()
+    if file is not None:
+        events, compacted = events.filter(file=file), compacted.filter(file=file)
+    if user is not None:
+        events, compacted = events.filter(user=user), compacted.filter(user=user)
+    if since is not None:
+        events, compacted = events.filter(timestamp__gte=day_start(since)), compacted.filter(day__gte=since)
+
+    counts = Counter()
+    for row in events.annotate(day=TruncDate('timestamp')).values('day', 'action').annotate(events=Count('pk')).order_by():
+        counts[(row['day'], row['action'])] += row['events']
+    for row in compacted.values('day', 'action').annotate(events=Sum('count')).order_by():
+        counts[(row['day'], row['action'])] += row['events']
+    return sorted(((day, action, count) for (day, action), count in counts.items()), key=lambda row: row[0], reverse=True)
+
+
+def access_totals(file=None, user=None):
+    """{action: count} over raw and compacted events"""
+    events = FileAccessLog.objects.all()
+    compacted = FileAccessDailyCount.objects.all()
+    if file is not None:
+        events, compacted = events.filter(file=file), compacted.filter(file=file)
+    if user is not None:
+        events, compacted = events.filter(user=user), compacted.filter(user=user)
+
+    totals = Counter(dict(events.values_list('action').annotate(Count('pk')).order_by()))
+    totals.update(dict(compacted.values_list('action').annotate(Sum('count')).order_by()))
+    return dict(totals)
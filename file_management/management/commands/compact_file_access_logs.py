@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from file_management.access_log import flush_access_logs
+from file_management.log_archive import FILE_ACCESS_LOG_RETENTION_DAYS, compact_access_logs, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Compact file access events older than the retention period into daily counts per file, user and action'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=FILE_ACCESS_LOG_RETENTION_DAYS,
+                            help=f'Days of events to keep in full (default {FILE_ACCESS_LOG_RETENTION_DAYS})')
+        parser.add_argument('--dry-run', action='store_true', help='Report the counts without changing anything')
+
+    def handle(self, *args, **options):
+        # Replay anything spooled by web processes before compacting
+        flush_access_logs()
+
+        cutoff = retention_cutoff(options['days'])
+        started = time.perf_counter()
+        counts = compact_access_logs(cutoff, dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        suffix = ' (dry run, nothing changed)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {counts['events']} events before {cutoff} from {counts['days']} days into "
+            f"{counts['count_rows']} daily counts in {elapsed:.2f}s{suffix}"
+        ))
@@ -0,0 +1,25 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from file_management.storage import unreferenced_blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete stored file contents that no file or file version refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Only delete blobs at least this many seconds old (default 3600)')
+        parser.add_argument('--dry-run', action='store_true', help='Report the blobs without deleting them')
+
+    def handle(self, *args, **options):
+        count = size = 0
+        for path in unreferenced_blobs(options['min_age']):
+            count += 1
+            size += os.path.getsize(path)
+            if not options['dry_run']:
+                os.remove(path)
+
+        suffix = ' (dry run, nothing deleted)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} unreferenced blobs, {size} bytes{suffix}"))
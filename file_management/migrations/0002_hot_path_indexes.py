@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0006_hot_path_indexes'),
+        ('file_management', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='file_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileaccesslog',
+            index=models.Index(fields=['file', '-timestamp'], name='file_log_file_time_idx'),
+        ),
+    ]
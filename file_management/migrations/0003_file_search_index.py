@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from core.search import SearchIndex, batches, create_search_table, drop_search_table, search_backend, write_documents
+
+
+# The table as this migration creates it, whatever file_management.search registers later
+FILE_INDEX = SearchIndex('files', None, 'file_management_file_search', ('title', 'description', 'tags'), None, ())
+
+
+def create_index(apps, schema_editor):
+    create_search_table(schema_editor.connection, FILE_INDEX)
+    if not search_backend(schema_editor.connection):
+        return
+
+    # Index the files that already exist, from the historical models
+    File = apps.get_model('file_management', 'File')
+    FileTagAssignment = apps.get_model('file_management', 'FileTagAssignment')
+    for batch in batches(File.objects.order_by('pk').values_list('pk', 'title', 'description')):
+        tags = defaultdict(list)
+        for file_id, tag_name in FileTagAssignment.objects.filter(
+            file_id__in=[pk for pk, _, _ in batch]
+        ).values_list('file_id', 'tag__name'):
+            tags[file_id].append(tag_name)
+        write_documents(FILE_INDEX, [
+            (pk, {'title': title, 'description': description, 'tags': ' '.join(tags[pk])})
+            for pk, title, description in batch
+        ])
+
+
+def drop_index(apps, schema_editor):
+    drop_search_table(schema_editor.connection, FILE_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_staff_search_index'),
+        ('file_management', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
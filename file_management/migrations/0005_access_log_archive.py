@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_management', '0004_access_log_event_time'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileAccessDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('VIEW', 'Viewed'), ('DOWNLOAD', 'Downloaded'), ('EDIT', 'Edited'), ('DELETE', 'Deleted'), ('SHARE', 'Shared'), ('PRINT', 'Printed')], max_length=10)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='fileaccesslog',
+            index=models.Index(fields=['timestamp'], name='file_log_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='fileaccessdailycount',
+            name='file',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='access_counts', to='file_management.file'),
+        ),
+        migrations.AddField(
+            model_name='fileaccessdailycount',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='fileaccessdailycount',
+            index=models.Index(fields=['user', '-day'], name='file_count_user_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='fileaccessdailycount',
+            constraint=models.UniqueConstraint(fields=('file', 'user', 'action', 'day'), name='file_access_daily_count_unique'),
+        ),
+    ]
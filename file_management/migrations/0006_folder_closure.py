@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    """Closure rows for the folders that already exist"""
+    Folder = apps.get_model('file_management', 'Folder')
+    FolderClosure = apps.get_model('file_management', 'FolderClosure')
+    parents = dict(Folder.objects.values_list('pk', 'parent_id'))
+
+    rows = []
+    for folder_id in parents:
+        ancestor_id, depth = folder_id, 0
+        while ancestor_id is not None:
+            rows.append(FolderClosure(ancestor_id=ancestor_id, descendant_id=folder_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    FolderClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('file_management', '0005_access_log_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FolderClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='file_management.folder')),
+                ('descendant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='file_management.folder')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='folder_closure_desc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='folder_closure_unique')],
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
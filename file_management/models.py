@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from core.models import EmployeeProfile, Department
@@ -30,7 +32,7 @@ class FileAccessLevel(models.Model):
 
 
 class File(models.Model):
-    """File metadata (no actual file storage)"""
+    """File metadata; the content is a blob in storage named by file_reference (see storage)"""
     FILE_STATUS_CHOICES = [
         ('ACTIVE', 'Active'),
         ('ARCHIVED', 'Archived'),
@@ -75,6 +77,12 @@ class File(models.Model):
     
     def __str__(self):
         return self.title
+    
+    class Meta:
+        indexes = [
+            # Active files, newest first (file list, dashboard)
+            models.Index(fields=['status', '-created_at', '-id'], name='file_status_created_idx'),
+        ]
 
 
 class FileSharePermission(models.Model):
@@ -123,12 +131,42 @@ class FileAccessLog(models.Model):
     file = models.ForeignKey(File, on_delete=models.CASCADE, related_name='access_logs')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens; events are written later in batches (see access_log)
+    timestamp = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True, null=True)
     
     def __str__(self):
         return f"{self.user.username} {self.action} {self.file.title} at {self.timestamp}"
+    
+    class Meta:
+        indexes = [
+            # A file's access history, newest first
+            models.Index(fields=['file', '-timestamp'], name='file_log_file_time_idx'),
+            # Compaction walks the log a day at a time from the oldest row
+            models.Index(fields=['timestamp'], name='file_log_time_idx'),
+        ]
+
+
+class FileAccessDailyCount(models.Model):
+    """File access events older than the retention period, compacted to a count per file, user, action and day"""
+    # The unique constraint and the user index below cover lookups by file and by user
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name='access_counts', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    action = models.CharField(max_length=10, choices=FileAccessLog.ACTION_CHOICES)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} {self.action} {self.file.title} x{self.count} on {self.day}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['file', 'user', 'action', 'day'], name='file_access_daily_count_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-day'], name='file_count_user_day_idx'),
+        ]
 
 
 class FileTag(models.Model):
@@ -185,11 +223,59 @@ class Folder(models.Model):
     def __str__(self):
         return self.name
     
+    def clean(self):
+        # Forms and the admin show a move into the folder's own subtree as a field error
+        if self.contains(self.parent_id):
+            raise ValidationError({'parent': "A folder cannot be moved into itself or one of its subfolders."})
+    
+    def contains(self, folder_id):
+        """Whether folder_id is this folder or one below it, in one query"""
+        if self.pk is None or folder_id is None:
+            return False
+        if folder_id == self.pk:
+            return True
+        return FolderClosure.objects.filter(ancestor_id=self.pk, descendant_id=folder_id).exists()
+    
+    def get_ancestors(self, include_self=True):
+        """Folders from the root down to this one, in one query (see FolderClosure)"""
+        ancestors = Folder.objects.filter(descendant_links__descendant=self)
+        if not include_self:
+            ancestors = ancestors.filter(descendant_links__depth__gt=0)
+        return ancestors.order_by('-descendant_links__depth')
+    
+    def get_descendants(self, include_self=True):
+        """Every folder in this folder's subtree, in one query"""
+        descendants = Folder.objects.filter(ancestor_links__ancestor=self)
+        if not include_self:
+            descendants = descendants.filter(ancestor_links__depth__gt=0)
+        return descendants
+    
     def get_path(self):
         """Get the full path of the folder"""
-        if self.parent:
-            return f"{self.parent.get_path()}/{self.name}"
-        return self.name
+        return '/'.join(self.get_ancestors().values_list('name', flat=True))
+
+
+class FolderClosure(models.Model):
+    """
+    One row per folder and each of its ancestors, itself included at depth 0,
+    kept up to date by the signals in folder_tree
+    """
+    # The unique constraint and the index below cover lookups by either side
+    ancestor = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='descendant_links', db_index=False)
+    descendant = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='ancestor_links', db_index=False)
+    depth = models.PositiveIntegerField()
+    
+    def __str__(self):
+        return f"{self.ancestor} > {self.descendant} ({self.depth})"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='folder_closure_unique'),
+        ]
+        indexes = [
+            # Breadcrumbs: a folder's ancestors by depth
+            models.Index(fields=['descendant', 'depth'], name='folder_closure_desc_idx'),
+        ]
 
 
 class FolderFile(models.Model):
@@ -0,0 +1,56 @@
+"""
+File search index
+
+Title, description and tag names of every file, searched through
+core.search so tag matches need no join (and no distinct()) on the file list.
+"""
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.search import SearchIndex, index_objects, register, remove_objects
+
+from .models import File, FileTag, FileTagAssignment
+
+
+def file_documents(queryset):
+    files = list(queryset.values_list('pk', 'title', 'description'))
+    tags = defaultdict(list)
+    for file_id, tag_name in FileTagAssignment.objects.filter(
+        file_id__in=[pk for pk, _, _ in files]
+    ).values_list('file_id', 'tag__name'):
+        tags[file_id].append(tag_name)
+
+    for pk, title, description in files:
+        yield pk, {'title': title, 'description': description, 'tags': ' '.join(tags[pk])}
+
+
+register(SearchIndex(
+    'files', File, 'file_management_file_search', ('title', 'description', 'tags'), file_documents,
+    lookups=('title', 'description', 'tag_assignments__tag__name'),
+))
+
+
+@receiver(post_save, sender=File)
+def index_file(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_objects('files', [instance.pk])
+
+
+@receiver(post_delete, sender=File)
+def remove_file(sender, instance, **kwargs):
+    remove_objects('files', [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=FileTagAssignment)
+def index_tagged_file(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_objects('files', [instance.file_id])
+
+
+@receiver(post_save, sender=FileTag)
+def index_renamed_tag(sender, instance, raw=False, **kwargs):
+    """A renamed tag changes the text of every file carrying it"""
+    if not raw:
+        index_objects('files', instance.file_assignments.values_list('file_id', flat=True))
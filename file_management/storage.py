@@ -0,0 +1,193 @@
+"""
+File blob storage
+
+Uploaded content is stored once per SHA-256 digest under FILE_STORAGE_ROOT,
+at ab/cd/<digest>, and File.file_reference holds "sha256:<digest>". store()
+streams an upload chunk by chunk into a temporary file in the same directory
+tree while hashing it, then renames it into place with FILE_UPLOAD_PERMISSIONS
+(0644 by default), so a large scanned document is never held whole in memory
+and a half-written blob is never visible. When the blob already exists (a
+re-upload, or a new version with unchanged content) the copy is discarded and
+the File rows share it.
+
+serve() answers a download:
+- with FILE_SENDFILE_HEADER set (X-Accel-Redirect for nginx, X-Sendfile for
+  Apache) only the header is returned and the web server sends the bytes
+- a single "Range: bytes=" request gets a 206 with just that part, so
+  interrupted downloads resume and PDF viewers can fetch pages on demand
+- otherwise a FileResponse, which the WSGI server can pass to sendfile()
+
+Blobs are never removed when a File is, since other versions may share them;
+"manage.py prune_file_blobs" removes the ones no File refers to.
+
+References that are not "sha256:" (files recorded before storage existed)
+have no content; is_stored() is False for them.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .models import File
+
+
+FILE_STORAGE_ROOT = str(getattr(settings, 'FILE_STORAGE_ROOT', os.path.join(settings.BASE_DIR, 'data', 'blobs')))
+FILE_STORAGE_CHUNK_SIZE = getattr(settings, 'FILE_STORAGE_CHUNK_SIZE', 1024 * 1024)
+FILE_SENDFILE_HEADER = getattr(settings, 'FILE_SENDFILE_HEADER', None)
+FILE_SENDFILE_PREFIX = getattr(settings, 'FILE_SENDFILE_PREFIX', '/protected/blobs/')
+# mkstemp creates 0600 files; the web server sending them may run as another user
+FILE_STORAGE_MODE = getattr(settings, 'FILE_UPLOAD_PERMISSIONS', None) or 0o644
+
+PREFIX = 'sha256:'
+REFERENCE = re.compile(r'^sha256:([0-9a-f]{64})$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def digest_of(reference):
+    """The digest in a blob reference, or None for references without content"""
+    match = REFERENCE.match(reference or '')
+    return match.group(1) if match else None
+
+
+def relative_path(digest):
+    return os.path.join(digest[:2], digest[2:4], digest)
+
+
+def blob_path(reference):
+    """Absolute path of the blob a reference points to, or None"""
+    digest = digest_of(reference)
+    return os.path.join(FILE_STORAGE_ROOT, relative_path(digest)) if digest else None
+
+
+def is_stored(reference):
+    path = blob_path(reference)
+    return path is not None and os.path.exists(path)
+
+
+def store(uploaded):
+    """Stream an uploaded file into storage; returns (reference, size)"""
+    os.makedirs(FILE_STORAGE_ROOT, exist_ok=True)
+    sha256 = hashlib.sha256()
+    size = 0
+    handle, temporary = tempfile.mkstemp(dir=FILE_STORAGE_ROOT, prefix='.upload-')
+    try:
+        with os.fdopen(handle, 'wb') as blob:
+            for chunk in uploaded.chunks(FILE_STORAGE_CHUNK_SIZE):
+                sha256.update(chunk)
+                blob.write(chunk)
+                size += len(chunk)
+
+        reference = PREFIX + sha256.hexdigest()
+        path = blob_path(reference)
+        if os.path.exists(path):
+            # Same content already stored; touching it keeps prune_file_blobs off it until the File row exists
+            os.remove(temporary)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(temporary, FILE_STORAGE_MODE)
+            os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return reference, size
+
+
+def download_name(file):
+    extension = f'.{file.file_type.lower()}' if file.file_type else ''
+    name = file.title or 'file'
+    return name if name.lower().endswith(extension) else name + extension
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable byte range, None to send everything, False if unsatisfiable"""
+    match = RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        # Malformed or multiple ranges: the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def starts_download(header):
+    """Whether a request with this Range header (or none) fetches the file from its first byte"""
+    if not header:
+        return True
+    match = RANGE.match(header.strip())
+    # Anything serve() answers with the whole file counts as a fresh download
+    return not match or not any(match.groups()) or (match.group(1) != '' and int(match.group(1)) == 0)
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as blob:
+        blob.seek(start)
+        while length > 0:
+            chunk = blob.read(min(FILE_STORAGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve(request, file):
+    """Response sending the content of file, honouring Range requests"""
+    path = blob_path(file.file_reference)
+    size = os.path.getsize(path)
+    etag = f'"{digest_of(file.file_reference)}"'
+    name = download_name(file)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    if FILE_SENDFILE_HEADER:
+        # The web server handles ranges and sending; only the headers come from here
+        response = HttpResponse(content_type=content_type)
+        response[FILE_SENDFILE_HEADER] = FILE_SENDFILE_PREFIX + relative_path(digest_of(file.file_reference))
+    else:
+        requested = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        byte_range = parse_range(requested, size) if requested and (not if_range or if_range == etag) else None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+    response['Content-Disposition'] = content_disposition_header(True, name)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
+
+
+def unreferenced_blobs(min_age_seconds=3600):
+    """Paths of blobs no File refers to, skipping recent ones that may belong to an upload in progress"""
+    referenced = {
+        digest_of(reference)
+        for reference in File.objects.filter(file_reference__startswith=PREFIX).values_list('file_reference', flat=True)
+    }
+    cutoff = time.time() - min_age_seconds
+    for directory, _, names in os.walk(FILE_STORAGE_ROOT):
+        for name in names:
+            path = os.path.join(directory, name)
+            if name not in referenced and os.path.getmtime(path) < cutoff:
+                yield path
@@ -1,3 +1,399 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+import os
+import tempfile
+import threading
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.forms import modelform_factory
+from django.http import HttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Department, EmployeeProfile
+
+from . import access_log, storage
+from .access import accessible_file_ids, user_can_access_file, viewable_files
+from .access_log import AccessLogBuffer
+from .folder_tree import FolderCycleError, move_folder, subtree_file_counts
+from .log_archive import access_counts, access_totals, compact_access_logs
+from .models import (
+    File, FileAccessDailyCount, FileAccessLog, FileSharePermission, Folder, FolderClosure, FolderFile,
+)
+
+
+class IsolatedAccessLogMixin:
+    """
+    Give each test its own access log buffer, so events logged by views are
+    never written after the test's transaction has rolled back
+    """
+
+    def setUp(self):
+        super().setUp()
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_dir = spool_dir.name
+        patcher = mock.patch.object(access_log, 'buffer', AccessLogBuffer(
+            spool_path=self.spool_path('views.jsonl'), background=False,
+        ))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def spool_path(self, name):
+        return os.path.join(self.spool_dir, name)
+
+
+class FileAccessLogBufferTests(IsolatedAccessLogMixin, TestCase):
+    """File access events are written in batches, keep their event time and survive a failed write"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='reader')
+        self.file = File.objects.create(title='Circular', file_reference='circular.pdf', file_type='PDF')
+        self.buffer = AccessLogBuffer(batch_size=3, flush_seconds=60, spool_path=self.spool_path('spool.jsonl'),
+                                      background=False)
+
+    def event(self, minutes_ago=0):
+        return FileAccessLog(file_id=self.file.pk, user_id=self.user.pk, action='VIEW',
+                             timestamp=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def test_events_are_written_in_batches(self):
+        self.buffer.add(self.event(minutes_ago=30))
+        self.buffer.add(self.event())
+        self.assertFalse(self.buffer.due())
+
+        # A full buffer is due, but adding to it never writes
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.add(self.event())
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(self.buffer.due())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.flush()
+
+        self.assertEqual(FileAccessLog.objects.count(), 3)
+        # The file and user checks, then one insert
+        self.assertLessEqual(len(queries), 5)
+        oldest = FileAccessLog.objects.order_by('timestamp').first().timestamp
+        self.assertLess(oldest, timezone.now() - timedelta(minutes=29))
+
+    def test_failed_write_is_spooled_and_replayed(self):
+        self.buffer.add(self.event())
+        with mock.patch.object(FileAccessLog.objects, 'bulk_create', side_effect=DatabaseError('locked')), \
+                self.assertLogs('file_management.access_log', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertTrue(os.path.exists(self.buffer.spool_path))
+
+        self.buffer.add(self.event())
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(FileAccessLog.objects.count(), 2)
+        self.assertFalse(os.path.exists(self.buffer.spool_path))
+
+    def test_unexpected_errors_spool_the_batch(self):
+        self.buffer.add(self.event())
+        with mock.patch.object(self.buffer, 'existing', side_effect=ValueError('bad row')), \
+                self.assertLogs('file_management.access_log', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(FileAccessLog.objects.count(), 1)
+
+    def test_downloading_a_file_does_not_write_a_log(self):
+        self.client.force_login(User.objects.create_user(username='downloader', is_superuser=True))
+
+        response = self.client.get(f'/files/files/{self.file.pk}/download/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(FileAccessLog.objects.count(), 0)
+        self.assertEqual([(event.file_id, event.action) for event in access_log.buffer.take()],
+                         [(self.file.pk, 'DOWNLOAD')])
+
+    def test_events_of_deleted_files_are_dropped(self):
+        self.buffer.add(self.event())
+        File.objects.filter(pk=self.file.pk).delete()
+
+        self.assertEqual(self.buffer.flush(), 0)
+        # SQLite reports a dangling foreign key only when it checks constraints
+        connection.check_constraints()
+
+    def test_idle_buffer_flushes_on_a_timer(self):
+        flushed = threading.Event()
+        buffer = AccessLogBuffer(flush_seconds=0.01, spool_path=self.spool_path('idle.jsonl'))
+        with mock.patch.object(buffer, 'flush', side_effect=flushed.set):
+            buffer.add(self.event())
+            self.assertTrue(flushed.wait(5))
+        self.assertIsNone(buffer.timer)
+
+
+class FileAccessLogRetentionTests(IsolatedAccessLogMixin, TestCase):
+    """Old access events compact into daily counts that the read helpers still see"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='auditor')
+        self.file = File.objects.create(title='Gazette', file_reference='gazette.pdf', file_type='PDF')
+        self.today = timezone.localdate()
+
+    def log(self, days_ago, action='VIEW', hour=10):
+        day = self.today - timedelta(days=days_ago)
+        FileAccessLog.objects.create(file=self.file, user=self.user, action=action,
+                                     timestamp=timezone.make_aware(datetime(day.year, day.month, day.day, hour)))
+
+    def test_compaction_keeps_counts_and_recent_events(self):
+        for days_ago, action in [(200, 'VIEW'), (200, 'VIEW'), (200, 'DOWNLOAD'), (120, 'VIEW'), (5, 'VIEW')]:
+            self.log(days_ago, action)
+        before = (access_counts(file=self.file), access_totals(file=self.file))
+
+        counts = compact_access_logs(self.today - timedelta(days=90))
+
+        self.assertEqual(counts, {'days': 2, 'events': 4, 'count_rows': 3})
+        self.assertEqual(FileAccessLog.objects.count(), 1)
+        self.assertEqual(FileAccessDailyCount.objects.filter(action='VIEW').order_by('day').first().count, 2)
+        self.assertEqual((access_counts(file=self.file), access_totals(file=self.file)), before)
+        self.assertEqual(access_totals(user=self.user), {'VIEW': 4, 'DOWNLOAD': 1})
+
+    def test_late_events_add_to_a_compacted_day(self):
+        self.log(200)
+        compact_access_logs(self.today - timedelta(days=90))
+        self.log(200, hour=15)
+
+        call_command('compact_file_access_logs', days=90, stdout=StringIO())
+
+        self.assertFalse(FileAccessLog.objects.exists())
+        self.assertEqual(FileAccessDailyCount.objects.get().count, 2)
+
+
+class FileAccessCheckTests(TestCase):
+    """Access to a page of files is decided in two queries and memoised for the request"""
+
+    def setUp(self):
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        ict = Department.objects.create(name='ICT', code='ICT', type='SERV')
+        self.user = User.objects.create_user(username='clerk')
+        EmployeeProfile.objects.filter(user=self.user).update(current_department=self.hr)
+        other = User.objects.create_user(username='other')
+        now = timezone.now()
+
+        def make(title, **fields):
+            return File.objects.create(title=title, file_reference=f'{title}.pdf', file_type='PDF',
+                                       created_by=fields.pop('created_by', other), **fields)
+
+        self.files = {
+            'own': make('own', created_by=self.user),
+            'department': make('department', owner_department=self.hr),
+            'shared': make('shared'),
+            'department_edit': make('department_edit'),
+            'expired': make('expired'),
+            'private': make('private', owner_department=ict),
+        }
+        FileSharePermission.objects.create(file=self.files['shared'], user=self.user, permission='VIEW')
+        FileSharePermission.objects.create(file=self.files['department_edit'], department=self.hr, permission='EDIT')
+        FileSharePermission.objects.create(file=self.files['expired'], user=self.user, permission='FULL',
+                                           expires_at=now - timedelta(days=1))
+
+    def names(self, ids):
+        return sorted(name for name, file in self.files.items() if file.pk in ids)
+
+    def test_page_of_files_is_checked_in_two_queries(self):
+        user = User.objects.select_related('employee_profile').get(pk=self.user.pk)
+        ids = [file.pk for file in self.files.values()]
+
+        with CaptureQueriesContext(connection) as queries:
+            visible = accessible_file_ids(user, ids)
+            editable = accessible_file_ids(user, ids, 'EDIT')
+        with CaptureQueriesContext(connection) as repeat:
+            accessible_file_ids(user, ids, 'DELETE')
+
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual(len(repeat), 0)
+        self.assertEqual(self.names(visible), ['department', 'department_edit', 'own', 'shared'])
+        self.assertEqual(self.names(editable), ['department_edit', 'own'])
+
+    def test_single_file_check_agrees_with_batch(self):
+        for permission in ('VIEW', 'EDIT', 'DELETE', 'FULL'):
+            batch = accessible_file_ids(User.objects.get(pk=self.user.pk), [file.pk for file in self.files.values()],
+                                        permission)
+            single = {file.pk for file in self.files.values()
+                      if user_can_access_file(User.objects.get(pk=self.user.pk), file, permission)}
+            self.assertEqual(single, batch, permission)
+
+    def test_viewable_files_agree_with_the_checks(self):
+        user = User.objects.get(pk=self.user.pk)
+        files = viewable_files(user, File.objects.all())
+
+        self.assertEqual(self.names(set(files.values_list('pk', flat=True))),
+                         ['department', 'department_edit', 'own', 'shared'])
+        self.assertEqual(files.count(), 4)
+
+    def test_folder_list_filters_the_folder_files(self):
+        folder = Folder.objects.create(name='Records', owner=self.user)
+        for file in self.files.values():
+            FolderFile.objects.create(folder=folder, file=file)
+        # Fresh instance: logging in re-saves the profile cached on self.user
+        self.client.force_login(User.objects.get(pk=self.user.pk))
+
+        with mock.patch('file_management.views.render', return_value=HttpResponse()) as render:
+            response = self.client.get(reverse('file_management:folder_list'), {'parent': folder.pk})
+
+        self.assertEqual(response.status_code, 200)
+        context = render.call_args.args[2]
+        self.assertEqual(sorted(folder_file.file.title for folder_file in context['folder_files']),
+                         ['department', 'department_edit', 'own', 'shared'])
+        self.assertFalse(context['can_manage_files'])
+
+
+class FolderTreeTests(TestCase):
+    """The folder closure table answers tree questions in one query and follows moves"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='clerk')
+        self.root = Folder.objects.create(name='Staff', owner=user)
+        self.records = Folder.objects.create(name='Records', parent=self.root, owner=user)
+        self.archive = Folder.objects.create(name='Archive', parent=self.records, owner=user)
+        self.other = Folder.objects.create(name='Other', owner=User.objects.create_user(username='registry'))
+        self.client.force_login(user)
+
+        def add(folder, title):
+            file = File.objects.create(title=title, file_reference=f'{title}.pdf', file_type='PDF', created_by=user)
+            FolderFile.objects.create(folder=folder, file=file)
+            return file
+
+        add(self.records, 'nominal roll')
+        shared = add(self.archive, 'old roll')
+        FolderFile.objects.create(folder=self.records, file=shared)
+
+    def test_breadcrumbs_are_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([folder.name for folder in self.archive.get_ancestors()], ['Staff', 'Records', 'Archive'])
+        self.assertEqual(self.archive.get_path(), 'Staff/Records/Archive')
+
+    def test_moving_a_folder_moves_its_subtree(self):
+        move_folder(self.records, self.other)
+
+        self.assertEqual(Folder.objects.get(pk=self.archive.pk).get_path(), 'Other/Records/Archive')
+        self.assertEqual(list(self.root.get_descendants(include_self=False)), [])
+        self.assertEqual(set(self.other.get_descendants()), {self.other, self.records, self.archive})
+
+        move_folder(self.records, None)
+        self.assertEqual(self.archive.get_path(), 'Records/Archive')
+
+    def test_folder_cannot_move_into_its_own_subtree(self):
+        with self.assertRaises(FolderCycleError):
+            move_folder(self.root, self.archive)
+        self.assertEqual(self.archive.get_path(), 'Staff/Records/Archive')
+
+        # Forms, the admin's included, show it as an error on the parent field
+        form = modelform_factory(Folder, fields=['name', 'parent'])({'name': 'Records', 'parent': self.archive.pk},
+                                                                    instance=self.records)
+        self.assertFalse(form.is_valid())
+        self.assertIn('parent', form.errors)
+
+    def test_recursive_file_counts(self):
+        with self.assertNumQueries(1):
+            counts = subtree_file_counts([self.root, self.records, self.archive, self.other])
+        # A file in two folders of one subtree counts once
+        self.assertEqual(counts, {self.root.pk: 2, self.records.pk: 2, self.archive.pk: 1})
+
+    def test_moves_need_permission_on_an_existing_destination(self):
+        url = reverse('file_management:folder_update', args=[self.records.pk])
+
+        response = self.client.post(url, {'name': 'Records', 'parent': self.other.pk})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(self.archive.get_path(), 'Staff/Records/Archive')
+
+        self.assertEqual(self.client.post(url, {'name': 'Records', 'parent': 0}).status_code, 404)
+
+    def test_deleting_a_folder_deletes_its_subtree(self):
+        url = reverse('file_management:folder_delete', args=[self.root.pk])
+        Folder.objects.create(name='Loans', parent=self.archive, owner=self.other.owner)
+
+        self.client.post(url)
+        self.assertTrue(Folder.objects.filter(pk=self.root.pk).exists())
+
+        Folder.objects.filter(name='Loans').delete()
+        self.client.post(url)
+        self.assertEqual(list(Folder.objects.all()), [self.other])
+        self.assertEqual(FolderClosure.objects.count(), 1)
+
+
+class FileStorageTests(IsolatedAccessLogMixin, TestCase):
+    """Uploads are stored once per digest and downloads honour Range requests"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        patcher = mock.patch.object(storage, 'FILE_STORAGE_ROOT', root.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.root = root.name
+
+        self.user = User.objects.create_user(username='registry', is_superuser=True)
+        self.client.force_login(self.user)
+        self.content = bytes(range(256)) * 40
+        reference, size = storage.store(SimpleUploadedFile('roll.pdf', self.content))
+        self.file = File.objects.create(title='Nominal roll', file_reference=reference, file_type='PDF',
+                                        file_size=size, created_by=self.user)
+
+    def blobs(self):
+        return [name for _, _, names in os.walk(self.root) for name in names]
+
+    def download(self, **headers):
+        return self.client.get(f'/files/files/{self.file.pk}/download/', headers=headers)
+
+    def test_identical_content_is_stored_once(self):
+        reference, size = storage.store(SimpleUploadedFile('copy.pdf', self.content))
+
+        self.assertEqual(reference, self.file.file_reference)
+        self.assertEqual(size, len(self.content))
+        self.assertEqual(self.blobs(), [reference.split(':')[1]])
+        # Readable by a web server sending it with X-Accel-Redirect / X-Sendfile
+        self.assertEqual(os.stat(storage.blob_path(reference)).st_mode & 0o777, 0o644)
+
+    def test_download_streams_the_content(self):
+        response = self.download()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Nominal roll.pdf', response['Content-Disposition'])
+
+    def test_range_requests(self):
+        part = self.download(Range='bytes=100-199')
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(part.streaming_content), self.content[100:200])
+
+        tail = self.download(Range='bytes=-10')
+        self.assertEqual(b''.join(tail.streaming_content), self.content[-10:])
+
+        self.assertEqual(self.download(Range=f'bytes={len(self.content)}-').status_code, 416)
+        # A range for content that has since changed gets the whole file
+        self.assertEqual(self.download(Range='bytes=0-9', **{'If-Range': '"stale"'}).status_code, 200)
+
+    def test_new_version_without_changes_shares_the_blob(self):
+        self.client.post(f'/files/files/{self.file.pk}/version-upload/', {'version': '2.0'})
+        changed = SimpleUploadedFile('roll.pdf', b'amended roll')
+        self.client.post(f'/files/files/{self.file.pk}/version-upload/', {'version': '3.0', 'file': changed})
+
+        versions = File.objects.filter(title='Nominal roll').order_by('pk')
+        self.assertEqual(
+            [(file.version, file.file_reference == self.file.file_reference) for file in versions],
+            [('1.0', True), ('2.0', True), ('3.0', False)],
+        )
+        self.assertEqual(len(self.blobs()), 2)
+
+    def test_downloads_are_logged_once(self):
+        self.download()
+        self.download(Range='bytes=0-')
+        self.download(Range='bytes=0-65535')
+        self.download(Range='bytes=100-199')
+        access_log.flush_access_logs()
 
-# Create your tests here.
+        self.assertEqual(FileAccessLog.objects.filter(file=self.file, action='DOWNLOAD').count(), 3)
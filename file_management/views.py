@@ -1,9 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db.models import Q, Count, F
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 
 from .models import (
     File, FileCategory, FileAccessLevel, FileSharePermission, 
@@ -12,13 +13,24 @@ from .models import (
 )
 
 from core.models import EmployeeProfile, Department
+from core.exports import stream_csv, date_time
+from core.reference_data import get_departments
+from core.pagination import paginate_keyset, render_list
+from core.permissions import get_cached_user_permissions
+from core.search import index_objects, search_filter
+
+from .access import accessible_file_ids, user_can_access_file, viewable_files
+from .access_log import log_access
+from .folder_tree import FolderCycleError, subtree_file_counts, subtree_size
+from .log_archive import access_totals
+from .storage import is_stored, serve, starts_download, store
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 
 from datetime import timedelta
-import csv
 import json
 import mimetypes
+import os
 import uuid
 
 
@@ -34,37 +46,13 @@ def file_list(request):
     date_to = request.GET.get('date_to', '')
     search = request.GET.get('search', '')
     
-    employee_profile = request.user.employee_profile
-    
     # Check if user can view all files
-    can_view_all = request.user.user_permissions.get('can_view_all_files', False)
-    
-    # Base queryset - filter by access permissions
-    if can_view_all:
-        files = File.objects.filter(status='ACTIVE').select_related(
-            'category', 'access_level', 'created_by', 'owner_employee', 'owner_department'
-        )
-    else:
-        # Files the user can access
-        files = File.objects.filter(
-            # Files created by the user
-            Q(created_by=request.user) |
-            # Files owned by the user's employee profile
-            Q(owner_employee=employee_profile) |
-            # Files owned by the user's department
-            Q(owner_department=employee_profile.current_department) |
-            # Files explicitly shared with the user
-            Q(share_permissions__user=request.user) |
-            # Files shared with the user's department
-            Q(share_permissions__department=employee_profile.current_department) |
-            # Public files with appropriate access level
-            Q(is_public=True)
-        ).filter(status='ACTIVE').select_related(
-            'category', 'access_level', 'created_by', 'owner_employee', 'owner_department'
-        ).distinct()
+    can_view_all = get_cached_user_permissions(request.user).get('can_view_all_files', False)
     
-    # Order by recency
-    files = files.order_by('-created_at')
+    # Files the user can view
+    files = viewable_files(request.user, File.objects.filter(status='ACTIVE')).select_related(
+        'category', 'access_level', 'created_by', 'owner_employee', 'owner_department'
+    )
     
     # Apply filters
     if category_id:
@@ -113,12 +101,12 @@ def file_list(request):
     file_types = File.objects.values_list('file_type', flat=True).distinct()
     
     context = {
-        'files': files,
+        'files': paginate_keyset(request, files, ['-created_at']),
         'recent_files': recent_files,
         'shared_files': shared_files,
         'categories': categories,
         'file_types': file_types,
-        'can_manage_files': request.user.user_permissions.get('can_manage_files', False),
+        'can_manage_files': get_cached_user_permissions(request.user).get('can_manage_files', False),
         'can_view_all': can_view_all,
         'filter_category': category_id,
         'filter_status': status,
@@ -129,7 +117,7 @@ def file_list(request):
         'search': search,
     }
     
-    return render(request, 'file_management/file_list.html', context)
+    return render_list(request, 'file_management/file_list.html', context)
 
 
 @login_required
@@ -143,13 +131,7 @@ def file_detail(request, pk):
         return redirect('file_management:file_list')
     
     # Log access
-    FileAccessLog.objects.create(
-        file=file,
-        user=request.user,
-        action='VIEW',
-        ip_address=get_client_ip(request),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-    )
+    log_access(request, file, 'VIEW')
     
     # Get related data
     comments = FileComment.objects.filter(file=file).select_related('user').order_by('created_at')
@@ -163,8 +145,9 @@ def file_detail(request, pk):
     # Get folders containing this file
     folders = FolderFile.objects.filter(file=file).select_related('folder', 'added_by')
     
-    # Get access logs
+    # Get access logs: the latest events, and totals that include compacted history
     access_logs = FileAccessLog.objects.filter(file=file).select_related('user').order_by('-timestamp')[:10]
+    access_totals_by_action = access_totals(file=file)
     
     # Check if user has edit permission
     can_edit = user_can_access_file(request.user, file, 'EDIT')
@@ -172,7 +155,7 @@ def file_detail(request, pk):
     # Check if user can manage file permissions
     can_manage_permissions = (
         file.created_by == request.user or 
-        request.user.user_permissions.get('can_manage_file_permissions', False)
+        get_cached_user_permissions(request.user).get('can_manage_file_permissions', False)
     )
     
     context = {
@@ -182,6 +165,7 @@ def file_detail(request, pk):
         'share_permissions': share_permissions,
         'folders': folders,
         'access_logs': access_logs,
+        'access_totals': access_totals_by_action,
         'can_edit': can_edit,
         'can_delete': user_can_access_file(request.user, file, 'DELETE'),
         'can_manage_permissions': can_manage_permissions,
@@ -192,7 +176,7 @@ def file_detail(request, pk):
 
 @login_required
 def file_upload(request):
-    """Upload a new file (metadata only)"""
+    """Upload a new file"""
     if request.method == 'POST':
         # Process form data
         title = request.POST.get('title')
@@ -201,17 +185,21 @@ def file_upload(request):
         access_level_id = request.POST.get('access_level')
         is_confidential = request.POST.get('is_confidential') == 'on'
         
-        file_type = request.POST.get('file_type')
+        uploaded = request.FILES.get('file')
+        file_type = request.POST.get('file_type') or (uploaded and file_extension(uploaded.name))
         file_size = request.POST.get('file_size') or None
         
-        # Generate a unique file reference (in a real system, this would be linked to actual storage)
-        file_reference = f"file_{uuid.uuid4()}.{file_type}"
-        
         # Validate required fields
-        if not all([title, file_reference, file_type, access_level_id]):
+        if not all([title, file_type, access_level_id]):
             messages.error(request, "Please fill all required fields.")
             return redirect('file_management:file_upload')
         
+        # Store the content under its digest; without one only the metadata is recorded
+        if uploaded:
+            file_reference, file_size = store(uploaded)
+        else:
+            file_reference = f"file_{uuid.uuid4()}.{file_type}"
+        
         # Create file
         file = File.objects.create(
             title=title,
@@ -294,13 +282,7 @@ def file_update(request, pk):
                 )
         
         # Log access
-        FileAccessLog.objects.create(
-            file=file,
-            user=request.user,
-            action='EDIT',
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-        )
+        log_access(request, file, 'EDIT')
         
         messages.success(request, f"File '{file.title}' updated successfully.")
         return redirect('file_management:file_detail', pk=file.pk)
@@ -339,13 +321,7 @@ def file_delete(request, pk):
         file.save()
         
         # Log access
-        FileAccessLog.objects.create(
-            file=file,
-            user=request.user,
-            action='DELETE',
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-        )
+        log_access(request, file, 'DELETE')
         
         messages.success(request, f"File '{file.title}' deleted successfully.")
         return redirect('file_management:file_list')
@@ -359,7 +335,7 @@ def file_delete(request, pk):
 
 @login_required
 def file_download(request, pk):
-    """Download a file (in a real system, this would serve the actual file)"""
+    """Download a file, streamed from storage with Range support"""
     file = get_object_or_404(File, pk=pk)
     
     # Check if user has permission to view this file
@@ -367,19 +343,17 @@ def file_download(request, pk):
         messages.error(request, "You don't have permission to download this file.")
         return redirect('file_management:file_list')
     
-    # Log access
-    FileAccessLog.objects.create(
-        file=file,
-        user=request.user,
-        action='DOWNLOAD',
-        ip_address=get_client_ip(request),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-    )
+    # Log the download once, not for every range a viewer fetches; download
+    # managers and PDF viewers open with "bytes=0-" rather than no Range
+    if starts_download(request.headers.get('Range')):
+        log_access(request, file, 'DOWNLOAD')
     
-    # In a real system, this would serve the actual file
-    # For now, just redirect back with a message
-    messages.info(request, f"Download initiated for '{file.title}'.")
-    return redirect('file_management:file_detail', pk=file.pk)
+    # Files recorded before storage existed have no content to send
+    if not is_stored(file.file_reference):
+        messages.error(request, f"No stored content for '{file.title}'.")
+        return redirect('file_management:file_detail', pk=file.pk)
+    
+    return serve(request, file)
 
 
 @login_required
@@ -437,7 +411,7 @@ def file_share(request, pk):
     
     # Get share options
     users = User.objects.filter(is_active=True).order_by('last_name')
-    departments = Department.objects.all().order_by('name')
+    departments = get_departments()
     
     # Get existing shares
     existing_shares = FileSharePermission.objects.filter(file=file).select_related('user', 'department', 'granted_by')
@@ -460,7 +434,7 @@ def file_share_revoke(request, pk, share_pk):
     
     # Check if user has permission to manage shares
     if not (file.created_by == request.user or 
-            request.user.user_permissions.get('can_manage_file_permissions', False) or
+            get_cached_user_permissions(request.user).get('can_manage_file_permissions', False) or
             share.granted_by == request.user):
         messages.error(request, "You don't have permission to revoke this share.")
         return redirect('file_management:file_detail', pk=file.pk)
@@ -526,7 +500,7 @@ def folder_list(request):
         breadcrumbs = []
     
     # Filter folders by access permission
-    if not request.user.user_permissions.get('can_view_all_files', False):
+    if not get_cached_user_permissions(request.user).get('can_view_all_files', False):
         folders = folders.filter(
             # Folders owned by the user
             Q(owner=request.user) |
@@ -540,13 +514,10 @@ def folder_list(request):
     if parent_id:
         folder_files = FolderFile.objects.filter(folder_id=parent_id).select_related('file', 'added_by')
         
-        # Filter files by access permission
-        if not request.user.user_permissions.get('can_view_all_files', False):
-            visible_files = []
-            for folder_file in folder_files:
-                if user_can_access_file(request.user, folder_file.file, 'VIEW'):
-                    visible_files.append(folder_file)
-            folder_files = visible_files
+        # Filter files by access permission, checked for the whole folder at once
+        if not get_cached_user_permissions(request.user).get('can_view_all_files', False):
+            visible_ids = accessible_file_ids(request.user, [folder_file.file_id for folder_file in folder_files])
+            folder_files = [folder_file for folder_file in folder_files if folder_file.file_id in visible_ids]
     else:
         folder_files = []
     
@@ -556,13 +527,19 @@ def folder_list(request):
         Q(department=employee_profile.current_department)
     ).order_by('-modified_at')[:5]
     
+    # Files anywhere below each listed folder, in one query
+    folders = list(folders)
+    file_counts = subtree_file_counts(folders)
+    for folder in folders:
+        folder.file_count = file_counts.get(folder.pk, 0)
+    
     context = {
         'folders': folders,
         'folder_files': folder_files,
         'parent_id': parent_id,
         'breadcrumbs': breadcrumbs,
         'recent_folders': recent_folders,
-        'can_manage_files': request.user.user_permissions.get('can_manage_files', False),
+        'can_manage_files': get_cached_user_permissions(request.user).get('can_manage_files', False),
     }
     
     return render(request, 'file_management/folder_list.html', context)
@@ -606,7 +583,7 @@ def folder_create(request):
             return redirect('file_management:folder_list')
     
     # Get form options
-    departments = Department.objects.all().order_by('name')
+    departments = get_departments()
     access_levels = FileAccessLevel.objects.all()
     
     # Get parent folder if specified
@@ -630,18 +607,40 @@ def folder_update(request, pk):
     
     # Check if user has permission to edit this folder
     if not (folder.owner == request.user or 
-            request.user.user_permissions.get('can_manage_files', False)):
+            get_cached_user_permissions(request.user).get('can_manage_files', False)):
         messages.error(request, "You don't have permission to edit this folder.")
         return redirect('file_management:folder_list')
     
     if request.method == 'POST':
+        # Moving the folder needs the same permission on the destination
+        parent_id = request.POST.get('parent', '').strip()
+        if 'parent' in request.POST and parent_id != str(folder.parent_id or ''):
+            if parent_id and not parent_id.isdigit():
+                messages.error(request, "Invalid destination folder.")
+                return redirect('file_management:folder_update', pk=folder.pk)
+            parent = get_object_or_404(Folder, pk=parent_id) if parent_id else None
+            if parent and not (parent.owner == request.user or
+                               get_cached_user_permissions(request.user).get('can_manage_files', False)):
+                messages.error(request, "You don't have permission to move folders into the destination folder.")
+                return redirect('file_management:folder_update', pk=folder.pk)
+            folder.parent = parent
+        
         folder.name = request.POST.get('name')
         folder.description = request.POST.get('description')
         folder.department_id = request.POST.get('department') or None
         folder.is_public = request.POST.get('is_public') == 'on'
         folder.access_level_id = request.POST.get('access_level')
         
-        folder.save()
+        # Moving a folder moves its subtree; it cannot go inside itself
+        try:
+            folder.clean()
+            folder.save()
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('file_management:folder_update', pk=folder.pk)
+        except FolderCycleError as e:
+            messages.error(request, str(e))
+            return redirect('file_management:folder_update', pk=folder.pk)
         
         messages.success(request, f"Folder '{folder.name}' updated successfully.")
         
@@ -652,7 +651,7 @@ def folder_update(request, pk):
             return redirect('file_management:folder_list')
     
     # Get form options
-    departments = Department.objects.all().order_by('name')
+    departments = get_departments()
     access_levels = FileAccessLevel.objects.all()
     
     context = {
@@ -671,16 +670,18 @@ def folder_delete(request, pk):
     
     # Check if user has permission to delete this folder
     if not (folder.owner == request.user or 
-            request.user.user_permissions.get('can_manage_files', False)):
+            get_cached_user_permissions(request.user).get('can_manage_files', False)):
         messages.error(request, "You don't have permission to delete this folder.")
         return redirect('file_management:folder_list')
     
     # Get parent folder ID for redirect
     parent_id = folder.parent.pk if folder.parent else None
     
-    # Check if folder has subfolders
-    if Folder.objects.filter(parent=folder).exists():
-        messages.error(request, "Cannot delete folder that contains subfolders.")
+    # Deleting a folder deletes its subfolders, so they must all be the user's to delete
+    if not get_cached_user_permissions(request.user).get('can_manage_files', False) and folder.get_descendants(
+        include_self=False
+    ).exclude(owner=request.user).exists():
+        messages.error(request, "Cannot delete folder that contains other users' subfolders.")
         if parent_id:
             return redirect('file_management:folder_list', parent=parent_id)
         else:
@@ -695,8 +696,11 @@ def folder_delete(request, pk):
         else:
             return redirect('file_management:folder_list')
     
+    subfolder_count, file_count = subtree_size(folder)
     context = {
         'folder': folder,
+        'subfolder_count': subfolder_count,
+        'file_count': file_count,
     }
     
     return render(request, 'file_management/folder_confirm_delete.html', context)
@@ -709,7 +713,7 @@ def folder_add_file(request, pk):
     
     # Check if user has permission to edit this folder
     if not (folder.owner == request.user or 
-            request.user.user_permissions.get('can_manage_files', False)):
+            get_cached_user_permissions(request.user).get('can_manage_files', False)):
         messages.error(request, "You don't have permission to add files to this folder.")
         return redirect('file_management:folder_list', parent=pk)
     
@@ -741,27 +745,8 @@ def folder_add_file(request, pk):
         messages.success(request, f"File '{file.title}' added to folder successfully.")
         return redirect('file_management:folder_list', parent=pk)
     
-    # Get files the user has access to
-    employee_profile = request.user.employee_profile
-    
-    if request.user.user_permissions.get('can_view_all_files', False):
-        files = File.objects.filter(status='ACTIVE').select_related('category')
-    else:
-        # Files the user can access
-        files = File.objects.filter(
-            # Files created by the user
-            Q(created_by=request.user) |
-            # Files owned by the user
-            Q(owner_employee=employee_profile) |
-            # Files owned by the user's department
-            Q(owner_department=employee_profile.current_department) |
-            # Files explicitly shared with the user
-            Q(share_permissions__user=request.user) |
-            # Files shared with the user's department
-            Q(share_permissions__department=employee_profile.current_department) |
-            # Public files
-            Q(is_public=True)
-        ).filter(status='ACTIVE').select_related('category').distinct()
+    # Files the user can view
+    files = viewable_files(request.user, File.objects.filter(status='ACTIVE')).select_related('category')
     
     # Exclude files already in the folder
     existing_file_ids = FolderFile.objects.filter(folder=folder).values_list('file_id', flat=True)
@@ -783,7 +768,7 @@ def folder_remove_file(request, folder_pk, file_pk):
     # Check if user has permission to edit this folder
     if not (folder_file.folder.owner == request.user or 
             folder_file.added_by == request.user or
-            request.user.user_permissions.get('can_manage_files', False)):
+            get_cached_user_permissions(request.user).get('can_manage_files', False)):
         messages.error(request, "You don't have permission to remove files from this folder.")
         return redirect('file_management:folder_list', parent=folder_pk)
     
@@ -806,36 +791,13 @@ def file_search(request):
     
     if query:
         # Search files by title, description, and tags
-        employee_profile = request.user.employee_profile
-        
-        # Base queryset with access permissions
-        if request.user.user_permissions.get('can_view_all_files', False):
-            files = File.objects.filter(status='ACTIVE')
-        else:
-            # Files the user can access
-            files = File.objects.filter(
-                # Files created by the user
-                Q(created_by=request.user) |
-                # Files owned by the user
-                Q(owner_employee=employee_profile) |
-                # Files owned by the user's department
-                Q(owner_department=employee_profile.current_department) |
-                # Files explicitly shared with the user
-                Q(share_permissions__user=request.user) |
-                # Files shared with the user's department
-                Q(share_permissions__department=employee_profile.current_department) |
-                # Public files
-                Q(is_public=True)
-            ).filter(status='ACTIVE').distinct()
+        # Files the user can view
+        files = viewable_files(request.user, File.objects.filter(status='ACTIVE'))
         
-        # Apply search query
-        files = files.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(tag_assignments__tag__name__icontains=query)
-        ).select_related(
+        # Apply search query: title, description and tag names come from the search index
+        files = files.filter(search_filter('files', query)).select_related(
             'category', 'created_by', 'owner_employee', 'owner_department'
-        ).distinct()
+        )
     else:
         files = File.objects.none()
     
@@ -864,18 +826,25 @@ def file_version_upload(request, pk):
             messages.error(request, "Please provide a version number.")
             return redirect('file_management:file_version_upload', pk=file.pk)
         
+        # Store the new content; unchanged content shares the previous version's blob
+        uploaded = request.FILES.get('file')
+        if uploaded:
+            file_reference, file_size = store(uploaded)
+        else:
+            file_reference, file_size = file.file_reference, request.POST.get('file_size') or file.file_size
+        
         # Update the current file's version status
         file.is_latest_version = False
-        file.save()
+        file.save(update_fields=['is_latest_version', 'modified_at'])
         
         # Create a new version
         new_file = File.objects.create(
             title=file.title,
             description=file.description,
             category=file.category,
-            file_reference=f"{file.file_reference.split('.')[0]}_{version}.{file.file_type}",
-            file_type=file.file_type,
-            file_size=request.POST.get('file_size') or file.file_size,
+            file_reference=file_reference,
+            file_type=file_extension(uploaded.name) if uploaded else file.file_type,
+            file_size=file_size,
             created_by=request.user,
             access_level=file.access_level,
             is_confidential=file.is_confidential,
@@ -887,33 +856,27 @@ def file_version_upload(request, pk):
             previous_version=file
         )
         
-        # Copy tags
-        for tag_assignment in FileTagAssignment.objects.filter(file=file):
-            FileTagAssignment.objects.create(
-                file=new_file,
-                tag=tag_assignment.tag,
-                assigned_by=request.user
-            )
-        
-        # Copy share permissions
-        for share in FileSharePermission.objects.filter(file=file):
-            FileSharePermission.objects.create(
+        # Copy tags and share permissions, one insert each
+        FileTagAssignment.objects.bulk_create([
+            FileTagAssignment(file=new_file, tag_id=tag_id, assigned_by=request.user)
+            for tag_id in FileTagAssignment.objects.filter(file=file).values_list('tag_id', flat=True)
+        ])
+        # bulk_create sends no signals, so index the new version's tags here
+        index_objects('files', [new_file.pk])
+        FileSharePermission.objects.bulk_create([
+            FileSharePermission(
                 file=new_file,
-                user=share.user,
-                department=share.department,
+                user_id=share.user_id,
+                department_id=share.department_id,
                 permission=share.permission,
                 expires_at=share.expires_at,
                 granted_by=request.user
             )
+            for share in FileSharePermission.objects.filter(file=file)
+        ])
         
         # Log access
-        FileAccessLog.objects.create(
-            file=file,
-            user=request.user,
-            action='EDIT',
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-        )
+        log_access(request, file, 'EDIT')
         
         messages.success(request, f"New version {version} uploaded successfully.")
         return redirect('file_management:file_detail', pk=new_file.pk)
@@ -929,7 +892,7 @@ def file_version_upload(request, pk):
 def file_export(request):
     """Export file metadata to CSV"""
     # Check if user can export data
-    if not request.user.user_permissions.get('can_export_data', False):
+    if not get_cached_user_permissions(request.user).get('can_export_data', False):
         messages.error(request, "You don't have permission to export file metadata.")
         return redirect('file_management:file_list')
     
@@ -957,116 +920,32 @@ def file_export(request):
     if date_to:
         files = files.filter(created_at__date__lte=date_to)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="files_export.csv"'
+    # Tags are prefetched per chunk instead of queried per file
+    files = files.select_related('owner_employee__user').prefetch_related('tag_assignments__tag').order_by('pk')
     
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Title', 'Description', 'Category', 'File Type', 'Created By',
-                     'Created At', 'Owner', 'Department', 'Version', 'Tags'])
+    # Stream CSV response
+    columns = [
+        ('Title', 'title'),
+        ('Description', 'description'),
+        ('Category', 'category.name'),
+        ('File Type', 'file_type'),
+        ('Created By', 'created_by.get_full_name'),
+        ('Created At', date_time('created_at')),
+        ('Owner', 'owner_employee.user.get_full_name'),
+        ('Department', 'owner_department.name'),
+        ('Version', 'version'),
+        ('Tags', lambda file: ', '.join(assignment.tag.name for assignment in file.tag_assignments.all())),
+    ]
     
-    # Add file data
-    for file in files:
-        # Get tags
-        tags = FileTagAssignment.objects.filter(file=file).values_list('tag__name', flat=True)
-        tags_str = ', '.join(tags)
-        
-        writer.writerow([
-            file.title,
-            file.description,
-            file.category.name if file.category else '',
-            file.file_type,
-            file.created_by.get_full_name() if file.created_by else '',
-            file.created_at.strftime('%Y-%m-%d %H:%M') if file.created_at else '',
-            file.owner_employee.user.get_full_name() if file.owner_employee else '',
-            file.owner_department.name if file.owner_department else '',
-            file.version,
-            tags_str
-        ])
-    
-    return response
+    return stream_csv(files, columns, "files_export.csv")
 
 
 # Helper Functions
-def user_can_access_file(user, file, permission='VIEW'):
-    """Check if a user has the specified permission for a file"""
-    employee_profile = user.employee_profile
-    
-    # Superusers and staff can access everything
-    if user.is_superuser or user.is_staff:
-        return True
-    
-    # File creators can do anything with their files
-    if file.created_by == user:
-        return True
-    
-    # File owners can do anything with their files
-    if file.owner_employee == employee_profile:
-        return True
-    
-    # Check explicit permissions
-    if permission == 'VIEW':
-        # Public files can be viewed by anyone
-        if file.is_public:
-            return True
-        
-        # Check department ownership
-        if file.owner_department and file.owner_department == employee_profile.current_department:
-            return True
-        
-        # Check share permissions
-        share = FileSharePermission.objects.filter(
-            Q(file=file) &
-            (Q(user=user) | Q(department=employee_profile.current_department)) &
-            (Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now().date()))
-        ).first()
-        
-        return share is not None
-    
-    elif permission in ['EDIT', 'DELETE']:
-        # Check department ownership with stricter permissions
-        if file.owner_department and file.owner_department == employee_profile.current_department:
-            return user.user_permissions.get('can_manage_files', False)
-        
-        # Check share permissions with edit/delete access
-        share = FileSharePermission.objects.filter(
-            Q(file=file) &
-            (Q(user=user) | Q(department=employee_profile.current_department)) &
-            (Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now().date())) &
-            (Q(permission=permission) | Q(permission='FULL'))
-        ).first()
-        
-        return share is not None
-    
-    elif permission == 'FULL':
-        # Only file creator, owner, or admins have full control
-        return (
-            file.created_by == user or
-            file.owner_employee == employee_profile or
-            user.user_permissions.get('can_manage_file_permissions', False)
-        )
-    
-    return False
-
-
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+def file_extension(name):
+    """Upper-case extension of an uploaded file name, as File.file_type stores it"""
+    return os.path.splitext(name)[1].lstrip('.').upper()[:10] or 'BIN'
 
 
 def get_folder_breadcrumbs(folder):
-    """Get breadcrumb trail for a folder"""
-    breadcrumbs = []
-    current = folder
-    
-    while current:
-        breadcrumbs.insert(0, current)
-        current = current.parent
-    
-    return breadcrumbs
\ No newline at end of file
+    """Get breadcrumb trail for a folder, root first, in one query"""
+    return list(folder.get_ancestors())
\ No newline at end of file
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from datetime import timedelta
 from pathlib import Path
+import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.reference_data',
                 
                 'django_auto_logout.context_processors.auto_logout_client',
             ],
@@ -99,6 +101,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per-process: a change invalidates cached permissions,
+# reference data, dashboard counters and projections only in the worker that
+# made it. With several workers set HR_APP_CACHE_BACKEND and
+# HR_APP_CACHE_LOCATION to a shared cache (Redis, Memcached, database);
+# "manage.py check --deploy" warns (core.W001) while it is local with DEBUG off.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('HR_APP_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('HR_APP_CACHE_LOCATION', 'hr-app'),
+    }
+}
+
+# Permission snapshots (core.permissions.get_cached_user_permissions); a
+# revoked role stays in force in other workers until its snapshot expires, so
+# a local cache keeps them for seconds only
+PERMISSION_CACHE_ALIAS = 'default'
+PERMISSION_CACHE_TIMEOUT = 10 if 'locmem' in CACHES[PERMISSION_CACHE_ALIAS]['BACKEND'].lower() else 300
+
+# Seconds the org-wide dashboard counters are shared before being recomputed
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Rows per page on the keyset-paginated list views
+LIST_PAGE_SIZE = 25
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -165,6 +195,36 @@ EMAIL_HOST_USER = 'info@nde-internal.org.ng'
 EMAIL_HOST_PASSWORD = '@info.nde'
 DEFAULT_FROM_EMAIL = 'no-reply@nde-internal.org.ng' 
 
+# Outbox delivery ("manage.py send_queued_email"): messages per SMTP connection
+# and attempts before a message is marked failed
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+
+# Background jobs ("manage.py run_jobs --loop"): seconds a worker holds a job
+# without reporting progress before another worker may take it over
+JOB_LEASE_SECONDS = 300
+
+# File access log: events are buffered per process and written in batches once
+# this many are waiting or the oldest is this many seconds old; a batch that
+# cannot be written is spooled to FILE_ACCESS_LOG_SPOOL and replayed later
+FILE_ACCESS_LOG_BATCH_SIZE = 100
+FILE_ACCESS_LOG_FLUSH_SECONDS = 5
+FILE_ACCESS_LOG_SPOOL = BASE_DIR / 'data' / 'file_access_spool.jsonl'
+# Days of file access events kept in full; "manage.py compact_file_access_logs"
+# folds older ones into daily counts
+FILE_ACCESS_LOG_RETENTION_DAYS = 90
+# Uploaded file contents, one blob per SHA-256 digest (outside MEDIA_ROOT, so
+# they are only reachable through the permission-checked download view), and
+# the size of the chunks they are streamed in. Uploads larger than
+# FILE_UPLOAD_MAX_MEMORY_SIZE already arrive in a temporary file.
+FILE_STORAGE_ROOT = BASE_DIR / 'data' / 'blobs'
+FILE_STORAGE_CHUNK_SIZE = 1024 * 1024
+# Behind nginx set FILE_SENDFILE_HEADER = 'X-Accel-Redirect' and map an internal
+# location FILE_SENDFILE_PREFIX to FILE_STORAGE_ROOT; Apache uses 'X-Sendfile'
+# with a prefix of str(FILE_STORAGE_ROOT) + '/'
+FILE_SENDFILE_HEADER = None
+FILE_SENDFILE_PREFIX = '/protected/blobs/'
+
 # Add the below line
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "login"
@@ -24,7 +24,7 @@ from .models import (
     EducationalUpgrade,
     
     # Retirement Models
-    RetirementPlan, RetirementChecklistItem
+    RetirementPlan, RetirementChecklistItem, RetirementChecklistTemplate
 )
 
 from core.models import EmployeeProfile, Department
@@ -267,4 +267,11 @@ class RetirementPlanAdmin(ImportExportModelAdmin):
 class RetirementChecklistItemAdmin(admin.ModelAdmin):
     list_display = ('retirement_plan', 'item_name', 'is_completed', 'completed_date', 'completed_by')
     list_filter = ('is_completed',)
-    search_fields = ('retirement_plan__employee__user__first_name', 'retirement_plan__employee__user__last_name', 'item_name')
\ No newline at end of file
+    search_fields = ('retirement_plan__employee__user__first_name', 'retirement_plan__employee__user__last_name', 'item_name')
+
+
+@admin.register(RetirementChecklistTemplate)
+class RetirementChecklistTemplateAdmin(admin.ModelAdmin):
+    list_display = ('item_name', 'order', 'is_active')
+    list_editable = ('order', 'is_active')
+    list_filter = ('is_active',)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class HrModulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hr_modules'
+
+    def ready(self):
+        # Connect the signals that keep the reporting rollups current
+        from . import rollups  # noqa: F401
+        # Connect the signals that invalidate the cached workforce projection
+        from . import projections  # noqa: F401
+        # Register the background tasks with the job runner
+        from . import tasks  # noqa: F401
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hr_modules.retirements import describe_identification, identify_retirements
+
+
+class Command(BaseCommand):
+    help = 'Create retirement plans and checklists for staff retiring within the coming years'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=1, help='How many years ahead to look (default 1)')
+        parser.add_argument('--department', type=int, default=None, help='Only staff of this department id')
+        parser.add_argument('--dry-run', action='store_true', help='Report the counts without creating anything')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = identify_retirements(options['years'], options['department'], dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{describe_identification(counts)} Took {elapsed:.2f}s"))
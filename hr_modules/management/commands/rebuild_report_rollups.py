@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr_modules.rollups import ROLLUPS, rebuild_rollup, verify_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the reporting rollup tables from the source records and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rollups', nargs='*',
+                            help=f"Rollups to process (default: all of {', '.join(ROLLUPS)})")
+        parser.add_argument('--verify-only', action='store_true',
+                            help='Compare the rollups with the source records without rebuilding them')
+
+    def handle(self, *args, **options):
+        names = options['rollups'] or list(ROLLUPS)
+        unknown = [name for name in names if name not in ROLLUPS]
+        if unknown:
+            raise CommandError(f"Unknown rollups: {', '.join(unknown)} (choose from {', '.join(ROLLUPS)})")
+        out_of_date = []
+
+        for name in names:
+            rollup = ROLLUPS[name]
+            started = time.perf_counter()
+
+            if not options['verify_only']:
+                rows = rebuild_rollup(rollup)
+                self.stdout.write(f"{name}: {rows} rows rebuilt in {time.perf_counter() - started:.2f}s")
+
+            differences = verify_rollup(rollup)
+            if differences:
+                out_of_date.append(name)
+                self.stderr.write(f"{name}: {len(differences)} rows differ from the source records")
+                if options['verbosity'] > 1:
+                    for key, stored, expected in differences:
+                        self.stderr.write(f"  {dict(zip(rollup.key_fields, key))}: stored {stored}, expected {expected}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: verified"))
+
+        if out_of_date:
+            raise CommandError(f"Rollups out of date: {', '.join(out_of_date)}")
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:38
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractYear
+
+
+def fill(model, key_fields, rows):
+    """Sum grouped source rows by key and insert them into a rollup table"""
+    totals = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        values = totals[tuple(row.pop(field) for field in key_fields)]
+        for field, value in row.items():
+            values[field] += value
+    model.objects.bulk_create([
+        model(**dict(zip(key_fields, key)), **values) for key, values in totals.items()
+    ], batch_size=1000)
+
+
+def build_rollups(apps, schema_editor):
+    """Rollups for the requests that already exist (same rules as hr_modules.rollups)"""
+    LeaveRequest = apps.get_model('hr_modules', 'LeaveRequest')
+    TransferRequest = apps.get_model('hr_modules', 'TransferRequest')
+    PromotionNomination = apps.get_model('hr_modules', 'PromotionNomination')
+    EducationalUpgrade = apps.get_model('hr_modules', 'EducationalUpgrade')
+
+    fill(apps.get_model('hr_modules', 'LeaveRollup'), ('year', 'department_id', 'leave_type_id'),
+         LeaveRequest.objects.filter(status='APPROVED').order_by().values(
+             'leave_type_id', year=ExtractYear('start_date'), department_id=F('employee__current_department_id'),
+         ).annotate(days=Sum('days_requested'), requests=Count('id')))
+
+    transfers = TransferRequest.objects.order_by()
+    fill(apps.get_model('hr_modules', 'TransferRollup'), ('year', 'department_id', 'status', 'request_type'), [
+        *transfers.values('status', 'request_type', year=ExtractYear('created_at'),
+                          department_id=F('current_department_id')).annotate(transfers_out=Count('id')),
+        *transfers.values('status', 'request_type', year=ExtractYear('created_at'),
+                          department_id=F('requested_department_id')).annotate(transfers_in=Count('id')),
+    ])
+
+    fill(apps.get_model('hr_modules', 'PromotionRollup'),
+         ('promotion_cycle_id', 'department_id', 'status', 'current_level', 'proposed_level'),
+         PromotionNomination.objects.order_by().values(
+             'promotion_cycle_id', 'status', 'current_level', 'proposed_level',
+             department_id=F('employee__current_department_id'),
+         ).annotate(nominations=Count('id')))
+
+    fill(apps.get_model('hr_modules', 'EducationalUpgradeRollup'), ('year', 'qualification_type', 'status'),
+         EducationalUpgrade.objects.order_by().values(
+             'qualification_type', 'status', year=F('year_of_graduation'),
+         ).annotate(upgrades=Count('id')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_role_attributebasedpermission_userrole'),
+        ('hr_modules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EducationalUpgradeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('qualification_type', models.CharField(choices=[('O', 'Officer'), ('E', 'Executive'), ('S', 'Secretariat'), ('C', 'Clerical'), ('D', 'Driver')], max_length=4)),
+                ('status', models.CharField(choices=[('SUBMITTED', 'Submitted'), ('UNDER_REVIEW', 'Under Review'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('COMPLETED', 'Completed')], max_length=12)),
+                ('upgrades', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('year', 'qualification_type', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('days', models.IntegerField(default=0)),
+                ('requests', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.department')),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hr_modules.leavetype')),
+            ],
+            options={
+                'unique_together': {('year', 'department', 'leave_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PromotionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('NOMINATED', 'Nominated'), ('SHORTLISTED', 'Shortlisted'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], max_length=12)),
+                ('current_level', models.PositiveIntegerField()),
+                ('proposed_level', models.PositiveIntegerField()),
+                ('nominations', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.department')),
+                ('promotion_cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hr_modules.promotioncycle')),
+            ],
+            options={
+                'unique_together': {('promotion_cycle', 'department', 'status', 'current_level', 'proposed_level')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TransferRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('DRAFT', 'Draft'), ('SUBMITTED', 'Submitted'), ('UNDER_REVIEW', 'Under Review'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=15)),
+                ('request_type', models.CharField(choices=[('EMPLOYEE_REQUESTED', 'Employee Requested'), ('MANAGEMENT_INITIATED', 'Management Initiated')], max_length=20)),
+                ('transfers_in', models.IntegerField(default=0)),
+                ('transfers_out', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.department')),
+            ],
+            options={
+                'unique_together': {('year', 'department', 'status', 'request_type')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
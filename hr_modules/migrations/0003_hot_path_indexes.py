@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_path_indexes'),
+        ('hr_modules', '0002_report_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(fields=['-scheduled_date', '-id'], name='exam_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['status', 'start_date'], name='leave_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['-created_at', '-id'], name='leave_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retirementplan',
+            index=models.Index(fields=['expected_retirement_date', 'status'], name='retire_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='retirementplan',
+            index=models.Index(fields=['status', 'expected_retirement_date'], name='retire_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='transfer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferrequest',
+            index=models.Index(fields=['status', 'current_department'], name='transfer_status_dept_idx'),
+        ),
+    ]
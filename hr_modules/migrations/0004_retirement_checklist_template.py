@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:54
+
+from django.db import migrations, models
+
+
+DEFAULT_CHECKLIST = [
+    "Documentation review",
+    "Exit interview scheduling",
+    "Badge/access card collection",
+    "Equipment return",
+    "Final payment calculation",
+    "Pension processing",
+    "Clearance from all departments",
+    "Farewell arrangements",
+]
+
+
+def seed_checklist(apps, schema_editor):
+    RetirementChecklistTemplate = apps.get_model('hr_modules', 'RetirementChecklistTemplate')
+    RetirementChecklistTemplate.objects.bulk_create([
+        RetirementChecklistTemplate(item_name=item_name, description="", order=order)
+        for order, item_name in enumerate(DEFAULT_CHECKLIST, start=1)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_modules', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetirementChecklistTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('order', models.PositiveSmallIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['order', 'pk'],
+            },
+        ),
+        migrations.RunPython(seed_checklist, migrations.RunPython.noop),
+    ]
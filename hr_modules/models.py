@@ -138,6 +138,16 @@ class LeaveRequest(models.Model):
     
     def __str__(self):
         return f"{self.employee.user.get_full_name()} - {self.leave_type.name} ({self.start_date} to {self.end_date})"
+    
+    class Meta:
+        indexes = [
+            # Pending queues and approved-by-year reports
+            models.Index(fields=['status', 'start_date'], name='leave_status_start_idx'),
+            # An employee's own upcoming approved leave (dashboard)
+            models.Index(fields=['employee', 'status', 'start_date'], name='leave_emp_status_start_idx'),
+            # Leave list, newest first (keyset order includes the id)
+            models.Index(fields=['-created_at', '-id'], name='leave_created_idx'),
+        ]
 
 
 class LeaveApprovalLevel(models.Model):
@@ -187,6 +197,12 @@ class Examination(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.scheduled_date})"
+    
+    class Meta:
+        indexes = [
+            # Examination list, latest first, and upcoming sittings
+            models.Index(fields=['-scheduled_date', '-id'], name='exam_scheduled_idx'),
+        ]
 
 
 class ExaminationParticipant(models.Model):
@@ -349,6 +365,13 @@ class TransferRequest(models.Model):
     
     def __str__(self):
         return f"{self.employee.user.get_full_name()} - {self.current_department.name} to {self.requested_department.name}"
+    
+    class Meta:
+        indexes = [
+            # Transfer list, newest first, and review queues by status
+            models.Index(fields=['-created_at', '-id'], name='transfer_created_idx'),
+            models.Index(fields=['status', 'current_department'], name='transfer_status_dept_idx'),
+        ]
 
 
 # Educational Upgrade
@@ -417,6 +440,14 @@ class RetirementPlan(models.Model):
     
     def __str__(self):
         return f"{self.employee.user.get_full_name()} - Retirement on {self.expected_retirement_date}"
+    
+    class Meta:
+        indexes = [
+            # Retirement list and forecast windows, soonest first
+            models.Index(fields=['expected_retirement_date', 'status'], name='retire_date_status_idx'),
+            # Status counters (processing / completed)
+            models.Index(fields=['status', 'expected_retirement_date'], name='retire_status_date_idx'),
+        ]
 
 
 class RetirementChecklistItem(models.Model):
@@ -430,4 +461,70 @@ class RetirementChecklistItem(models.Model):
     comments = models.TextField(blank=True, null=True)
     
     def __str__(self):
-        return f"{self.retirement_plan.employee.user.get_full_name()} - {self.item_name}"
\ No newline at end of file
+        return f"{self.retirement_plan.employee.user.get_full_name()} - {self.item_name}"
+
+
+class RetirementChecklistTemplate(models.Model):
+    """Checklist item copied onto every new retirement plan"""
+    item_name = models.CharField(max_length=100)
+    description = models.TextField(blank=True, null=True)
+    order = models.PositiveSmallIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    
+    def __str__(self):
+        return self.item_name
+    
+    class Meta:
+        ordering = ['order', 'pk']
+
+# Reporting rollups
+# Kept up to date by the signals in hr_modules.rollups and rebuilt with
+# "manage.py rebuild_report_rollups". Counts are signed so drift shows up
+# in verification instead of being clamped.
+class LeaveRollup(models.Model):
+    """Approved leave days per year, department and leave type"""
+    year = models.PositiveIntegerField()
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE, related_name='+')
+    days = models.IntegerField(default=0)
+    requests = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('year', 'department', 'leave_type')
+
+
+class TransferRollup(models.Model):
+    """Transfer requests into and out of each department per year, status and type"""
+    year = models.PositiveIntegerField()
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=15, choices=TransferRequest.STATUS_CHOICES)
+    request_type = models.CharField(max_length=20, choices=TransferRequest.REQUEST_TYPES)
+    transfers_in = models.IntegerField(default=0)
+    transfers_out = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('year', 'department', 'status', 'request_type')
+
+
+class PromotionRollup(models.Model):
+    """Promotion nominations per cycle, department, status and level change"""
+    promotion_cycle = models.ForeignKey(PromotionCycle, on_delete=models.CASCADE, related_name='+')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=12, choices=PromotionNomination.STATUS_CHOICES)
+    current_level = models.PositiveIntegerField()
+    proposed_level = models.PositiveIntegerField()
+    nominations = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('promotion_cycle', 'department', 'status', 'current_level', 'proposed_level')
+
+
+class EducationalUpgradeRollup(models.Model):
+    """Educational upgrades per graduation year, qualification and status"""
+    year = models.PositiveIntegerField()
+    qualification_type = models.CharField(max_length=4, choices=EmployeeProfile.CADRE_CHOICES)
+    status = models.CharField(max_length=12, choices=EducationalUpgrade.STATUS_CHOICES)
+    upgrades = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('year', 'qualification_type', 'status')
@@ -0,0 +1,167 @@
+"""
+Workforce projection
+
+Projects retirements straight from every active employee's date of birth and
+date of assumption (see core.retirement_dates), so the forecast does not wait
+for retirement plans to be generated. One query reads the active staff; each
+employee's retirement year is bucketed into per-year count arrays by
+department, grade level, cadre and state.
+
+A projection always covers MAX_HORIZON_YEARS and is sliced to the horizon a
+page asks for. It is cached per day and department filter under a data
+version that is bumped when staff are added or removed, or a save changes a
+projection input (dates, department, grade level, cadre, state, or whether
+the user is active), so pages render from the cache until the workforce
+changes. Bulk writes skip signals; call invalidate_workforce_projection()
+after them.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.models import EmployeeProfile
+from core.reports import Matrix
+from core.retirement_dates import retirement_date
+from core.tracking import fields_changed, remember_fields
+
+
+MAX_HORIZON_YEARS = 35
+PROJECTION_CACHE_TIMEOUT = 60 * 60 * 24
+PROJECTION_VERSION_KEY = 'hr_modules:projection:version'
+
+# dimension -> EmployeeProfile field holding the bucket value
+DIMENSIONS = {
+    'department': 'current_department_id',
+    'grade_level': 'current_grade_level',
+    'cadre': 'current_cadre',
+    'state': 'current_state_id',
+}
+
+
+class Projection:
+    """
+    Retirements per calendar year from start_year for MAX_HORIZON_YEARS years
+    - totals[i]: retirements in start_year + i
+    - by[dimension][value][i]: the same, for one department, grade level, cadre or state
+    - overdue: active staff whose retirement date has already passed
+    - unknown: active staff with neither date recorded
+    """
+
+    def __init__(self, start_year, years=MAX_HORIZON_YEARS):
+        self.start_year = start_year
+        self.years = years
+        self.totals = [0] * years
+        self.by = {dimension: {} for dimension in DIMENSIONS}
+        self.overdue = 0
+        self.unknown = 0
+        self.active = 0
+
+    def add(self, offset, values):
+        self.totals[offset] += 1
+        for dimension, value in values.items():
+            buckets = self.by[dimension].get(value)
+            if buckets is None:
+                buckets = self.by[dimension][value] = [0] * self.years
+            buckets[offset] += 1
+
+    def year_range(self, horizon):
+        return range(self.start_year, self.start_year + clamp_horizon(horizon))
+
+    def year_totals(self, horizon):
+        """[(year, retirements)] for the first horizon years"""
+        return list(zip(self.year_range(horizon), self.totals[:clamp_horizon(horizon)]))
+
+    def dimension_totals(self, dimension, horizon):
+        """{value: retirements within horizon}, largest first"""
+        horizon = clamp_horizon(horizon)
+        totals = {value: sum(buckets[:horizon]) for value, buckets in self.by[dimension].items()}
+        return dict(sorted(((value, total) for value, total in totals.items() if total),
+                           key=lambda item: item[1], reverse=True))
+
+    def matrix(self, dimension, horizon):
+        """Year x dimension value Matrix (see core.reports) for the first horizon years"""
+        matrix = Matrix()
+        horizon = clamp_horizon(horizon)
+        for offset, year in enumerate(self.year_range(horizon)):
+            for value, buckets in self.by[dimension].items():
+                if buckets[offset]:
+                    matrix.add(year, value, buckets[offset])
+        return matrix.sort_rows()
+
+
+def clamp_horizon(horizon):
+    return max(1, min(int(horizon), MAX_HORIZON_YEARS))
+
+
+def build_projection(today, department_id=None):
+    """Bucket every active employee's projected retirement year"""
+    employees = EmployeeProfile.objects.filter(user__is_active=True)
+    if department_id:
+        employees = employees.filter(current_department_id=department_id)
+
+    projection = Projection(today.year)
+    fields = list(DIMENSIONS.values())
+    for date_of_birth, date_of_assumption, *values in employees.order_by().values_list(
+        'date_of_birth', 'date_of_assumption', *fields
+    ).iterator(chunk_size=5000):
+        projection.active += 1
+        retires_on = retirement_date(date_of_birth, date_of_assumption)
+        if retires_on is None:
+            projection.unknown += 1
+        elif retires_on < today:
+            projection.overdue += 1
+        elif retires_on.year - today.year < MAX_HORIZON_YEARS:
+            projection.add(retires_on.year - today.year, dict(zip(DIMENSIONS, values)))
+    return projection
+
+
+def get_projection_version():
+    cache.add(PROJECTION_VERSION_KEY, 1, None)
+    return cache.get(PROJECTION_VERSION_KEY, 1)
+
+
+def invalidate_workforce_projection():
+    """Make the next forecast recompute from the current workforce"""
+    try:
+        cache.incr(PROJECTION_VERSION_KEY)
+    except ValueError:
+        cache.set(PROJECTION_VERSION_KEY, 2, None)
+
+
+def get_projection(today, department_id=None):
+    """Cached projection for today and an optional department"""
+    cache_key = (f'hr_modules:projection:{get_projection_version()}:'
+                 f'{today.isoformat()}:{department_id or "all"}')
+    projection = cache.get(cache_key)
+    if projection is None:
+        projection = build_projection(today, department_id)
+        cache.set(cache_key, projection, PROJECTION_CACHE_TIMEOUT)
+    return projection
+
+
+# The fields a projection is built from, per model
+PROJECTION_INPUTS = {
+    EmployeeProfile: ('date_of_birth', 'date_of_assumption', *DIMENSIONS.values()),
+    User: ('is_active',),
+}
+
+
+@receiver(post_init, sender=EmployeeProfile)
+@receiver(post_init, sender=User)
+def remember_projection_inputs(sender, instance, **kwargs):
+    remember_fields(instance, '_projection_inputs', PROJECTION_INPUTS[sender])
+
+
+# Saving a User also saves its profile, on every login among others, so only
+# saves that change an input make the projection stale
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_save, sender=User)
+def workforce_changed(sender, instance, created, raw=False, **kwargs):
+    if not raw and (fields_changed(instance, '_projection_inputs', PROJECTION_INPUTS[sender]) or created):
+        invalidate_workforce_projection()
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def employee_removed(sender, **kwargs):
+    invalidate_workforce_projection()
@@ -0,0 +1,108 @@
+"""
+Retirement identification
+
+Finds active staff whose retirement date falls within the coming years and
+gives each a RetirementPlan with the active RetirementChecklistTemplate items.
+The work is set based: one query selects the candidates, and the plans and
+checklist items are written with bulk_create in a single transaction, so the
+cost grows with the number of INSERT batches rather than with the number of
+staff.
+
+Staff who already have a plan are never candidates, so running it again (or
+retrying a failed job) only adds the plans that are still missing.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import EmployeeProfile
+
+from .models import RetirementPlan, RetirementChecklistItem, RetirementChecklistTemplate
+
+
+IDENTIFICATION_BATCH_SIZE = 1000
+
+
+def retirement_candidates(cutoff_date, department_id=None):
+    """(employee id, retirement date) for active staff retiring by cutoff_date without a plan"""
+    employees = EmployeeProfile.objects.filter(
+        user__is_active=True,
+        date_of_retirement__isnull=False,
+        date_of_retirement__lte=cutoff_date
+    ).exclude(
+        id__in=RetirementPlan.objects.values('employee_id')
+    )
+
+    if department_id:
+        employees = employees.filter(current_department_id=department_id)
+
+    return list(employees.order_by('date_of_retirement', 'pk').values_list('id', 'date_of_retirement'))
+
+
+def checklist_template():
+    """(item name, description) of the active checklist template items, in order"""
+    return list(RetirementChecklistTemplate.objects.filter(is_active=True).values_list('item_name', 'description'))
+
+
+def identify_retirements(upcoming_years=1, department_id=None, dry_run=False, today=None):
+    """
+    Create plans and checklists for staff retiring within upcoming_years
+
+    Returns the counts: candidates, plans and checklist items created (or, in a
+    dry run, that would be created) and candidates per retirement year.
+    """
+    today = today or timezone.now().date()
+    cutoff_date = today + timedelta(days=365 * upcoming_years)
+
+    candidates = retirement_candidates(cutoff_date, department_id)
+    template = checklist_template()
+
+    counts = {
+        'dry_run': dry_run,
+        'cutoff_date': cutoff_date.isoformat(),
+        'candidates': len(candidates),
+        'plans': len(candidates),
+        'checklist_items': len(candidates) * len(template),
+        'by_year': dict(sorted(Counter(retirement_date.year for _, retirement_date in candidates).items())),
+    }
+    if dry_run or not candidates:
+        return counts
+
+    with transaction.atomic():
+        plans = RetirementPlan.objects.bulk_create([
+            RetirementPlan(employee_id=employee_id, expected_retirement_date=retirement_date, status='UPCOMING')
+            for employee_id, retirement_date in candidates
+        ], batch_size=IDENTIFICATION_BATCH_SIZE)
+
+        # Databases that cannot return ids from a bulk insert need them looked up
+        if any(plan.pk is None for plan in plans):
+            plan_ids = dict(RetirementPlan.objects.filter(
+                employee_id__in=[employee_id for employee_id, _ in candidates]
+            ).values_list('employee_id', 'id'))
+            for plan in plans:
+                plan.pk = plan_ids[plan.employee_id]
+
+        RetirementChecklistItem.objects.bulk_create([
+            RetirementChecklistItem(
+                retirement_plan_id=plan.pk, item_name=item_name, description=description or "", is_completed=False
+            )
+            for plan in plans
+            for item_name, description in template
+        ], batch_size=IDENTIFICATION_BATCH_SIZE)
+
+    return counts
+
+
+def describe_identification(counts):
+    """One-line summary of identify_retirements() counts for messages and job results"""
+    if not counts['candidates']:
+        return "No new employees approaching retirement were identified."
+
+    years = ', '.join(f"{year}: {count}" for year, count in counts['by_year'].items())
+    if counts['dry_run']:
+        return (f"Dry run: {counts['candidates']} employees would get retirement plans "
+                f"with {counts['checklist_items']} checklist items ({years}).")
+    return (f"Identified {counts['candidates']} employees approaching retirement and created "
+            f"{counts['checklist_items']} checklist items ({years}).")
@@ -0,0 +1,288 @@
+"""
+Reporting rollups
+
+The summary reports read small precomputed tables instead of scanning the
+whole request history. Each rollup is described once here:
+- contributions(instance): the (key, values) pairs one source row adds
+- grouped(): the same totals computed from the source table, used to
+  rebuild and verify the rollup
+
+Saving or deleting a source row applies the difference between its old and new
+contributions, so a status change moves it from one bucket to another in the
+same transaction. Leave and promotion rows count under the employee's current
+department, in the signals and in a rebuild alike: when an employee changes
+department, their rows move to the new department's buckets.
+
+bulk_create/bulk_update and queryset.update() skip signals; rebuild the
+rollups after using them on these tables or on staff departments.
+"""
+import copy
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import DEFERRED, Count, F, Sum
+from django.db.models.functions import ExtractYear
+from django.db.models.signals import post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import EmployeeProfile
+
+from .models import (
+    LeaveRequest, TransferRequest, PromotionNomination, EducationalUpgrade,
+    LeaveRollup, TransferRollup, PromotionRollup, EducationalUpgradeRollup
+)
+
+
+class Rollup:
+    """A rollup table, its key and value columns, and how its source rows feed it"""
+
+    def __init__(self, model, source, key_fields, value_fields, contributions, grouped, related=()):
+        self.model = model
+        self.source = source
+        self.key_fields = key_fields
+        self.value_fields = value_fields
+        self.contributions = contributions
+        self.grouped = grouped
+        self.related = related
+
+
+def leave_contributions(leave):
+    if leave.status != 'APPROVED':
+        return []
+    return [(
+        {'year': leave.start_date.year, 'department_id': leave.employee.current_department_id,
+         'leave_type_id': leave.leave_type_id},
+        {'days': leave.days_requested, 'requests': 1},
+    )]
+
+
+def leave_grouped():
+    return LeaveRequest.objects.filter(status='APPROVED').order_by().values(
+        'leave_type_id', year=ExtractYear('start_date'), department_id=F('employee__current_department_id'),
+    ).annotate(days=Sum('days_requested'), requests=Count('id'))
+
+
+def transfer_contributions(transfer):
+    key = {'year': timezone.localtime(transfer.created_at).year,
+           'status': transfer.status, 'request_type': transfer.request_type}
+    return [
+        ({**key, 'department_id': transfer.current_department_id}, {'transfers_out': 1}),
+        ({**key, 'department_id': transfer.requested_department_id}, {'transfers_in': 1}),
+    ]
+
+
+def transfer_grouped():
+    transfers = TransferRequest.objects.order_by()
+    yield from transfers.values(
+        'status', 'request_type', year=ExtractYear('created_at'), department_id=F('current_department_id'),
+    ).annotate(transfers_out=Count('id'))
+    yield from transfers.values(
+        'status', 'request_type', year=ExtractYear('created_at'), department_id=F('requested_department_id'),
+    ).annotate(transfers_in=Count('id'))
+
+
+def promotion_contributions(nomination):
+    return [(
+        {'promotion_cycle_id': nomination.promotion_cycle_id,
+         'department_id': nomination.employee.current_department_id,
+         'status': nomination.status,
+         'current_level': nomination.current_level,
+         'proposed_level': nomination.proposed_level},
+        {'nominations': 1},
+    )]
+
+
+def promotion_grouped():
+    return PromotionNomination.objects.order_by().values(
+        'promotion_cycle_id', 'status', 'current_level', 'proposed_level',
+        department_id=F('employee__current_department_id'),
+    ).annotate(nominations=Count('id'))
+
+
+def educational_upgrade_contributions(upgrade):
+    return [(
+        {'year': upgrade.year_of_graduation, 'qualification_type': upgrade.qualification_type,
+         'status': upgrade.status},
+        {'upgrades': 1},
+    )]
+
+
+def educational_upgrade_grouped():
+    return EducationalUpgrade.objects.order_by().values(
+        'qualification_type', 'status', year=F('year_of_graduation'),
+    ).annotate(upgrades=Count('id'))
+
+
+ROLLUPS = {
+    'leave': Rollup(
+        LeaveRollup, LeaveRequest, ('year', 'department_id', 'leave_type_id'), ('days', 'requests'),
+        leave_contributions, leave_grouped, related=('employee',),
+    ),
+    'transfer': Rollup(
+        TransferRollup, TransferRequest, ('year', 'department_id', 'status', 'request_type'),
+        ('transfers_in', 'transfers_out'),
+        transfer_contributions, transfer_grouped,
+    ),
+    'promotion': Rollup(
+        PromotionRollup, PromotionNomination,
+        ('promotion_cycle_id', 'department_id', 'status', 'current_level', 'proposed_level'), ('nominations',),
+        promotion_contributions, promotion_grouped, related=('employee',),
+    ),
+    'educational_upgrade': Rollup(
+        EducationalUpgradeRollup, EducationalUpgrade, ('year', 'qualification_type', 'status'), ('upgrades',),
+        educational_upgrade_contributions, educational_upgrade_grouped,
+    ),
+}
+
+ROLLUPS_BY_SOURCE = defaultdict(list)
+for _rollup in ROLLUPS.values():
+    ROLLUPS_BY_SOURCE[_rollup.source].append(_rollup)
+
+
+def collect(rollup, instance, sign, changes):
+    """Add one row's contributions, times sign, to a {key: {field: delta}} dict"""
+    for key, values in rollup.contributions(instance):
+        bucket = changes[tuple(key[field] for field in rollup.key_fields)]
+        for field, value in values.items():
+            bucket[field] += sign * value
+
+
+def apply_changes(rollup, changes):
+    """Add signed deltas to the rollup rows, creating rows the first time a key is seen"""
+    with transaction.atomic():
+        for key, deltas in changes.items():
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+
+            filters = dict(zip(rollup.key_fields, key))
+            increments = {field: F(field) + delta for field, delta in deltas.items()}
+            if rollup.model.objects.filter(**filters).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    rollup.model.objects.create(**filters, **deltas)
+            except IntegrityError:
+                # Another request created the row first
+                rollup.model.objects.filter(**filters).update(**increments)
+
+
+def source_totals(rollup):
+    """Rollup contents recomputed from the source table as {key: {field: total}}"""
+    totals = defaultdict(lambda: dict.fromkeys(rollup.value_fields, 0))
+    for row in rollup.grouped():
+        values = totals[tuple(row[field] for field in rollup.key_fields)]
+        for field in rollup.value_fields:
+            values[field] += row.get(field, 0)
+    return {key: values for key, values in totals.items() if any(values.values())}
+
+
+def stored_totals(rollup):
+    """Current rollup contents as {key: {field: total}}, ignoring all-zero rows"""
+    size = len(rollup.key_fields)
+    return {
+        row[:size]: dict(zip(rollup.value_fields, row[size:]))
+        for row in rollup.model.objects.values_list(*rollup.key_fields, *rollup.value_fields)
+        if any(row[size:])
+    }
+
+
+def rebuild_rollup(rollup):
+    """Replace the rollup contents with totals recomputed from the source table"""
+    totals = source_totals(rollup)
+    with transaction.atomic():
+        rollup.model.objects.all().delete()
+        rollup.model.objects.bulk_create([
+            rollup.model(**dict(zip(rollup.key_fields, key)), **values)
+            for key, values in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def verify_rollup(rollup):
+    """Keys whose stored totals differ from the source, as (key, stored, expected)"""
+    stored, expected = stored_totals(rollup), source_totals(rollup)
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys(), key=repr)
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+@receiver(pre_save, sender=LeaveRequest)
+@receiver(pre_save, sender=TransferRequest)
+@receiver(pre_save, sender=PromotionNomination)
+@receiver(pre_save, sender=EducationalUpgrade)
+def remember_previous_row(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of the row so its old contribution can be taken back"""
+    if raw or instance.pk is None:
+        return
+    related = {name for rollup in ROLLUPS_BY_SOURCE[sender] for name in rollup.related}
+    instance._rollup_previous = sender.objects.select_related(*related).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_save, sender=TransferRequest)
+@receiver(post_save, sender=PromotionNomination)
+@receiver(post_save, sender=EducationalUpgrade)
+def update_rollups(sender, instance, raw=False, **kwargs):
+    """Move the row's contribution from its old buckets to its new ones"""
+    if raw:
+        return
+    previous = instance.__dict__.pop('_rollup_previous', None)
+    for rollup in ROLLUPS_BY_SOURCE[sender]:
+        changes = defaultdict(lambda: defaultdict(int))
+        if previous is not None:
+            collect(rollup, previous, -1, changes)
+        collect(rollup, instance, 1, changes)
+        apply_changes(rollup, changes)
+
+
+@receiver(pre_delete, sender=LeaveRequest)
+@receiver(pre_delete, sender=TransferRequest)
+@receiver(pre_delete, sender=PromotionNomination)
+@receiver(pre_delete, sender=EducationalUpgrade)
+def remove_from_rollups(sender, instance, **kwargs):
+    """Take a deleted row out of the rollups (runs inside the delete's transaction)"""
+    for rollup in ROLLUPS_BY_SOURCE[sender]:
+        changes = defaultdict(lambda: defaultdict(int))
+        collect(rollup, instance, -1, changes)
+        apply_changes(rollup, changes)
+
+
+# Remember the department each profile was loaded with, to spot transfers on save
+@receiver(post_init, sender=EmployeeProfile)
+def remember_department(sender, instance, **kwargs):
+    # A deferred field (only()/defer()) would cost a query per row to read here
+    instance._rollup_department_id = instance.__dict__.get('current_department_id', DEFERRED)
+
+
+@receiver(pre_save, sender=EmployeeProfile)
+def load_deferred_department(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None and instance._rollup_department_id is DEFERRED:
+        instance._rollup_department_id = sender.objects.filter(pk=instance.pk).values_list(
+            'current_department_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def move_employee_rows(sender, instance, created, raw=False, **kwargs):
+    """Move an employee's leave and promotion rows to their new department"""
+    previous_department_id = instance._rollup_department_id
+    instance._rollup_department_id = instance.current_department_id
+    if raw or created or previous_department_id == instance.current_department_id:
+        return
+
+    before = copy.copy(instance)
+    before.current_department_id = previous_department_id
+    for rollup in ROLLUPS.values():
+        if 'employee' not in rollup.related:
+            continue
+        changes = defaultdict(lambda: defaultdict(int))
+        for row in rollup.source.objects.filter(employee=instance):
+            row.employee = before
+            collect(rollup, row, -1, changes)
+            row.employee = instance
+            collect(rollup, row, 1, changes)
+        apply_changes(rollup, changes)
@@ -0,0 +1,15 @@
+"""
+Background tasks for the HR modules (run by the job workers, see core.jobs)
+"""
+from core.jobs import job_progress, task
+
+from .retirements import describe_identification, identify_retirements
+
+
+@task('hr_modules.identify_retirements')
+def identify_retirements_task(job, upcoming_years=1, department_id=None, dry_run=False):
+    """Create retirement plans for staff retiring within upcoming_years (see hr_modules.retirements)"""
+    job_progress(job, 0, 1, "Dry run: counting candidates" if dry_run else "Creating retirement plans")
+    counts = identify_retirements(upcoming_years, department_id, dry_run=dry_run)
+    job_progress(job, 1, message="Done")
+    return {'summary': describe_identification(counts), **counts}
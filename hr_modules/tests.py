@@ -1,3 +1,221 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User, update_last_login
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import BackgroundJob, Department, EmployeeProfile
+from core.permissions import Role, UserRole
+
+from .models import (
+    LeaveRequest, LeaveRollup, LeaveType, RetirementChecklistItem, RetirementChecklistTemplate, RetirementPlan,
+    TransferRequest, TransferRollup
+)
+from .projections import build_projection, get_projection, get_projection_version
+from .retirements import identify_retirements
+from .rollups import ROLLUPS, verify_rollup
+
+
+class ReportRollupTests(TestCase):
+    """Rollups follow status changes incrementally and match a rebuild from source"""
+
+    def setUp(self):
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        self.ict = Department.objects.create(name='ICT', code='ICT', type='SERV')
+        self.annual = LeaveType.objects.create(name='Annual', max_days=30)
+
+        self.employee = User.objects.create_user(username='rollup_staff').employee_profile
+        self.employee.current_department = self.hr
+        self.employee.save()
+
+    def create_leave(self, days, status='PENDING'):
+        return LeaveRequest.objects.create(
+            employee=self.employee, leave_type=self.annual, start_date=date(2024, 5, 6),
+            end_date=date(2024, 5, 20), days_requested=days, reason='Rest', status=status,
+        )
+
+    def leave_days(self):
+        return list(LeaveRollup.objects.filter(days__gt=0).values_list('year', 'department_id', 'days', 'requests'))
+
+    def test_leave_follows_status_transitions(self):
+        leave = self.create_leave(10)
+        self.create_leave(4, status='APPROVED')
+        self.assertEqual(self.leave_days(), [(2024, self.hr.pk, 4, 1)])
+
+        leave.status = 'APPROVED'
+        leave.save()
+        self.assertEqual(self.leave_days(), [(2024, self.hr.pk, 14, 2)])
+
+        leave.status = 'CANCELLED'
+        leave.save()
+        self.assertEqual(self.leave_days(), [(2024, self.hr.pk, 4, 1)])
+
+        LeaveRequest.objects.filter(status='APPROVED').get().delete()
+        self.assertEqual(self.leave_days(), [])
+        self.assertEqual(verify_rollup(ROLLUPS['leave']), [])
+
+    def test_transfer_counts_in_and_out(self):
+        transfer = TransferRequest.objects.create(
+            employee=self.employee, request_type='EMPLOYEE_REQUESTED',
+            current_department=self.hr, requested_department=self.ict, reason='Closer to home',
+        )
+        transfer.status = 'APPROVED'
+        transfer.save()
+
+        rows = dict(
+            ((department_id, status), (transfers_in, transfers_out))
+            for department_id, status, transfers_in, transfers_out in TransferRollup.objects.values_list(
+                'department_id', 'status', 'transfers_in', 'transfers_out'
+            )
+        )
+        self.assertEqual(rows[(self.hr.pk, 'APPROVED')], (0, 1))
+        self.assertEqual(rows[(self.ict.pk, 'APPROVED')], (1, 0))
+        self.assertEqual(rows[(self.hr.pk, 'DRAFT')], (0, 0))
+        self.assertEqual(verify_rollup(ROLLUPS['transfer']), [])
+
+    def test_transferred_staff_move_their_rows(self):
+        self.create_leave(6, status='APPROVED')
+
+        self.employee.current_department = self.ict
+        self.employee.save()
+
+        self.assertEqual(self.leave_days(), [(2024, self.ict.pk, 6, 1)])
+        self.assertEqual(verify_rollup(ROLLUPS['leave']), [])
+
+    def test_rebuild_repairs_drift(self):
+        self.create_leave(6, status='APPROVED')
+        # queryset.update() skips the signals
+        LeaveRequest.objects.update(days_requested=8)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_report_rollups', 'leave', verify_only=True, stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_report_rollups', stdout=StringIO())
+        self.assertEqual(self.leave_days(), [(2024, self.hr.pk, 8, 1)])
+
+
+class RetirementIdentificationTests(TestCase):
+    """Identification is set based, supports dry runs and skips staff who already have a plan"""
+
+    def setUp(self):
+        self.today = date(2025, 1, 15)
+        for index in range(30):
+            employee = User.objects.create_user(username=f'retiree{index}').employee_profile
+            employee.date_of_retirement = self.today + timedelta(days=10 * index)
+            employee.save()
+        later = User.objects.create_user(username='not_yet').employee_profile
+        later.date_of_retirement = date(2040, 1, 1)
+        later.save()
+        RetirementPlan.objects.create(employee=User.objects.get(username='retiree0').employee_profile,
+                                      expected_retirement_date=self.today)
+
+    def test_dry_run_reports_counts_without_writing(self):
+        counts = identify_retirements(1, dry_run=True, today=self.today)
+
+        self.assertEqual(counts['candidates'], 29)
+        self.assertEqual(counts['checklist_items'], 29 * RetirementChecklistTemplate.objects.count())
+        self.assertEqual(counts['by_year'], {2025: 29})
+        self.assertEqual(RetirementPlan.objects.count(), 1)
+
+    def test_plans_and_checklists_are_bulk_created(self):
+        RetirementChecklistTemplate.objects.filter(item_name='Farewell arrangements').update(is_active=False)
+        template_size = RetirementChecklistTemplate.objects.filter(is_active=True).count()
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = identify_retirements(1, today=self.today)
+
+        self.assertEqual(counts['plans'], 29)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(RetirementPlan.objects.count(), 30)
+        self.assertEqual(RetirementChecklistItem.objects.count(), 29 * template_size)
+        self.assertFalse(RetirementChecklistItem.objects.filter(item_name='Farewell arrangements').exists())
+
+        # Running again finds nobody new
+        self.assertEqual(identify_retirements(1, today=self.today)['candidates'], 0)
+
+
+class IdentifyRetirementsViewTests(TestCase):
+    """The identification form rejects bad input with a message instead of failing"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='retirement_officer')
+        role = Role.objects.create(name='Retirement Officer', role_type='HR_OFFICER', can_manage_retirements=True)
+        UserRole.objects.create(user=user, role=role)
+        self.client.force_login(user)
+
+    def test_bad_input_is_rejected(self):
+        for data in ({'upcoming_years': 'two'}, {'upcoming_years': '0'}, {'upcoming_years': '1', 'department': 'ICT'}):
+            with self.subTest(data):
+                response = self.client.post(reverse('hr_modules:identify_upcoming_retirements'), data)
+                self.assertRedirects(response, reverse('hr_modules:identify_upcoming_retirements'),
+                                     fetch_redirect_response=False)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_valid_input_queues_a_job(self):
+        response = self.client.post(reverse('hr_modules:identify_upcoming_retirements'),
+                                    {'upcoming_years': '2', 'dry_run': 'on'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BackgroundJob.objects.get().payload['upcoming_years'], 2)
+
+
+class WorkforceProjectionTests(TestCase):
+    """Projections come from staff dates, not plans, and are cached until the workforce changes"""
+
+    def setUp(self):
+        self.today = date(2025, 6, 1)
+        self.hr = Department.objects.create(name='Human Resources', code='HR', type='SERV')
+        self.ict = Department.objects.create(name='ICT', code='ICT', type='SERV')
+        self.add('hr_born', self.hr, date(1966, 3, 1), current_grade_level=14)
+        self.add('hr_service', self.hr, date(1980, 1, 1), date_of_assumption=date(1993, 9, 1), current_grade_level=12)
+        self.add('ict_born', self.ict, date(1967, 2, 28), current_cadre='A')
+        self.add('overdue', self.ict, date(1965, 1, 1))
+        self.add('undated', self.ict)
+        self.add('inactive', self.hr, date(1966, 3, 1), is_active=False)
+
+    def add(self, username, department, date_of_birth=None, is_active=True, **fields):
+        user = User.objects.create_user(username=username, is_active=is_active)
+        EmployeeProfile.objects.filter(user=user).update(
+            current_department=department, date_of_birth=date_of_birth, **fields
+        )
+
+    def test_retirements_are_bucketed_by_year_and_dimension(self):
+        projection = build_projection(self.today)
+
+        self.assertEqual(projection.year_totals(3), [(2025, 0), (2026, 1), (2027, 1)])
+        # Thirty-five years of service from 1993 comes before the 60th birthday
+        self.assertEqual(projection.year_totals(35)[3], (2028, 1))
+        self.assertEqual(projection.dimension_totals('department', 35), {self.hr.pk: 2, self.ict.pk: 1})
+        self.assertEqual(projection.dimension_totals('department', 2), {self.hr.pk: 1})
+        self.assertEqual(projection.dimension_totals('grade_level', 35), {14: 1, 12: 1, None: 1})
+        self.assertEqual(projection.matrix('cadre', 5).cell(2027, 'A'), 1)
+        self.assertEqual((projection.active, projection.overdue, projection.unknown), (5, 1, 1))
+        self.assertEqual(build_projection(self.today, self.ict.pk).dimension_totals('department', 35), {self.ict.pk: 1})
+
+    def test_projection_is_cached_until_an_employee_changes(self):
+        self.assertEqual(sum(get_projection(self.today).totals), 3)
+        with CaptureQueriesContext(connection) as queries:
+            get_projection(self.today)
+        self.assertEqual(len(queries), 0)
+
+        employee = EmployeeProfile.objects.get(user__username='undated')
+        employee.date_of_birth = date(1970, 5, 5)
+        employee.save()
+        self.assertEqual(get_projection(self.today).year_totals(6)[-1], (2030, 1))
+
+    def test_logins_and_unrelated_edits_keep_the_cache(self):
+        version = get_projection_version()
+        user = User.objects.get(username='hr_born')
+        update_last_login(None, user)
+        user.employee_profile.phone_number = '08030000000'
+        user.employee_profile.save()
+        self.assertEqual(get_projection_version(), version)
 
-# Create your tests here.
+        user.is_active = False
+        user.save()
+        self.assertNotEqual(get_projection_version(), version)
@@ -2,15 +2,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count
-from django.http import HttpResponse
+from django.db.models import Q, Sum
 
-from .models import EducationalUpgrade
+from .models import EducationalUpgrade, EducationalUpgradeRollup
 from core.models import EmployeeProfile, Department
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv
+from core.reports import group_totals
 
 from datetime import timedelta
-import csv
 
 
 @login_required
@@ -405,37 +405,26 @@ def educational_upgrade_export(request):
     if qualification_type:
         upgrades = upgrades.filter(qualification_type=qualification_type)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
+    # Stream CSV response
+    columns = [
+        ('Employee', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Qualification Type', 'get_qualification_type_display'),
+        ('Course', 'course_of_study'),
+        ('Institution', 'institution'),
+        ('Year', 'year_of_graduation'),
+        ('Status', 'get_status_display'),
+        ('Submission Date', 'submission_date'),
+        ('Reviewer', 'reviewed_by.get_full_name'),
+        ('Review Date', 'review_date'),
+        ('Approver', 'approved_by.get_full_name'),
+        ('Approval Date', 'approval_date'),
+        ('Effective Date', 'effective_date'),
+    ]
+    
     filename = f"educational_upgrades_{timezone.now().strftime('%Y%m%d')}.csv"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'File Number', 'Department', 'Qualification Type', 
-                     'Course', 'Institution', 'Year', 'Status', 'Submission Date',
-                     'Reviewer', 'Review Date', 'Approver', 'Approval Date', 'Effective Date'])
-    
-    # Add data rows
-    for upgrade in upgrades:
-        writer.writerow([
-            upgrade.employee.user.get_full_name(),
-            upgrade.employee.file_number,
-            upgrade.employee.current_department.name if upgrade.employee.current_department else '',
-            upgrade.get_qualification_type_display(),
-            upgrade.course_of_study,
-            upgrade.institution,
-            upgrade.year_of_graduation,
-            upgrade.get_status_display(),
-            upgrade.submission_date,
-            upgrade.reviewed_by.get_full_name() if upgrade.reviewed_by else '',
-            upgrade.review_date if upgrade.review_date else '',
-            upgrade.approved_by.get_full_name() if upgrade.approved_by else '',
-            upgrade.approval_date if upgrade.approval_date else '',
-            upgrade.effective_date if upgrade.effective_date else ''
-        ])
-    
-    return response
+    return stream_csv(upgrades, columns, filename)
 
 
 @login_required
@@ -450,52 +439,38 @@ def educational_upgrade_summary_report(request):
     year_from = request.GET.get('year_from', str(timezone.now().year - 5))
     year_to = request.GET.get('year_to', str(timezone.now().year))
     
-    # Base queryset
-    upgrades = EducationalUpgrade.objects.filter(
-        year_of_graduation__gte=year_from,
-        year_of_graduation__lte=year_to
+    # Upgrade counts per graduation year, qualification and status, from the rollup table
+    rollups = EducationalUpgradeRollup.objects.filter(
+        year__gte=year_from,
+        year__lte=year_to
     )
     
     # Get qualification type counts
-    qual_counts = upgrades.values('qualification_type').annotate(
-        count=Count('id')
-    ).order_by('qualification_type')
-    
-    qualification_data = []
     qualification_choices = dict(EducationalUpgrade.qualification_type.field.choices)
-    
-    for item in qual_counts:
-        qual_type = item['qualification_type']
-        qualification_data.append({
-            'code': qual_type,
-            'name': qualification_choices.get(qual_type, qual_type),
-            'count': item['count']
-        })
+    qualification_data = [
+        {
+            'code': row['qualification_type'],
+            'name': qualification_choices.get(row['qualification_type'], row['qualification_type']),
+            'count': row['count'],
+        }
+        for row in group_totals(rollups, 'qualification_type', count=Sum('upgrades')) if row['count']
+    ]
     
     # Get status counts
-    status_counts = upgrades.values('status').annotate(
-        count=Count('id')
-    ).order_by('status')
-    
-    status_data = []
     status_choices = dict(EducationalUpgrade.status.field.choices)
-    
-    for item in status_counts:
-        status_code = item['status']
-        status_data.append({
-            'code': status_code,
-            'name': status_choices.get(status_code, status_code),
-            'count': item['count']
-        })
+    status_data = [
+        {
+            'code': row['status'],
+            'name': status_choices.get(row['status'], row['status']),
+            'count': row['count'],
+        }
+        for row in group_totals(rollups, 'status', count=Sum('upgrades')) if row['count']
+    ]
     
     # Get yearly trends
-    year_counts = upgrades.values('year_of_graduation').annotate(
-        count=Count('id')
-    ).order_by('year_of_graduation')
-    
-    year_data = {}
-    for item in year_counts:
-        year_data[item['year_of_graduation']] = item['count']
+    year_data = {
+        row['year']: row['count'] for row in group_totals(rollups, 'year', count=Sum('upgrades'))
+    }
     
     # Fill in missing years
     year_range = range(int(year_from), int(year_to) + 1)
@@ -514,7 +489,7 @@ def educational_upgrade_summary_report(request):
         'qualification_data': qualification_data,
         'status_data': status_data,
         'year_series': year_series,
-        'total_upgrades': upgrades.count(),
+        'total_upgrades': sum(item['count'] for item in status_data),
         'available_years': available_years,
         'year_from': year_from,
         'year_to': year_to,
@@ -3,14 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, Max, Min
-from django.http import HttpResponse
 
 from .models import ExaminationType, Examination, ExaminationParticipant
 from core.models import EmployeeProfile
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv
+from core.pagination import paginate_keyset, render_list
 
 from datetime import timedelta
-import csv
 
 
 @login_required
@@ -24,7 +24,7 @@ def examination_list(request):
     search = request.GET.get('search', '')
     
     # Base queryset
-    examinations = Examination.objects.all().select_related('examination_type').order_by('-scheduled_date')
+    examinations = Examination.objects.all().select_related('examination_type')
     
     # Apply filters
     if status:
@@ -45,6 +45,9 @@ def examination_list(request):
             Q(venue__icontains=search)
         )
     
+    # One page, latest sitting first
+    examinations = paginate_keyset(request, examinations, ['-scheduled_date'])
+    
     # Get examination types for filter
     examination_types = ExaminationType.objects.all()
     
@@ -77,7 +80,7 @@ def examination_list(request):
         'search': search,
     }
     
-    return render(request, 'hr_modules/examination/examination_list.html', context)
+    return render_list(request, 'hr_modules/examination/examination_list.html', context)
 
 
 @login_required
@@ -375,31 +378,22 @@ def examination_export_results(request, pk):
         messages.error(request, "You don't have permission to export examination results.")
         return redirect('hr_modules:examination_detail', pk=examination.pk)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{examination.title}_results.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'File Number', 'Department', 'Status', 'Score', 'Position', 'Comments'])
-    
-    # Add participant data
     participants = ExaminationParticipant.objects.filter(
         examination=examination
     ).select_related('employee', 'employee__user', 'employee__current_department').order_by('-score')
     
-    for participant in participants:
-        writer.writerow([
-            participant.employee.user.get_full_name(),
-            participant.employee.file_number,
-            participant.employee.current_department.name if participant.employee.current_department else '',
-            participant.get_status_display(),
-            participant.score if participant.score is not None else '',
-            participant.position if participant.position is not None else '',
-            participant.comments or ''
-        ])
-    
-    return response
+    # Stream CSV response
+    columns = [
+        ('Name', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Status', 'get_status_display'),
+        ('Score', 'score'),
+        ('Position', 'position'),
+        ('Comments', 'comments'),
+    ]
+    
+    return stream_csv(participants, columns, f"{examination.title}_results.csv")
 
 
 @login_required
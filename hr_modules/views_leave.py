@@ -3,14 +3,17 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q, Sum
-from django.http import HttpResponse
 
-from .models import LeaveType, LeaveBalance, LeaveRequest, LeaveApprovalLevel
+from .models import LeaveType, LeaveBalance, LeaveRequest, LeaveApprovalLevel, LeaveRollup
 from core.models import EmployeeProfile, Department
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv
+from core.reference_data import get_departments
+from core.pagination import paginate_keyset, render_list
+from core.reports import pivot, department_label, by_department_name
+from core.search import search_filter
 
 from datetime import timedelta, datetime
-import csv
 
 
 @login_required
@@ -38,9 +41,6 @@ def leave_list(request):
             employee=employee_profile
         ).select_related('employee', 'employee__user', 'leave_type', 'approved_by')
     
-    # Order by recency and status
-    leaves = leaves.order_by('-created_at')
-    
     # Apply filters
     if status:
         leaves = leaves.filter(status=status)
@@ -67,6 +67,9 @@ def leave_list(request):
                 Q(reason__icontains=search)
             )
     
+    # One page, most recent first
+    leaves = paginate_keyset(request, leaves, ['-created_at'])
+    
     # Get leave types for filter
     leave_types = LeaveType.objects.all()
     
@@ -105,7 +108,7 @@ def leave_list(request):
         'search': search,
     }
     
-    return render(request, 'hr_modules/leave/leave_list.html', context)
+    return render_list(request, 'hr_modules/leave/leave_list.html', context)
 
 
 @login_required
@@ -290,11 +293,7 @@ def leave_balance_admin(request):
         employees = employees.filter(current_department_id=department_id)
     
     if search:
-        employees = employees.filter(
-            Q(user__first_name__icontains=search) |
-            Q(user__last_name__icontains=search) |
-            Q(file_number__icontains=search)
-        )
+        employees = employees.filter(search_filter('staff', search))
     
     # Get leave types
     leave_types = LeaveType.objects.all()
@@ -330,7 +329,7 @@ def leave_balance_admin(request):
             }
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     # Get years for filter (from 2 years ago to 2 years in the future)
     current_year = timezone.now().year
@@ -446,32 +445,22 @@ def leave_export(request):
     if status:
         leaves = leaves.filter(status=status)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="leave_records_{year}.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'File Number', 'Department', 'Leave Type', 'Start Date', 'End Date', 
-                    'Days', 'Status', 'Approved By', 'Approval Date', 'Reason'])
-    
-    # Add leave data
-    for leave in leaves:
-        writer.writerow([
-            leave.employee.user.get_full_name(),
-            leave.employee.file_number,
-            leave.employee.current_department.name if leave.employee.current_department else '',
-            leave.leave_type.name,
-            leave.start_date,
-            leave.end_date,
-            leave.days_requested,
-            leave.get_status_display(),
-            leave.approved_by.get_full_name() if leave.approved_by else '',
-            leave.approved_date if leave.approved_date else '',
-            leave.reason
-        ])
-    
-    return response
+    # Stream CSV response
+    columns = [
+        ('Employee', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Leave Type', 'leave_type.name'),
+        ('Start Date', 'start_date'),
+        ('End Date', 'end_date'),
+        ('Days', 'days_requested'),
+        ('Status', 'get_status_display'),
+        ('Approved By', 'approved_by.get_full_name'),
+        ('Approval Date', 'approved_date'),
+        ('Reason', 'reason'),
+    ]
+    
+    return stream_csv(leaves, columns, f"leave_records_{year}.csv")
 
 
 @login_required
@@ -489,70 +478,36 @@ def leave_summary_report(request):
     # Get leave types
     leave_types = LeaveType.objects.all()
     
-    # Base queryset for approved leave requests
-    approved_leaves = LeaveRequest.objects.filter(
-        status='APPROVED',
-        start_date__year=year
-    ).select_related(
-        'employee', 'employee__current_department', 'leave_type'
-    )
+    # Approved leave days per department and leave type, from the rollup table
+    rollups = LeaveRollup.objects.filter(year=year)
     
     # Apply department filter
     if department_id:
-        approved_leaves = approved_leaves.filter(employee__current_department_id=department_id)
-    
-    # Group by department and leave type
-    department_summaries = {}
-    
-    # Get all departments first
-    departments = Department.objects.all()
-    for department in departments:
-        department_summaries[department.id] = {
-            'department': department,
-            'leave_types': {lt.id: 0 for lt in leave_types},
-            'total': 0
-        }
+        rollups = rollups.filter(department_id=department_id)
     
-    # Add department with no defined ID for employees without department
-    department_summaries[0] = {
-        'department': {'name': 'No Department'},
-        'leave_types': {lt.id: 0 for lt in leave_types},
-        'total': 0
-    }
+    days = pivot(rollups, 'department_id', 'leave_type_id', Sum('days'))
+    days.sort_rows(key=by_department_name)
     
-    # Aggregate leave data
-    for leave in approved_leaves:
-        dept_id = leave.employee.current_department_id if leave.employee.current_department_id else 0
-        
-        if dept_id not in department_summaries:
-            # Should not happen with our initialization, but just in case
-            department_summaries[dept_id] = {
-                'department': leave.employee.current_department if leave.employee.current_department else {'name': 'No Department'},
-                'leave_types': {lt.id: 0 for lt in leave_types},
-                'total': 0
-            }
-        
-        department_summaries[dept_id]['leave_types'][leave.leave_type_id] += leave.days_requested
-        department_summaries[dept_id]['total'] += leave.days_requested
-    
-    # Get grand totals
-    grand_totals = {lt.id: 0 for lt in leave_types}
-    total_days = 0
-    
-    for dept_summary in department_summaries.values():
-        for leave_type_id, days in dept_summary['leave_types'].items():
-            grand_totals[leave_type_id] += days
-            total_days += days
+    department_summaries = [
+        {
+            'department': department_label(dept_id),
+            'leave_types': days.row(dept_id, [lt.id for lt in leave_types]),
+            'total': days.row_totals[dept_id],
+        }
+        for dept_id in days.rows if days.row_totals[dept_id] > 0
+    ]
+    grand_totals = {lt.id: days.column_totals.get(lt.id, 0) for lt in leave_types}
+    total_days = days.total
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     # Get years for filter
     current_year = timezone.now().year
     years = range(current_year - 2, current_year + 3)
     
     context = {
-        'department_summaries': [ds for ds in department_summaries.values() if ds['total'] > 0],
+        'department_summaries': department_summaries,
         'leave_types': leave_types,
         'grand_totals': grand_totals,
         'total_days': total_days,
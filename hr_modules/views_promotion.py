@@ -2,18 +2,19 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Avg, Sum, Count, F
-from django.http import HttpResponse
+from django.db.models import Q, Avg, Sum, Count, F, FloatField
 
 from .models import (
     PromotionCycle, PromotionCriteria, PromotionNomination, 
-    PromotionAssessment
+    PromotionAssessment, PromotionRollup
 )
 from core.models import EmployeeProfile, Department, Designation
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv
+from core.reference_data import get_departments
+from core.reports import pivot, group_totals, department_label, by_department_name
 
 from datetime import timedelta
-import csv
 
 
 @login_required
@@ -611,46 +612,33 @@ def promotion_export(request, cycle_pk):
         messages.error(request, "You don't have permission to export promotion data.")
         return redirect('hr_modules:promotion_cycle_detail', pk=promotion_cycle.pk)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{promotion_cycle.title}_promotions.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'File Number', 'Department', 'Current Level', 'Proposed Level', 
-                     'Status', 'Nominated By', 'Approved By', 'Total Score'])
-    
-    # Get nominations for this cycle
+    # Get nominations for this cycle, with the weighted assessment score summed in the database
     nominations = PromotionNomination.objects.filter(
         promotion_cycle=promotion_cycle
     ).select_related(
         'employee', 'employee__user', 'employee__current_department',
         'nominated_by', 'approved_by'
-    )
-    
-    # Add data rows
-    for nomination in nominations:
-        # Calculate total score
-        assessments = PromotionAssessment.objects.filter(nomination=nomination).select_related('criteria')
-        total_score = 0
-        
-        for assessment in assessments:
-            weight = assessment.criteria.weight / 100.0
-            total_score += assessment.score * weight
-        
-        writer.writerow([
-            nomination.employee.user.get_full_name(),
-            nomination.employee.file_number,
-            nomination.employee.current_department.name if nomination.employee.current_department else '',
-            nomination.current_level,
-            nomination.proposed_level,
-            nomination.get_status_display(),
-            nomination.nominated_by.get_full_name() if nomination.nominated_by else '',
-            nomination.approved_by.get_full_name() if nomination.approved_by else '',
-            f"{total_score:.2f}"
-        ])
-    
-    return response
+    ).annotate(
+        weighted_score=Sum(
+            F('assessments__score') * F('assessments__criteria__weight'),
+            output_field=FloatField()
+        )
+    ).order_by('pk')
+    
+    # Stream CSV response
+    columns = [
+        ('Employee', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Current Level', 'current_level'),
+        ('Proposed Level', 'proposed_level'),
+        ('Status', 'get_status_display'),
+        ('Nominated By', 'nominated_by.get_full_name'),
+        ('Approved By', 'approved_by.get_full_name'),
+        ('Total Score', lambda nomination: f"{(nomination.weighted_score or 0) / 100.0:.2f}"),
+    ]
+    
+    return stream_csv(nominations, columns, f"{promotion_cycle.title}_promotions.csv")
 
 
 @login_required
@@ -665,88 +653,55 @@ def promotion_summary_report(request):
     year = request.GET.get('year', '')
     department_id = request.GET.get('department', '')
     
-    # Base queryset
-    promotion_cycles = PromotionCycle.objects.filter(status='COMPLETED')
+    # Nominations in completed cycles, from the rollup table
+    rollups = PromotionRollup.objects.filter(promotion_cycle__status='COMPLETED')
     
     if year:
-        promotion_cycles = promotion_cycles.filter(year=year)
+        rollups = rollups.filter(promotion_cycle__year=year)
     
     # Get all departments for the filter
-    departments = Department.objects.all()
-    
-    # Prepare department summary data
-    department_data = {}
-    for department in departments:
-        department_data[department.id] = {
-            'department': department,
-            'nominated': 0,
-            'approved': 0,
-            'rejected': 0,
-            'approval_rate': 0
-        }
-    
-    # Add entry for employees without department
-    department_data[0] = {
-        'department': {'name': 'No Department'},
-        'nominated': 0,
-        'approved': 0,
-        'rejected': 0,
-        'approval_rate': 0
-    }
-    
-    # Get level distribution data
-    level_data = {}
-    for level in range(1, 18):  # GL-1 to GL-17
-        level_data[level] = {
-            'from': 0,
-            'to': 0
-        }
-    
-    # Get nominations data
-    nominations = PromotionNomination.objects.filter(
-        promotion_cycle__in=promotion_cycles
-    ).select_related('employee', 'employee__current_department')
+    departments = get_departments()
     
     # Apply department filter if specified
     if department_id:
-        nominations = nominations.filter(employee__current_department_id=department_id)
-    
-    # Process nominations
-    for nomination in nominations:
-        dept_id = nomination.employee.current_department_id if nomination.employee.current_department_id else 0
-        
-        if dept_id not in department_data:
-            # Should not happen with our initialization, but just in case
-            department_data[dept_id] = {
-                'department': nomination.employee.current_department if nomination.employee.current_department else {'name': 'No Department'},
-                'nominated': 0,
-                'approved': 0,
-                'rejected': 0,
-                'approval_rate': 0
-            }
-        
-        # Update department stats
-        department_data[dept_id]['nominated'] += 1
-        
-        if nomination.status == 'APPROVED':
-            department_data[dept_id]['approved'] += 1
-            
-            # Update level stats
-            level_data[nomination.current_level]['from'] += 1
-            level_data[nomination.proposed_level]['to'] += 1
-        
-        elif nomination.status == 'REJECTED':
-            department_data[dept_id]['rejected'] += 1
+        rollups = rollups.filter(department_id=department_id)
+    
+    # Department stats: one grouped query with conditional sums
+    department_rows = group_totals(
+        rollups, 'department_id',
+        nominated=Sum('nominations', default=0),
+        approved=Sum('nominations', filter=Q(status='APPROVED'), default=0),
+        rejected=Sum('nominations', filter=Q(status='REJECTED'), default=0),
+    )
+    department_rows.sort(key=lambda row: by_department_name(row['department_id']))
+    department_data = [
+        {
+            'department': department_label(row['department_id']),
+            'nominated': row['nominated'],
+            'approved': row['approved'],
+            'rejected': row['rejected'],
+            'approval_rate': (row['approved'] / row['nominated']) * 100,
+        }
+        for row in department_rows if row['nominated'] > 0
+    ]
     
-    # Calculate approval rates
-    for dept_id, data in department_data.items():
-        if data['nominated'] > 0:
-            data['approval_rate'] = (data['approved'] / data['nominated']) * 100
+    # Level distribution of approved promotions (GL-1 to GL-17 always listed)
+    level_transitions = pivot(
+        rollups.filter(status='APPROVED'), 'current_level', 'proposed_level', Sum('nominations')
+    )
+    levels = sorted(set(range(1, 18)) | set(level_transitions.rows) | set(level_transitions.columns))
+    level_data = [
+        (level, {
+            'from': level_transitions.row_totals.get(level, 0),
+            'to': level_transitions.column_totals.get(level, 0),
+        })
+        for level in levels
+    ]
     
     # Calculate totals
-    total_nominated = sum(d['nominated'] for d in department_data.values())
-    total_approved = sum(d['approved'] for d in department_data.values())
-    total_rejected = sum(d['rejected'] for d in department_data.values())
+    total_nominated = sum(d['nominated'] for d in department_data)
+    total_approved = sum(d['approved'] for d in department_data)
+    total_rejected = sum(d['rejected'] for d in department_data)
     
     if total_nominated > 0:
         total_approval_rate = (total_approved / total_nominated) * 100
@@ -757,8 +712,9 @@ def promotion_summary_report(request):
     all_years = PromotionCycle.objects.values_list('year', flat=True).distinct().order_by('-year')
     
     context = {
-        'department_data': [d for d in department_data.values() if d['nominated'] > 0],
-        'level_data': level_data.items(),
+        'department_data': department_data,
+        'level_data': level_data,
+        'level_transitions': level_transitions,
         'total_nominated': total_nominated,
         'total_approved': total_approved,
         'total_rejected': total_rejected,
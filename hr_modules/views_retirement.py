@@ -2,15 +2,23 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from django.urls import reverse
 from django.db.models import Q, Count, F, ExpressionWrapper, fields
-from django.http import HttpResponse
 
 from .models import RetirementPlan, RetirementChecklistItem
-from core.models import EmployeeProfile, Department
+from core.models import EmployeeProfile, Department, State
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv, yes_no
+from core.reference_data import get_departments
+from core.pagination import paginate_keyset, render_list
+from core.reports import department_label
+from core.search import search_filter
+from core.jobs import enqueue
+from core.permissions import get_cached_user_permissions
+
+from .projections import DIMENSIONS, MAX_HORIZON_YEARS, clamp_horizon, get_projection
 
 from datetime import timedelta, date
-import csv
 
 
 @login_required
@@ -35,9 +43,6 @@ def retirement_list(request):
         'exit_interview_conducted_by'
     )
     
-    # Order by expected retirement date
-    retirement_plans = retirement_plans.order_by('expected_retirement_date')
-    
     # Apply filters
     if status:
         retirement_plans = retirement_plans.filter(status=status)
@@ -49,15 +54,14 @@ def retirement_list(request):
         retirement_plans = retirement_plans.filter(employee__current_department_id=department_id)
     
     if search:
-        retirement_plans = retirement_plans.filter(
-            Q(employee__user__first_name__icontains=search) |
-            Q(employee__user__last_name__icontains=search) |
-            Q(employee__file_number__icontains=search)
-        )
+        retirement_plans = retirement_plans.filter(search_filter('staff', search, field='employee'))
     
-    # Calculate days to retirement
+    # One page, soonest retirement first
+    page = paginate_keyset(request, retirement_plans, ['expected_retirement_date'])
+    
+    # Calculate days to retirement for the rows on this page only
     today = timezone.now().date()
-    for plan in retirement_plans:
+    for plan in page:
         plan.days_to_retirement = (plan.expected_retirement_date - today).days
     
     # Get upcoming retirements (next 90 days)
@@ -67,33 +71,30 @@ def retirement_list(request):
         status__in=['UPCOMING', 'NOTIFIED']
     ).select_related('employee', 'employee__user').order_by('expected_retirement_date')
     
-    # Get counts for dashboard
-    total_count = retirement_plans.count()
-    upcoming_count = RetirementPlan.objects.filter(
-        expected_retirement_date__gte=today,
-        expected_retirement_date__lte=today + timedelta(days=90)
-    ).count()
-    processing_count = RetirementPlan.objects.filter(
-        status__in=['NOTIFIED', 'IN_PROGRESS']
-    ).count()
-    completed_count = RetirementPlan.objects.filter(
-        status='COMPLETED'
-    ).count()
+    # Get counts for dashboard in one query; the filtered total comes from the page
+    counts = RetirementPlan.objects.aggregate(
+        upcoming_count=Count('id', filter=Q(
+            expected_retirement_date__gte=today,
+            expected_retirement_date__lte=today + timedelta(days=90)
+        )),
+        processing_count=Count('id', filter=Q(status__in=['NOTIFIED', 'IN_PROGRESS'])),
+        completed_count=Count('id', filter=Q(status='COMPLETED')),
+    )
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     # Get years for filter
     current_year = timezone.now().year
     years = range(current_year - 2, current_year + 5)
     
     context = {
-        'retirement_plans': retirement_plans,
+        'retirement_plans': page,
         'upcoming_retirements': upcoming_retirements,
-        'total_count': total_count,
-        'upcoming_count': upcoming_count,
-        'processing_count': processing_count,
-        'completed_count': completed_count,
+        'total_count': page.count_display,
+        'upcoming_count': counts['upcoming_count'],
+        'processing_count': counts['processing_count'],
+        'completed_count': counts['completed_count'],
         'departments': departments,
         'years': years,
         'filter_status': status,
@@ -102,7 +103,7 @@ def retirement_list(request):
         'search': search,
     }
     
-    return render(request, 'hr_modules/retirement/retirement_list.html', context)
+    return render_list(request, 'hr_modules/retirement/retirement_list.html', context)
 
 
 @login_required
@@ -473,33 +474,22 @@ def retirement_export(request):
     if status:
         retirement_plans = retirement_plans.filter(status=status)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="retirement_plans_{year}.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'File Number', 'Department', 'Retirement Date', 'Status',
-                    'Notification Date', 'Exit Interview Date', 'Clearance Completed',
-                    'Pension Processed', 'Final Payout Amount', 'Final Payout Date'])
-    
-    # Add data rows
-    for plan in retirement_plans:
-        writer.writerow([
-            plan.employee.user.get_full_name(),
-            plan.employee.file_number,
-            plan.employee.current_department.name if plan.employee.current_department else '',
-            plan.expected_retirement_date,
-            plan.get_status_display(),
-            plan.notification_date if plan.notification_date else '',
-            plan.exit_interview_date if plan.exit_interview_date else '',
-            'Yes' if plan.clearance_completed else 'No',
-            'Yes' if plan.pension_processed else 'No',
-            plan.final_payout_amount if plan.final_payout_amount else '',
-            plan.final_payout_date if plan.final_payout_date else ''
-        ])
-    
-    return response
+    # Stream CSV response
+    columns = [
+        ('Employee', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Retirement Date', 'expected_retirement_date'),
+        ('Status', 'get_status_display'),
+        ('Notification Date', 'notification_date'),
+        ('Exit Interview Date', 'exit_interview_date'),
+        ('Clearance Completed', yes_no('clearance_completed')),
+        ('Pension Processed', yes_no('pension_processed')),
+        ('Final Payout Amount', 'final_payout_amount'),
+        ('Final Payout Date', 'final_payout_date'),
+    ]
+    
+    return stream_csv(retirement_plans, columns, f"retirement_plans_{year}.csv")
 
 
 @login_required
@@ -511,54 +501,62 @@ def retirement_forecast(request):
         return redirect('hr_modules:retirement_list')
     
     # Get filter parameters
-    years_ahead = int(request.GET.get('years_ahead', '5'))
+    try:
+        years_ahead = clamp_horizon(request.GET.get('years_ahead', '5'))
+    except ValueError:
+        years_ahead = 5
     department_id = request.GET.get('department', '')
+    dimension = request.GET.get('dimension', 'department')
+    if dimension not in DIMENSIONS:
+        dimension = 'department'
     
     # Base date for calculations
     today = timezone.now().date()
-    end_date = today + timedelta(days=365 * years_ahead)
+    end_date = date(today.year + years_ahead - 1, 12, 31)
     
-    # Get all retirement plans within the forecast period
-    retirement_plans = RetirementPlan.objects.filter(
-        expected_retirement_date__gte=today,
-        expected_retirement_date__lte=end_date
-    ).select_related('employee', 'employee__user', 'employee__current_department')
+    # Retirements projected from every active employee's dates, cached until the workforce changes
+    projection = get_projection(today, int(department_id) if department_id.isdigit() else None)
     
-    # Apply department filter
-    if department_id:
-        retirement_plans = retirement_plans.filter(employee__current_department_id=department_id)
-    
-    # Group by year and department
-    year_data = {}
-    department_data = {}
-    
-    for plan in retirement_plans:
-        # Group by year
-        year = plan.expected_retirement_date.year
-        if year not in year_data:
-            year_data[year] = []
-        year_data[year].append(plan)
-        
-        # Group by department
-        dept_name = plan.employee.current_department.name if plan.employee.current_department else "No Department"
-        if dept_name not in department_data:
-            department_data[dept_name] = []
-        department_data[dept_name].append(plan)
+    # Retirees per year x department
+    forecast = projection.matrix('department', years_ahead)
+    year_data = projection.year_totals(years_ahead)
     
     # Sort departments by number of retirees
-    department_counts = {dept: len(plans) for dept, plans in department_data.items()}
-    sorted_departments = sorted(department_counts.items(), key=lambda x: x[1], reverse=True)
+    department_data = {
+        department_label(dept_id).name: count
+        for dept_id, count in projection.dimension_totals('department', years_ahead).items()
+    }
+    sorted_departments = list(department_data.items())
+    
+    # Retirees per year x the chosen breakdown (department, grade level, cadre or state)
+    breakdown = projection.matrix(dimension, years_ahead)
+    if dimension == 'department':
+        breakdown_labels = {dept_id: department_label(dept_id).name for dept_id in breakdown.columns}
+    elif dimension == 'state':
+        states = dict(State.objects.filter(pk__in=[pk for pk in breakdown.columns if pk]).values_list('pk', 'name'))
+        breakdown_labels = {pk: states.get(pk, 'Unknown') for pk in breakdown.columns}
+    else:
+        breakdown_labels = {value: value or 'Unknown' for value in breakdown.columns}
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     context = {
-        'retirement_plans': retirement_plans,
-        'year_data': year_data.items(),
+        'year_data': year_data,
         'department_data': department_data,
+        'forecast': forecast,
+        'breakdown': breakdown,
+        'breakdown_labels': breakdown_labels,
+        'dimension': dimension,
+        'dimensions': list(DIMENSIONS),
+        'total_retirees': sum(count for year, count in year_data),
+        'overdue_retirees': projection.overdue,
+        'unknown_retirement_dates': projection.unknown,
+        'active_employees': projection.active,
         'sorted_departments': sorted_departments,
         'departments': departments,
         'years_ahead': years_ahead,
+        'max_years_ahead': MAX_HORIZON_YEARS,
         'filter_department': department_id,
         'today': today,
         'end_date': end_date,
@@ -571,76 +569,41 @@ def retirement_forecast(request):
 def identify_upcoming_retirements(request):
     """Automatic identification of employees approaching retirement"""
     # Check if user can manage retirements
-    if not request.user.user_permissions.get('can_manage_retirements', False):
+    if not get_cached_user_permissions(request.user).get('can_manage_retirements', False):
         messages.error(request, "You don't have permission to identify upcoming retirements.")
         return redirect('hr_modules:retirement_list')
     
     if request.method == 'POST':
-        # Process retirement identification
-        upcoming_years = int(request.POST.get('upcoming_years', '1'))
-        department_id = request.POST.get('department', '')
-        
-        today = timezone.now().date()
-        cutoff_date = today + timedelta(days=365 * upcoming_years)
-        
-        # Get all employees with age or service approaching retirement
-        # In a real implementation, this would use date_of_birth for age-based retirement
-        # and date_of_assumption for service-based retirement
-        
-        employees = EmployeeProfile.objects.filter(
-            user__is_active=True,
-            date_of_retirement__isnull=False,
-            date_of_retirement__lte=cutoff_date
-        ).select_related('user', 'current_department')
-        
-        # Apply department filter
-        if department_id:
-            employees = employees.filter(current_department_id=department_id)
-        
-        # Exclude employees with existing retirement plans
-        existing_plans = RetirementPlan.objects.values_list('employee_id', flat=True)
-        employees = employees.exclude(id__in=existing_plans)
-        
-        # Create retirement plans for identified employees
-        count = 0
-        for employee in employees:
-            retirement_plan = RetirementPlan.objects.create(
-                employee=employee,
-                expected_retirement_date=employee.date_of_retirement,
-                status='UPCOMING'
-            )
-            
-            # Create default checklist items
-            default_items = [
-                "Documentation review",
-                "Exit interview scheduling",
-                "Badge/access card collection",
-                "Equipment return",
-                "Final payment calculation",
-                "Pension processing",
-                "Clearance from all departments",
-                "Farewell arrangements"
-            ]
-            
-            for item in default_items:
-                RetirementChecklistItem.objects.create(
-                    retirement_plan=retirement_plan,
-                    item_name=item,
-                    description="",
-                    is_completed=False
-                )
-            
-            count += 1
-        
-        if count > 0:
-            messages.success(request, f"Successfully identified {count} employees approaching retirement.")
-        else:
-            messages.info(request, "No new employees approaching retirement were identified.")
+        # Identification creates a plan and checklist per employee, so it runs as a background job
+        upcoming_years = request.POST.get('upcoming_years', '1').strip()
+        department_id = request.POST.get('department', '').strip()
+        if not upcoming_years.isdigit() or not 1 <= int(upcoming_years) <= MAX_HORIZON_YEARS:
+            messages.error(request, f"Years ahead must be a whole number from 1 to {MAX_HORIZON_YEARS}.")
+            return redirect('hr_modules:identify_upcoming_retirements')
+        if department_id and not department_id.isdigit():
+            messages.error(request, "Please choose a valid department.")
+            return redirect('hr_modules:identify_upcoming_retirements')
+        upcoming_years = int(upcoming_years)
+        # A dry run only reports how many plans and checklist items would be created
+        dry_run = bool(request.POST.get('dry_run'))
+        
+        job = enqueue(
+            'hr_modules.identify_retirements',
+            "Identify upcoming retirements" + (" (dry run)" if dry_run else ""),
+            {
+                'upcoming_years': upcoming_years,
+                'department_id': int(department_id) if department_id else None,
+                'dry_run': dry_run,
+            },
+            user=request.user,
+            # Repeated clicks while a run is pending join that run
+            idempotency_key=f"identify_retirements:{upcoming_years}:{department_id}:{dry_run}",
+        )
         
-        return redirect('hr_modules:retirement_list')
+        return redirect(f"{reverse('job_status', args=[job.pk])}?next={reverse('hr_modules:retirement_list')}")
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     context = {
         'departments': departments,
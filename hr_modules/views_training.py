@@ -1,14 +1,14 @@
-import csv
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 
 from .models import Training, TrainingType, TrainingParticipant
 from core.models import EmployeeProfile
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv, yes_no
 
 from datetime import timedelta
 
@@ -381,28 +381,19 @@ def training_export_participants(request, pk):
         messages.error(request, "You don't have permission to export participant data.")
         return redirect('hr_modules:training_detail', pk=training.pk)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{training.title}_participants.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'File Number', 'Department', 'Status', 'Attendance', 'Performance', 'Certificate'])
-    
-    # Add participant data
     participants = TrainingParticipant.objects.filter(
         training=training
-    ).select_related('employee', 'employee__user', 'employee__current_department')
-    
-    for participant in participants:
-        writer.writerow([
-            participant.employee.user.get_full_name(),
-            participant.employee.file_number,
-            participant.employee.current_department.name if participant.employee.current_department else '',
-            participant.get_status_display(),
-            f"{participant.attendance_record}%" if participant.attendance_record else '',
-            participant.performance_score if participant.performance_score else '',
-            'Yes' if participant.certificate_issued else 'No'
-        ])
-    
-    return response
\ No newline at end of file
+    ).select_related('employee', 'employee__user', 'employee__current_department').order_by('pk')
+    
+    # Stream CSV response
+    columns = [
+        ('Name', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Department', 'employee.current_department.name'),
+        ('Status', 'get_status_display'),
+        ('Attendance', lambda participant: f"{participant.attendance_record}%" if participant.attendance_record else ''),
+        ('Performance', lambda participant: participant.performance_score or ''),
+        ('Certificate', yes_no('certificate_issued')),
+    ]
+    
+    return stream_csv(participants, columns, f"{training.title}_participants.csv")
\ No newline at end of file
@@ -2,15 +2,18 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Q, Sum
+from django.http import JsonResponse
 
-from .models import TransferRequest
-from core.models import EmployeeProfile, Department, Unit, Zone, State
+from .models import TransferRequest, TransferRollup
+from core.models import EmployeeProfile, Department
 from task_management.models import Task, TaskStatus
+from core.exports import stream_csv
+from core.reference_data import get_departments, get_zones, get_states, get_units
+from core.pagination import paginate_keyset, render_list
+from core.reports import group_totals, department_label
 
 from datetime import timedelta
-import csv
 
 
 @login_required
@@ -47,9 +50,6 @@ def transfer_list(request):
             'approved_by'
         )
     
-    # Order by recency
-    transfers = transfers.order_by('-created_at')
-    
     # Apply filters
     if status:
         transfers = transfers.filter(status=status)
@@ -74,6 +74,9 @@ def transfer_list(request):
         else:
             transfers = transfers.filter(reason__icontains=search)
     
+    # One page, most recent first
+    transfers = paginate_keyset(request, transfers, ['-created_at'])
+    
     # Get pending approvals if user can approve
     can_approve = request.user.user_permissions.get('can_approve_transfers', False)
     if can_approve:
@@ -91,7 +94,7 @@ def transfer_list(request):
         pending_approvals = None
     
     # Get departments for filter
-    departments = Department.objects.all()
+    departments = get_departments()
     
     context = {
         'transfers': transfers,
@@ -105,7 +108,7 @@ def transfer_list(request):
         'search': search,
     }
     
-    return render(request, 'hr_modules/transfer/transfer_list.html', context)
+    return render_list(request, 'hr_modules/transfer/transfer_list.html', context)
 
 
 @login_required
@@ -214,9 +217,9 @@ def transfer_create(request):
         return redirect('hr_modules:transfer_detail', pk=transfer_request.pk)
     
     # Get departments, zones, and states for the form
-    departments = Department.objects.all()
-    zones = Zone.objects.all()
-    states = State.objects.all()
+    departments = get_departments()
+    zones = get_zones()
+    states = get_states()
     
     context = {
         'departments': departments,
@@ -284,13 +287,13 @@ def transfer_edit(request, pk):
         return redirect('hr_modules:transfer_detail', pk=transfer_request.pk)
     
     # Get departments, zones, and states for the form
-    departments = Department.objects.all()
-    zones = Zone.objects.all()
-    states = State.objects.all()
+    departments = get_departments()
+    zones = get_zones()
+    states = get_states()
     
     # Get units for the selected department
     if transfer_request.requested_department:
-        units = Unit.objects.filter(department=transfer_request.requested_department)
+        units = get_units(transfer_request.requested_department_id)
     else:
         units = []
     
@@ -651,33 +654,22 @@ def transfer_export(request):
             Q(requested_department_id=department_id)
         )
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="transfer_records_{year}.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['Employee', 'File Number', 'Current Department', 'Requested Department', 
-                     'Request Type', 'Status', 'Requested Date', 'Approved By', 'Effective Date',
-                     'Completion Date', 'Reason'])
-    
-    # Add data rows
-    for transfer in transfers:
-        writer.writerow([
-            transfer.employee.user.get_full_name(),
-            transfer.employee.file_number,
-            transfer.current_department.name,
-            transfer.requested_department.name,
-            transfer.get_request_type_display(),
-            transfer.get_status_display(),
-            transfer.request_date,
-            transfer.approved_by.get_full_name() if transfer.approved_by else '',
-            transfer.effective_date if transfer.effective_date else '',
-            transfer.completion_date if transfer.completion_date else '',
-            transfer.reason
-        ])
-    
-    return response
+    # Stream CSV response
+    columns = [
+        ('Employee', 'employee.user.get_full_name'),
+        ('File Number', 'employee.file_number'),
+        ('Current Department', 'current_department.name'),
+        ('Requested Department', 'requested_department.name'),
+        ('Request Type', 'get_request_type_display'),
+        ('Status', 'get_status_display'),
+        ('Requested Date', 'request_date'),
+        ('Approved By', 'approved_by.get_full_name'),
+        ('Effective Date', 'effective_date'),
+        ('Completion Date', 'completion_date'),
+        ('Reason', 'reason'),
+    ]
+    
+    return stream_csv(transfers, columns, f"transfer_records_{year}.csv")
 
 
 @login_required
@@ -692,74 +684,42 @@ def transfer_summary_report(request):
     year = request.GET.get('year', str(timezone.now().year))
     status = request.GET.get('status', '')
     
-    # Base queryset
-    transfers = TransferRequest.objects.filter(
-        created_at__year=year
-    )
+    # Transfer counts per department, status and type, from the rollup table
+    rollups = TransferRollup.objects.filter(year=year)
     
     # Apply status filter if provided
     if status:
-        transfers = transfers.filter(status=status)
-    
-    # Get department data
-    department_data = {}
-    
-    # Count transfers by source department
-    from_counts = transfers.values('current_department__name').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    for item in from_counts:
-        dept_name = item['current_department__name']
-        if dept_name not in department_data:
-            department_data[dept_name] = {'name': dept_name, 'from_count': 0, 'to_count': 0}
-        department_data[dept_name]['from_count'] = item['count']
-    
-    # Count transfers by destination department
-    to_counts = transfers.values('requested_department__name').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    for item in to_counts:
-        dept_name = item['requested_department__name']
-        if dept_name not in department_data:
-            department_data[dept_name] = {'name': dept_name, 'from_count': 0, 'to_count': 0}
-        department_data[dept_name]['to_count'] = item['count']
-    
-    # Calculate net gain/loss
-    for dept in department_data.values():
-        dept['net'] = dept['to_count'] - dept['from_count']
+        rollups = rollups.filter(status=status)
+    
+    # Transfers out of (from) and into (to) each department
+    department_data = [
+        {
+            'name': department_label(row['department_id']).name,
+            'from_count': row['from_count'],
+            'to_count': row['to_count'],
+            'net': row['to_count'] - row['from_count'],
+        }
+        for row in group_totals(
+            rollups, 'department_id', from_count=Sum('transfers_out'), to_count=Sum('transfers_in')
+        )
+        if row['from_count'] or row['to_count']
+    ]
     
     # Sort by net gain/loss
-    departments_sorted = sorted(department_data.values(), key=lambda x: x['net'], reverse=True)
-    
-    # Get status counts
-    status_counts = transfers.values('status').annotate(
-        count=Count('id')
-    ).order_by('status')
-    
-    status_data = {}
-    for item in status_counts:
-        status_code = item['status']
-        status_display = dict(TransferRequest.STATUS_CHOICES).get(status_code, status_code)
-        status_data[status_code] = {
-            'name': status_display,
-            'count': item['count']
-        }
+    departments_sorted = sorted(department_data, key=lambda x: x['net'], reverse=True)
     
-    # Get request type counts
-    type_counts = transfers.values('request_type').annotate(
-        count=Count('id')
-    ).order_by('request_type')
-    
-    type_data = {}
-    for item in type_counts:
-        type_code = item['request_type']
-        type_display = dict(TransferRequest.REQUEST_TYPES).get(type_code, type_code)
-        type_data[type_code] = {
-            'name': type_display,
-            'count': item['count']
-        }
+    # Every transfer is counted once as a transfer out
+    status_choices = dict(TransferRequest.STATUS_CHOICES)
+    status_data = [
+        {'name': status_choices.get(row['status'], row['status']), 'count': row['count']}
+        for row in group_totals(rollups, 'status', count=Sum('transfers_out')) if row['count']
+    ]
+    
+    type_choices = dict(TransferRequest.REQUEST_TYPES)
+    type_data = [
+        {'name': type_choices.get(row['request_type'], row['request_type']), 'count': row['count']}
+        for row in group_totals(rollups, 'request_type', count=Sum('transfers_out')) if row['count']
+    ]
     
     # Get years for filter
     current_year = timezone.now().year
@@ -767,9 +727,9 @@ def transfer_summary_report(request):
     
     context = {
         'departments': departments_sorted,
-        'status_data': status_data.values(),
-        'type_data': type_data.values(),
-        'total_transfers': transfers.count(),
+        'status_data': status_data,
+        'type_data': type_data,
+        'total_transfers': sum(item['count'] for item in status_data),
         'years': years,
         'selected_year': year,
         'selected_status': status,
@@ -786,6 +746,6 @@ def get_units_for_department(request):
     if not department_id:
         return JsonResponse({'units': []})
     
-    units = Unit.objects.filter(department_id=department_id).values('id', 'name')
+    units = [{'id': unit.id, 'name': unit.name} for unit in get_units(department_id)]
     
-    return JsonResponse({'units': list(units)})
\ No newline at end of file
+    return JsonResponse({'units': units})
\ No newline at end of file
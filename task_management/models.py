@@ -121,6 +121,12 @@ class Task(models.Model):
         if self.due_date and not self.is_completed:
             return timezone.now() > self.due_date
         return False
+    
+    class Meta:
+        indexes = [
+            # "My tasks": open tasks for an assignee by due date
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+        ]
 
 
 class TaskComment(models.Model):
@@ -2,8 +2,10 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, F, Count, Case, When, Value, IntegerField
-from django.http import JsonResponse, HttpResponse
+from django.utils.dateparse import parse_datetime
+from django.db.models import Q, F, Count, Case, When, Value, IntegerField, DateTimeField
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
 
 from .models import (
     Task, TaskCategory, TaskPriority, TaskStatus, TaskComment, 
@@ -12,14 +14,20 @@ from .models import (
 )
 
 from core.models import EmployeeProfile, Department
+from core.exports import stream_csv, yes_no, date_time
+from core.reference_data import get_departments
+from core.pagination import cursor_state, paginate_keyset, render_list
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 
-from datetime import timedelta
-import csv
+from datetime import datetime, timedelta, timezone as dt_timezone
 import json
 
 
+# Sorts tasks without a due date after every dated task
+NO_DUE_DATE = datetime(9999, 12, 31, tzinfo=dt_timezone.utc)
+
+
 @login_required
 def task_list(request):
     """List all tasks with filters"""
@@ -52,7 +60,10 @@ def task_list(request):
             'assigned_to__user', 'creator', 'completed_by'
         )
     
-    # Add custom ordering by priority and due date
+    # Sort keys: overdue first, then priority, then due date (undated last).
+    # Overdue is judged as of the first page, so a task falling due while
+    # paging keeps its place instead of jumping between pages
+    overdue_as_of = parse_datetime(cursor_state(request).get('overdue_as_of', '')) or timezone.now()
     tasks = tasks.annotate(
         priority_order=Case(
             When(priority__isnull=True, then=Value(0)),
@@ -60,11 +71,12 @@ def task_list(request):
             output_field=IntegerField(),
         ),
         overdue_order=Case(
-            When(due_date__lt=timezone.now(), status__is_completed=False, then=Value(1)),
+            When(due_date__lt=overdue_as_of, status__is_completed=False, then=Value(1)),
             default=Value(0),
             output_field=IntegerField(),
-        )
-    ).order_by('-overdue_order', '-    ', 'due_date')
+        ),
+        due_order=Coalesce('due_date', Value(NO_DUE_DATE), output_field=DateTimeField()),
+    )
     
     # Apply filters
     if status_id:
@@ -130,7 +142,8 @@ def task_list(request):
         assignable_employees = []
     
     context = {
-        'tasks': tasks,
+        'tasks': paginate_keyset(request, tasks, ['-overdue_order', '-priority_order', 'due_order'],
+                                 state={'overdue_as_of': overdue_as_of.isoformat()}),
         'overdue_tasks': overdue_tasks,
         'due_today_tasks': due_today_tasks,
         'upcoming_tasks': upcoming_tasks,
@@ -151,7 +164,7 @@ def task_list(request):
         'search': search,
     }
     
-    return render(request, 'task_management/task_list.html', context)
+    return render_list(request, 'task_management/task_list.html', context)
 
 
 @login_required
@@ -454,35 +467,24 @@ def task_export(request):
     if assigned_to_id:
         tasks = tasks.filter(assigned_to_id=assigned_to_id)
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="tasks_export.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Title', 'Status', 'Priority', 'Category', 'Assigned To', 
-                     'Created By', 'Created At', 'Due Date', 'Completed', 'Completed By', 
-                     'Completed At', 'Description'])
-    
-    # Add task data
-    for task in tasks:
-        writer.writerow([
-            task.id,
-            task.title,
-            task.status.name if task.status else '',
-            task.priority.name if task.priority else '',
-            task.category.name if task.category else '',
-            task.assigned_to.user.get_full_name() if task.assigned_to else '',
-            task.creator.get_full_name() if task.creator else '',
-            task.created_at.strftime('%Y-%m-%d %H:%M') if task.created_at else '',
-            task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else '',
-            'Yes' if task.status and task.status.is_completed else 'No',
-            task.completed_by.get_full_name() if task.completed_by else '',
-            task.completed_at.strftime('%Y-%m-%d %H:%M') if task.completed_at else '',
-            task.description
-        ])
-    
-    return response
+    # Stream CSV response
+    columns = [
+        ('ID', 'id'),
+        ('Title', 'title'),
+        ('Status', 'status.name'),
+        ('Priority', 'priority.name'),
+        ('Category', 'category.name'),
+        ('Assigned To', 'assigned_to.user.get_full_name'),
+        ('Created By', 'creator.get_full_name'),
+        ('Created At', date_time('created_at')),
+        ('Due Date', date_time('due_date')),
+        ('Completed', yes_no('status.is_completed')),
+        ('Completed By', 'completed_by.get_full_name'),
+        ('Completed At', date_time('completed_at')),
+        ('Description', 'description'),
+    ]
+    
+    return stream_csv(tasks.order_by('pk'), columns, "tasks_export.csv")
 
 @login_required
 def task_update(request, pk):
@@ -550,7 +552,7 @@ def task_update(request, pk):
     statuses = TaskStatus.objects.all().order_by('order')
     priorities = TaskPriority.objects.all().order_by('-level')
     categories = TaskCategory.objects.all().order_by('name')
-    departments = Department.objects.all().order_by('name')
+    departments = get_departments()
     
     # Get assignable employees
     if request.user.user_permissions.get('can_assign_tasks', False):